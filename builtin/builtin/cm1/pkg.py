@@ -108,8 +108,15 @@ class Cm1(Application):
 
         # Create CM1 compilation
         self.config['CM1_PATH'] = self.env['CM1_PATH']
-        Exec(f'bash {self.config["CM1_PATH"]}/buildCM1-spack.sh',
-             LocalExecInfo(env=self.env))
+
+        def build(build_dir):
+            # CM1 is built within its source tree
+            node = Exec(f'bash {self.config["CM1_PATH"]}/buildCM1-spack.sh',
+                        LocalExecInfo(env=self.env))
+            if node.exit_code != 0:
+                raise Exception('Failed to build CM1')
+        self.cached_build('cm1', self.config['CM1_PATH'], build,
+                          outputs=[f'{self.config["CM1_PATH"]}/run/cm1.exe'])
 
         # Create CM1 configuration
         self.env['COREX'] = self.config['corex']
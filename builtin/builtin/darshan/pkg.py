@@ -53,8 +53,7 @@ class Darshan(Interceptor):
         self.config['DARSHAN_LIB'] = self.find_library('darshan')
         if self.config['DARSHAN_LIB'] is None:
             raise Exception('Could not find darshan')
-        Mkdir(self.env['DARSHAN_LOG_DIR'],
-              PsshExecInfo(hostfile=self.jarvis.hostfile))
+        self.fs_plan.mkdir(self.env['DARSHAN_LOG_DIR'], self.jarvis.hostfile)
         print(f'Found libdarshan.so at {self.config["DARSHAN_LIB"]}')
 
     def modify_env(self):
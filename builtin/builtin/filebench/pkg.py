@@ -3,7 +3,10 @@ This module provides classes and methods to launch Redis.
 Redis cluster is used if the hostfile has many hosts
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.metrics import filebench_parser
 from jarvis_util import *
+import glob
+import os
 
 
 class Filebench(Application):
@@ -84,11 +87,20 @@ class Filebench(Application):
         ]
         cmd = ' '.join(cmd)
         self.log(cmd, color=Color.YELLOW)
-        Exec(cmd,
-             PsshExecInfo(env=self.mod_env,
-                          hostfile=self.jarvis.hostfile,
-                          do_dbg=self.config['do_dbg'],
-                          dbg_port=self.config['dbg_port']))
+        # Each node writes its output to its own file, which is parsed
+        # after the run instead of being held in memory
+        nodes = []
+        for host in self.jarvis.hostfile.hosts:
+            nodes.append(Exec(cmd,
+                              SshExecInfo(env=self.mod_env,
+                                          hostfile=Hostfile(all_hosts=[host]),
+                                          do_dbg=self.config['do_dbg'],
+                                          dbg_port=self.config['dbg_port'],
+                                          pipe_stdout=self.host_metric_path(
+                                              host),
+                                          exec_async=True)))
+        for node in nodes:
+            node.wait()
 
     def stop(self):
         """
@@ -111,3 +123,43 @@ class Filebench(Application):
         Rm(self.config['dir'] + '*',
            PsshExecInfo(env=self.env,
                         hostfile=self.jarvis.hostfile))
+
+    def metric_parser(self):
+        """
+        Throughput (ops/s), bandwidth (MiB/s), and latency (us), combined
+        across all nodes
+
+        :return: MetricParser
+        """
+        return filebench_parser()
+
+    def host_metric_path(self, host):
+        """
+        The file the output of filebench on a node is written to
+
+        :param host: The node
+        :return: str
+        """
+        return f'{self.metric_path()[:-len(".out")]}.{host}.out'
+
+    def clear_metrics(self):
+        """
+        Remove the output of a previous run on every node
+
+        :return: None
+        """
+        for path in glob.glob(self.host_metric_path('*')):
+            os.remove(path)
+
+    def _parse_metrics(self, parser):
+        """
+        Filebench runs on every node, so the output of each node is
+        parsed.
+
+        :param parser: The MetricParser
+        :return: None
+        """
+        for host in self.jarvis.hostfile.hosts:
+            path = self.host_metric_path(host)
+            if os.path.exists(path):
+                parser.parse_file(path)
@@ -3,6 +3,7 @@ This module provides classes and methods to launch the Ior application.
 Ior is ....
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.metrics import fio_parser
 from jarvis_util import *
 
 
@@ -147,6 +148,8 @@ class Fio(Application):
             f'--filename={self.config["out"]}',
             f'--ioengine={self.config["engine"]}',
             f'--name=job',
+            f'--output-format=json',
+            f'--output={self.metric_path()}',
         ]
         # The path
         if '.' in os.path.basename(self.config['out']):
@@ -154,7 +157,6 @@ class Fio(Application):
                         exist_ok=True)
         else:
             os.makedirs(self.config['out'], exist_ok=True)
-        # pipe_stdout=self.config['log'] 
         Exec(' '.join(cmd),
              LocalExecInfo(env=self.mod_env,
                          hostfile=self.jarvis.hostfile,
@@ -180,6 +182,14 @@ class Fio(Application):
         Rm(self.config['out'] + '*',
            LocalExecInfo())
 
+    def metric_parser(self):
+        """
+        Bandwidth (MiB/s), IOPS, and latency (us) of reads and writes
+
+        :return: MetricParser
+        """
+        return fio_parser()
+
     def _get_stat(self, stat_dict):
         """
         Get statistics from the application.
@@ -127,16 +127,24 @@ class Gadget2(Application):
                                     'MAX_SIZE_TIMESTEP': self.config['max_size_timestep'],
                                     'INITCOND': self.config['ic'],
                                 })
-        build_dir = f'{self.shared_dir}/build'
         cmake_opts = YamlFile(buildconf).load()
         if 'FFTW_PATH' in self.env:
             cmake_opts['FFTW_PATH'] = self.env['FFTW_PATH']
-        Cmake(self.env['GADGET2_PATH'],
-              build_dir,
-              opts=cmake_opts,
-              exec_info=LocalExecInfo(env=self.env))
-        Make(build_dir, nthreads=self.config['j'],
-             exec_info=LocalExecInfo(env=self.env))
+
+        def build(build_dir):
+            Cmake(self.env['GADGET2_PATH'],
+                  build_dir,
+                  opts=cmake_opts,
+                  exec_info=LocalExecInfo(env=self.env))
+            node = Make(build_dir, nthreads=self.config['j'],
+                        exec_info=LocalExecInfo(env=self.env))
+            if node.exit_code != 0:
+                raise Exception('Failed to build Gadget2')
+        # Runtime parameters (e.g., nprocs) reuse the existing build
+        self.config['build_dir'] = self.cached_build(
+            'gadget2', self.env['GADGET2_PATH'], build,
+            opts=cmake_opts, env_vars=['FFTW_PATH'],
+            outputs=['bin/Gadget2'])
 
     def start(self):
         """
@@ -146,7 +154,7 @@ class Gadget2(Application):
         :return: None
         """
         test_case = self.config['test_case']
-        build_dir = f'{self.shared_dir}/build'
+        build_dir = self.config['build_dir']
         exec_path = f'{build_dir}/bin/Gadget2'
         paramfile = f'{self.config_dir}/{test_case}.param'
         Mkdir(self.config['out'])
@@ -82,17 +82,24 @@ class Gadget2Df(Application):
                                     'NSAMPLE': nsample,
                                     'FILE_BASE': self.config['ic'],
                                 })
-        build_dir = f'{self.shared_dir}/build'
         cmake_opts = {}
         Mkdir(f'{self.env["GADGET2_PATH"]}/ICs-NGen')
         if 'FFTW_PATH' in self.env:
             cmake_opts['FFTW_PATH'] = self.env['FFTW_PATH']
-        Cmake(self.env['GADGET2_PATH'],
-              build_dir,
-              opts=cmake_opts,
-              exec_info=LocalExecInfo(env=self.env))
-        Make(build_dir, nthreads=self.config['j'],
-             exec_info=LocalExecInfo(env=self.env))
+
+        def build(build_dir):
+            Cmake(self.env['GADGET2_PATH'],
+                  build_dir,
+                  opts=cmake_opts,
+                  exec_info=LocalExecInfo(env=self.env))
+            node = Make(build_dir, nthreads=self.config['j'],
+                        exec_info=LocalExecInfo(env=self.env))
+            if node.exit_code != 0:
+                raise Exception('Failed to build Gadget2')
+        self.config['build_dir'] = self.cached_build(
+            'gadget2', self.env['GADGET2_PATH'], build,
+            opts=cmake_opts, env_vars=['FFTW_PATH'],
+            outputs=['bin/NGenIC'])
 
     def start(self):
         """
@@ -101,7 +108,7 @@ class Gadget2Df(Application):
 
         :return: None
         """
-        build_dir = f'{self.shared_dir}/build'
+        build_dir = self.config['build_dir']
         paramfile = f'{self.config_dir}/ics.param'
         exec_path = f'{build_dir}/bin/NGenIC'
         ngenic_root = f'{self.env["GADGET2_PATH"]}/N-GenIC'
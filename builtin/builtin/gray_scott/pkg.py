@@ -122,8 +122,7 @@ class GrayScott(Application):
             adios_dir = os.path.join(self.shared_dir, 'gray-scott-output')
             self.config['output'] = os.path.join(adios_dir,
                                                  'data')
-            Mkdir(adios_dir, PsshExecInfo(hostfile=self.jarvis.hostfile,
-                                          env=self.env))
+            self.fs_plan.mkdir(adios_dir, self.jarvis.hostfile, env=self.env)
         settings_json = {
             'L': self.config['L'],
             'Du': self.config['Du'],
@@ -137,9 +136,8 @@ class GrayScott(Application):
             'output': f'{self.config["output"]}',
             'adios_config': self.adios2_xml_path
         }
-        Mkdir(self.config['output'],
-              PsshExecInfo(hostfile=self.jarvis.hostfile,
-                           env=self.env))
+        self.fs_plan.mkdir(self.config['output'], self.jarvis.hostfile,
+                           env=self.env)
         JsonFile(self.settings_json_path).save(settings_json)
 
         if self.config['engine'].lower() == 'bp5':
@@ -159,6 +157,9 @@ class GrayScott(Application):
         :return: None
         """
         # print(self.env['HERMES_CLIENT_CONF'])
+        # The output directory is removed by clean
+        self.fs_plan.mkdir(self.config['output'], self.jarvis.hostfile,
+                           env=self.env)
         start = time.time()
         Exec(f'gray-scott {self.settings_json_path}',
              MpiExecInfo(nprocs=self.config['nprocs'],
@@ -4,6 +4,7 @@ and deploy Hermes alongside an application.
 """
 
 from jarvis_cd.basic.pkg import Service
+from jarvis_cd.basic.readiness import TcpProbe
 #
 from jarvis_util import *
 import jarvis_util.util.small_df as sdf
@@ -81,7 +82,7 @@ class Hermes(Service):
         self._configure_client()
 
     def _configure_server(self):
-        rg = self.jarvis.resource_graph
+        rg = self.jarvis.rg_index
         hosts = self.jarvis.hostfile
 
         if len(self.config['devices']) == 0:
@@ -208,8 +209,8 @@ class Hermes(Service):
                                 PsshExecInfo(hostfile=self.jarvis.hostfile,
                                              env=self.env,
                                              exec_async=True))
-        time.sleep(self.config['sleep'])
-        print('Done sleeping')
+        self.wait_ready([TcpProbe(host, self.config['port'])
+                         for host in self.jarvis.hostfile.hosts])
 
     def stop(self):
         """
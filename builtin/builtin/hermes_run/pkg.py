@@ -4,6 +4,7 @@ hrun is ....
 """
 
 from jarvis_cd.basic.pkg import Service, Color
+from jarvis_cd.basic.readiness import TcpProbe
 from jarvis_util import *
 
 
@@ -288,7 +289,7 @@ class HermesRun(Service):
         application.
         :return: None
         """
-        rg = self.jarvis.resource_graph
+        rg = self.jarvis.rg_index
 
         # Create hostfile
         self.hostfile = self.jarvis.hostfile
@@ -379,8 +380,6 @@ class HermesRun(Service):
                 'slab_sizes': ['4KB', '16KB', '64KB', '1MB']
             }
             self.config['borg_paths'].append(mount)
-            Mkdir(mount, PsshExecInfo(hostfile=self.hostfile,
-                                      env=self.env))
         if 'ram' in self.config and self.config['ram'] != '0':
             hermes_server['devices']['ram'] = {
                 'mount_point': '',
@@ -469,6 +468,10 @@ class HermesRun(Service):
         self.log(self.env['HERMES_CONF'])
         self.log(self.env['HERMES_CLIENT_CONF'])
         self.get_hostfile()
+        # The buffering directories are removed by clean
+        if len(self.config['borg_paths']):
+            self.fs_plan.mkdir(self.config['borg_paths'], self.hostfile,
+                               env=self.env)
         self.daemon_pkg = Exec('hrun_start_runtime',
                                 PsshExecInfo(hostfile=self.hostfile,
                                              env=self.mod_env,
@@ -478,8 +481,8 @@ class HermesRun(Service):
                                              hide_output=self.config['hide_output'],
                                              pipe_stdout=self.config['stdout'],
                                              pipe_stderr=self.config['stderr']))
-        time.sleep(self.config['sleep'])
-        self.log('Done sleeping')
+        self.wait_ready([TcpProbe(host, self.config['port'])
+                         for host in self.hostfile.hosts])
 
     def stop(self):
         """
@@ -526,7 +529,8 @@ class HermesRun(Service):
         self.get_hostfile()
         for path in self.config['borg_paths']:
             self.log(f'Removing {path}', Color.YELLOW)
-            Rm(path, PsshExecInfo(hostfile=self.hostfile))
+        if len(self.config['borg_paths']):
+            self.fs_plan.rm(self.config['borg_paths'], self.hostfile)
 
     def status(self):
         """
@@ -3,6 +3,7 @@ This module provides classes and methods to launch the Ior application.
 Ior is ....
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.metrics import ior_parser
 from jarvis_util import *
 
 
@@ -134,7 +135,6 @@ class Ior(Application):
                         exist_ok=True)
         else:
             os.makedirs(self.config['out'], exist_ok=True)
-        # pipe_stdout=self.config['log']
         Exec('which mpiexec',
              LocalExecInfo(env=self.mod_env))
         Exec(' '.join(cmd),
@@ -143,7 +143,8 @@ class Ior(Application):
                          nprocs=self.config['nprocs'],
                          ppn=self.config['ppn'],
                          do_dbg=self.config['do_dbg'],
-                         dbg_port=self.config['dbg_port']))
+                         dbg_port=self.config['dbg_port'],
+                         pipe_stdout=self.metric_path()))
 
     def stop(self):
         """
@@ -165,6 +166,14 @@ class Ior(Application):
            PsshExecInfo(env=self.env,
                         hostfile=self.jarvis.hostfile))
 
+    def metric_parser(self):
+        """
+        Bandwidth (MiB/s), IOPS, and time (s) of each operation
+
+        :return: MetricParser
+        """
+        return ior_parser()
+
     def _get_stat(self, stat_dict):
         """
         Get statistics from the application.
@@ -95,8 +95,8 @@ class NyxLya(Application):
         
         if self.config['output'] is None:
             self.config['output'] = f'{self.nyx_lya_path}/outputs'
-            Mkdir(self.config['output'], PsshExecInfo(hostfile=self.jarvis.hostfile,
-                                          env=self.env))
+            self.fs_plan.mkdir(self.config['output'], self.jarvis.hostfile,
+                               env=self.env)
 
         # copy a template inputs file from NYX installation path to the pkg directory
         self.copy_template_file(f'{self.nyx_lya_path}/inputs', self.inputs_path)
@@ -145,6 +145,9 @@ class NyxLya(Application):
         """
         # since "self.nyx_lya_path" is always set to be none in _init(), we need to rest it here
         self.nyx_lya_path = f"{self.config['nyx_install_path']}/LyA"
+        # The output directory is removed by clean
+        self.fs_plan.mkdir(self.config['output'], self.jarvis.hostfile,
+                           env=self.env)
         Exec(f'{self.nyx_lya_path}/nyx_LyA {self.inputs_path}',
              MpiExecInfo(nprocs=self.config['nprocs'],
                          ppn=self.config['ppn'],
@@ -1,4 +1,5 @@
 from jarvis_util import *
+from jarvis_cd.basic.readiness import TcpProbe, CmdProbe
 
 
 class OrangefsCustomKern:
@@ -16,6 +17,17 @@ class OrangefsCustomKern:
             Exec(server_start_cmds,
                  SshExecInfo(hostfile=host,
                              env=self.env))
+        if self.config['protocol'] == 'tcp':
+            self.wait_ready([TcpProbe(host.hosts[0], self.config['port'])
+                             for host in self.server_hosts.list()])
+        else:
+            # The ports of other protocols (e.g., ib) cannot be probed,
+            # so wait for the servers to be running instead
+            self.wait_ready([
+                CmdProbe('pgrep -x pvfs2-server',
+                         PsshExecInfo(hostfile=self.server_hosts,
+                                      env=self.env,
+                                      hide_output=True))])
         self.status()
 
         # insert OFS kernel module
@@ -48,6 +60,13 @@ class OrangefsCustomKern:
                           env=self.env,
                           sudo=True,
                           sudoenv=self.config['sudoenv']))
+        self.wait_ready([
+            CmdProbe(f'pvfs2-ping -m {self.config["mount"]}',
+                     PsshExecInfo(hostfile=self.client_hosts,
+                                  env=self.env,
+                                  hide_output=True,
+                                  collect_output=True),
+                     pattern='appears to be correctly configured')])
 
     def custom_stop(self):
         Exec(f'umount -t pvfs2 {self.config["mount"]}',
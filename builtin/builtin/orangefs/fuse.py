@@ -85,7 +85,7 @@ class OrangefsFuse(Service):
         :param kwargs: Configuration parameters for this pkg.
         :return: None
         """
-        rg = self.jarvis.resource_graph
+        rg = self.jarvis.rg_index
         self.md_hosts = self.jarvis.hostfile
         if self.config['md_hosts'] is None:
             count = int(len(self.md_hosts) / 4)
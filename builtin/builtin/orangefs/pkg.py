@@ -79,7 +79,7 @@ class Orangefs(Service, OrangefsCustomKern, OrangefsAres):
         :param kwargs: Configuration parameters for this pkg.
         :return: None
         """
-        rg = self.jarvis.resource_graph
+        rg = self.jarvis.rg_index
         if self.config['ares']:
             self.config['sudoenv'] = False
 
@@ -156,14 +156,6 @@ class Orangefs(Service, OrangefsCustomKern, OrangefsAres):
         Pscp(self.config['pfs_conf'],
              PsshExecInfo(hosts=self.jarvis.hostfile, env=self.env))
 
-        # Create storage directories
-        Mkdir(self.config['mount'], PsshExecInfo(hosts=self.client_hosts,
-                                                 env=self.env))
-        Mkdir(self.config['storage'], PsshExecInfo(hosts=self.server_hosts,
-                                                   env=self.env))
-        Mkdir(self.config['metadata'], PsshExecInfo(hosts=self.md_hosts,
-                                                    env=self.env))
-
         # Set pvfstab on clients
         mdm_ip = self.md_hosts.list()[0].hosts[0]
         with open(self.config['pvfs2tab'], 'w', encoding='utf-8') as fp:
@@ -180,10 +172,29 @@ class Orangefs(Service, OrangefsCustomKern, OrangefsAres):
                           env=self.env))
         self.env['PVFS2TAB_FILE'] = self.config['pvfs2tab']
 
+    def _make_storage(self):
+        """
+        Create the storage directories and format them. This is done during
+        start, since clean removes them. Storage is only formatted on the
+        first start after it was created, so data survives restarts.
+
+        :return: None
+        """
+        with self.fs_plan.batch():
+            self.fs_plan.mkdir(self.config['mount'], self.client_hosts,
+                               env=self.env)
+            self.fs_plan.mkdir(self.config['storage'], self.server_hosts,
+                               env=self.env)
+            self.fs_plan.mkdir(self.config['metadata'], self.md_hosts,
+                               env=self.env)
+        # Clean removes the storage directory, and the marker with it
+        marker = f'{self.config["storage"]}/.jarvis_formatted'
         for host in self.server_hosts.list():
             host_ip = host.hosts[0]
             server_start_cmds = [
-                f'pvfs2-server -f -a {host_ip}  {self.config["pfs_conf"]}'
+                f'test -e {marker} || '
+                f'(pvfs2-server -f -a {host_ip} {self.config["pfs_conf"]} && '
+                f'touch {marker})'
             ]
             print(server_start_cmds)
             print(f"PVFS2TAB: {self.env['PVFS2TAB_FILE']}")
@@ -201,6 +212,7 @@ class Orangefs(Service, OrangefsCustomKern, OrangefsAres):
 
     def start(self):
         self._load_config()
+        self._make_storage()
         # start pfs servers
         self.custom_start()
 
@@ -211,18 +223,31 @@ class Orangefs(Service, OrangefsCustomKern, OrangefsAres):
         else:
             self.custom_stop()
 
+    def reset_state(self):
+        """
+        Delete all files in the mounted file system, so that the servers
+        can be reused by the next iteration of a sweep.
+
+        :return: True
+        """
+        self._load_config()
+        # The file system is shared, so one client removes everything
+        Rm(f'{self.config["mount"]}/*',
+           PsshExecInfo(
+               hosts=Hostfile(all_hosts=self.config['client_host_set'][0:1]),
+               env=self.env))
+        return True
+
     def clean(self):
         self._load_config()
 
-        Rm([self.config['mount'], self.config['client_log']],
-           PsshExecInfo(hosts=self.client_hosts,
-                        env=self.env))
-        Rm([self.config['storage'], self.config['log']],
-           PsshExecInfo(hosts=self.server_hosts,
-                        env=self.env))
-        Rm(self.config['metadata'],
-           PsshExecInfo(hosts=self.md_hosts,
-                        env=self.env))
+        with self.fs_plan.batch():
+            self.fs_plan.rm([self.config['mount'], self.config['client_log']],
+                            self.client_hosts, env=self.env)
+            self.fs_plan.rm([self.config['storage'], self.config['log']],
+                            self.server_hosts, env=self.env)
+            self.fs_plan.rm(self.config['metadata'], self.md_hosts,
+                            env=self.env)
 
     def status(self):
         self._load_config()
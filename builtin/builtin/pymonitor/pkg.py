@@ -3,6 +3,7 @@ This module provides classes and methods to launch the Ior application.
 Ior is ....
 """
 from jarvis_cd.basic.pkg import Service
+from jarvis_cd.basic.readiness import FileProbe
 from jarvis_util import *
 from jarvis_util.introspect.monitor import Monitor
 
@@ -56,7 +57,6 @@ class Pymonitor(Service):
         if self.config['dir'] is None:
             self.config['dir'] = f'{self.shared_dir}/logs'
         self.config['dir'] = os.path.expandvars(self.config['dir'])
-        Mkdir(self.config['dir'])
         self.env['MONITOR_DIR'] = self.config['dir']
         self.log(f'The config dir is {self.config["dir"]}')
 
@@ -72,12 +72,21 @@ class Pymonitor(Service):
         hostfile = self.jarvis.hostfile
         if self.config['num_nodes'] > 0:
             hostfile = hostfile.subset(self.config['num_nodes'])
+        # Remove the logs of a previous run, so they are not mistaken
+        # for the logs of this one
+        Rm(f'{self.config["dir"]}/*', PsshExecInfo(env=self.env,
+                                                    hostfile=hostfile))
+        Mkdir(self.config['dir'], PsshExecInfo(env=self.env,
+                                               hostfile=hostfile))
         Monitor(self.config['frequency'],
                 self.config['dir'],
                 PsshExecInfo(env=self.env,
                             hostfile=hostfile,
                             exec_async=True))
-        time.sleep(self.config['sleep'])
+        self.wait_ready([FileProbe(f'{self.config["dir"]}/*',
+                                   PsshExecInfo(env=self.env,
+                                                hostfile=hostfile,
+                                                hide_output=True))])
 
     def stop(self):
         """
@@ -3,6 +3,7 @@ This module provides classes and methods to launch the Redis benchmark tool.
 Redis cluster is used if the hostfile has many hosts
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.metrics import redis_benchmark_parser
 from jarvis_util import *
 
 
@@ -123,6 +124,7 @@ class RedisBenchmark(Application):
             f'--threads {self.config["nthreads"]}',
             f'-d {self.config["req_size"]}',
             f'-p {self.config["port"]}',
+            '--csv',
         ]
         if len(hostfile) > 1:
             cmd += [
@@ -134,7 +136,8 @@ class RedisBenchmark(Application):
              LocalExecInfo(env=self.mod_env,
                            hostfile=hostfile,
                            do_dbg=self.config['do_dbg'],
-                           dbg_port=self.config['dbg_port']))
+                           dbg_port=self.config['dbg_port'],
+                           pipe_stdout=self.metric_path()))
 
     def stop(self):
         """
@@ -164,3 +167,11 @@ class RedisBenchmark(Application):
                                hostfile=hostfile,
                                do_dbg=self.config['do_dbg'],
                                dbg_port=self.config['dbg_port']))
+
+    def metric_parser(self):
+        """
+        Throughput (ops/s) and latency (us) of each benchmark
+
+        :return: MetricParser
+        """
+        return redis_benchmark_parser()
@@ -3,6 +3,7 @@ This module provides classes and methods to launch Redis.
 Redis cluster is used if the hostfile has many hosts
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.readiness import TcpProbe, CmdProbe
 from jarvis_util import *
 
 
@@ -81,8 +82,8 @@ class Redis(Application):
                           do_dbg=self.config['do_dbg'],
                           dbg_port=self.config['dbg_port'],
                           exec_async=True))
-        self.log(f'Sleeping for {self.config["sleep"]} seconds', color=Color.YELLOW)
-        time.sleep(self.config['sleep'])
+        self.wait_ready([TcpProbe(host, self.config['port'])
+                         for host in hostfile.hosts])
 
         # Create redis clients
         if len(hostfile) > 1:
@@ -113,8 +114,12 @@ class Redis(Application):
                                hostfile=hostfile,
                                do_dbg=self.config['do_dbg'],
                                dbg_port=self.config['dbg_port']))
-            self.log(f'Sleeping for {self.config["sleep"]} seconds', color=Color.YELLOW)
-            time.sleep(self.config['sleep'])
+            self.wait_ready([
+                CmdProbe(f'redis-cli -p {self.config["port"]} -h {host} '
+                         f'cluster info',
+                         pattern='cluster_state:ok',
+                         env=self.mod_env)
+                for host in hostfile.hosts])
 
     def stop(self):
         """
@@ -128,6 +133,19 @@ class Redis(Application):
                  PsshExecInfo(env=self.env,
                               hostfile=self.jarvis.hostfile))
 
+    def reset_state(self):
+        """
+        Delete all keys, so that the servers can be reused by the next
+        iteration of a sweep.
+
+        :return: True
+        """
+        for host in self.jarvis.hostfile.hosts:
+            Exec(f'redis-cli -p {self.config["port"]} -h {host} flushall',
+                 LocalExecInfo(env=self.mod_env,
+                               hostfile=self.jarvis.hostfile))
+        return True
+
     def clean(self):
         """
         Destroy all data for an application. E.g., OrangeFS will delete all
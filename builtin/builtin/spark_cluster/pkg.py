@@ -4,6 +4,7 @@ SparkCluster is ....
 """
 
 from jarvis_cd.basic.pkg import Service
+from jarvis_cd.basic.readiness import TcpProbe
 from jarvis_util import *
 
 
@@ -38,6 +39,12 @@ class SparkCluster(Service):
                 'type': int,
                 'default': 1,
             },
+            {
+                'name': 'webui_port',
+                'msg': 'The port of the spark master web UI',
+                'type': int,
+                'default': 8080,
+            },
         ]
 
     def _configure(self, **kwargs):
@@ -64,13 +71,18 @@ class SparkCluster(Service):
         Exec(f'{self.config["SPARK_SCRIPTS"]}/sbin/start-master.sh',
              PsshExecInfo(env=self.env,
                           hosts=self.jarvis.hostfile.subset(1)))
-        time.sleep(1)
+        self.wait_ready([TcpProbe(self.env['SPARK_MASTER_HOST'],
+                                  self.env['SPARK_MASTER_PORT'])])
         # Start the worker nodes
         Exec(f'{self.config["SPARK_SCRIPTS"]}/sbin/start-worker.sh '
              f'{self.env["SPARK_MASTER_HOST"]}:{self.env["SPARK_MASTER_PORT"]}',
              PsshExecInfo(env=self.mod_env,
                           hosts=self.jarvis.hostfile.subset(self.config['num_nodes'])))
-        time.sleep(self.config['sleep'])
+        self.wait_ready([TcpProbe(self.env['SPARK_MASTER_HOST'],
+                                  self.config['webui_port'])] +
+                        [TcpProbe(host, self.env['SPARK_WORKER_PORT'])
+                         for host in self.jarvis.hostfile.subset(
+                            self.config['num_nodes']).hosts])
 
     def stop(self):
         """
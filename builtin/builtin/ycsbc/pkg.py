@@ -3,6 +3,7 @@ This module provides classes and methods to launch Redis.
 Redis cluster is used if the hostfile has many hosts
 """
 from jarvis_cd.basic.pkg import Application
+from jarvis_cd.basic.metrics import ycsb_parser
 from jarvis_util import *
 
 
@@ -84,12 +85,12 @@ class Ycsbc(Application):
         ]
         cmd = ' '.join(cmd)
         print(cmd)
-        self.exec = Exec(cmd,
+        Exec(cmd,
              LocalExecInfo(env=self.mod_env,
                            hostfile=self.jarvis.hostfile,
                            do_dbg=self.config['do_dbg'],
                            dbg_port=self.config['dbg_port'],
-                           collect_output=True))
+                           pipe_stdout=self.metric_path()))
 
     def stop(self):
         """
@@ -109,6 +110,14 @@ class Ycsbc(Application):
         """
         pass
 
+    def metric_parser(self):
+        """
+        Throughput (ops/s) and latency (us) of each operation
+
+        :return: MetricParser
+        """
+        return ycsb_parser()
+
     def _get_stat(self, stat_dict):
         """
         Get statistics from the application.
@@ -116,8 +125,4 @@ class Ycsbc(Application):
         :param stat_dict: A dictionary of statistics.
         :return: None
         """
-        output = self.exec.stdout['localhost']
-        if 'throughput(ops/sec)' in output:
-            throughput = re.search(r'throughput\(ops\/sec\): ([0-9.]+)', output).group(1)
-            stat_dict[f'{self.pkg_id}.throughput'] = throughput
         stat_dict[f'{self.pkg_id}.runtime'] = self.start_time
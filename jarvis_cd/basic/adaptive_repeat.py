@@ -0,0 +1,116 @@
+"""
+This module decides how many times to repeat each point of a pipeline
+sweep. Instead of a fixed number of repetitions, a point is repeated
+until the confidence interval of a target metric is narrow enough
+relative to its mean (or until a maximum number of repetitions).
+"""
+
+from statistics import NormalDist, mean, stdev
+import math
+
+
+def t_quantile(p, df):
+    """
+    The quantile function of Student's t-distribution. Exact for 1 and 2
+    degrees of freedom, otherwise a Cornish-Fisher expansion around the
+    normal quantile (accurate to ~0.1% for df >= 3).
+
+    :param p: The probability (0 < p < 1)
+    :param df: The degrees of freedom
+    :return: float
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - .5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    return (z +
+            (z ** 3 + z) / (4 * df) +
+            (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2) +
+            (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) /
+            (384 * df ** 3) +
+            (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 -
+             945 * z) / (92160 * df ** 4))
+
+
+def confidence_interval(vals, confidence=.95):
+    """
+    The confidence interval of the mean of a sample
+
+    :param vals: The sample (at least 2 values)
+    :param confidence: The confidence level
+    :return: (mean, half-width of the interval)
+    """
+    avg = mean(vals)
+    if len(vals) < 2:
+        return avg, math.inf
+    t = t_quantile((1 + confidence) / 2, len(vals) - 1)
+    return avg, t * stdev(vals) / math.sqrt(len(vals))
+
+
+class AdaptiveRepeat:
+    """
+    Tracks a metric over the repetitions of each point of a sweep
+    """
+
+    def __init__(self, metric, rel_ci=.05, confidence=.95, min_repeat=3,
+                 max_repeat=10):
+        """
+        Initialize the repetition policy
+
+        :param metric: The stat to measure (e.g., ior.write_bw)
+        :param rel_ci: The target half-width of the confidence interval,
+        relative to the mean (e.g., .05 for +/- 5%)
+        :param confidence: The confidence level of the interval
+        :param min_repeat: The minimum number of repetitions of a point
+        :param max_repeat: The maximum number of repetitions of a point
+        """
+        if min_repeat < 2:
+            raise Exception('adaptive repeat requires min_repeat >= 2')
+        if max_repeat < min_repeat:
+            raise Exception('max_repeat must be at least min_repeat')
+        self.metric = metric
+        self.rel_ci = rel_ci
+        self.confidence = confidence
+        self.min_repeat = min_repeat
+        self.max_repeat = max_repeat
+        # The values of the metric for each point
+        self.samples = {}
+
+    def add(self, point, stat_dict):
+        """
+        Record the metric of a completed run
+
+        :param point: A hashable identifier of the point
+        :param stat_dict: The stats of the run
+        :return: None
+        """
+        val = stat_dict.get(self.metric)
+        if isinstance(val, (int, float)) and not isinstance(val, bool) \
+                and math.isfinite(val):
+            self.samples.setdefault(point, []).append(val)
+
+    def interval(self, point):
+        """
+        :param point: A hashable identifier of the point
+        :return: (mean, half-width) or None if there are too few runs
+        """
+        vals = self.samples.get(point, [])
+        if len(vals) < 2:
+            return None
+        return confidence_interval(vals, self.confidence)
+
+    def converged(self, point):
+        """
+        Whether a point needs no more repetitions
+
+        :param point: A hashable identifier of the point
+        :return: bool
+        """
+        vals = self.samples.get(point, [])
+        if len(vals) < self.min_repeat:
+            return False
+        avg, half_width = confidence_interval(vals, self.confidence)
+        if avg == 0:
+            return half_width == 0
+        return half_width / abs(avg) <= self.rel_ci
@@ -0,0 +1,197 @@
+"""
+This module executes a script of jarvis commands in one process. The
+pipelines loaded by the commands stay in memory and are shared by all
+commands of the script. Saving the pipelines and the jarvis configuration
+is deferred until every command succeeded, so building a pipeline is one
+load and one save. If a command fails, nothing is saved.
+"""
+
+import tempfile
+import shutil
+import shlex
+import sys
+import os
+
+
+def read_batch(path):
+    """
+    Parse a batch script. Each line is a jarvis command (the leading
+    "jarvis" is optional). Blank lines and comments (#) are ignored and
+    lines ending with a backslash continue on the next line.
+
+    :param path: The script or - for stdin
+    :return: A list of commands (each a list of arguments)
+    """
+    if path == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path, 'r', encoding='utf-8') as fp:
+            text = fp.read()
+    cmds = []
+    for line in text.replace('\\\n', ' ').splitlines():
+        argv = shlex.split(line, comments=True)
+        if argv and argv[0] == 'jarvis':
+            argv = argv[1:]
+        if argv:
+            cmds.append(argv)
+    return cmds
+
+
+class Batch:
+    """
+    The pipelines and deferred saves of a batch script
+    """
+
+    def __init__(self, jarvis):
+        """
+        Initialize the batch
+
+        :param jarvis: The JarvisManager
+        """
+        self.jarvis = jarvis
+        # The pipelines loaded or created by the batch (global_id -> pkg)
+        self.pipelines = {}
+        # The pipelines which did not exist before the batch
+        self.created = set()
+        # The pipelines to save when the batch succeeds
+        self.dirty = {}
+        # Whether to save the jarvis configuration
+        self.save_manager = False
+        # Directories being replaced -> the directory holding the original
+        self.stashed = {}
+
+    def get(self, global_id):
+        """
+        Get a pipeline loaded or created by the batch
+
+        :param global_id: The id of the pipeline
+        :return: Pipeline or None
+        """
+        return self.pipelines.get(global_id)
+
+    def add(self, pipeline, created=False):
+        """
+        Keep a pipeline in memory for the rest of the batch
+
+        :param pipeline: The pipeline
+        :param created: Whether the pipeline was created (not loaded)
+        :return: None
+        """
+        if created and pipeline.global_id not in self.pipelines:
+            self.created.add(pipeline.global_id)
+        self.pipelines[pipeline.global_id] = pipeline
+
+    def forget(self, global_id):
+        """
+        Drop a pipeline (e.g., after it was destroyed) and its pending save
+
+        :param global_id: The id of the pipeline
+        :return: None
+        """
+        self.pipelines.pop(global_id, None)
+        self.dirty.pop(global_id, None)
+
+    def defer(self, pipeline):
+        self.dirty[pipeline.global_id] = pipeline
+
+    def stash(self, path):
+        """
+        Move a directory aside so that it can be rebuilt. The original is
+        restored if the batch fails and removed once the batch succeeds.
+
+        :param path: The directory
+        :return: None
+        """
+        if path in self.stashed:
+            # A rebuild made earlier in this batch
+            shutil.rmtree(path, ignore_errors=True)
+            return
+        if not os.path.exists(path):
+            return
+        stash_dir = tempfile.mkdtemp(prefix=f'.{os.path.basename(path)}.',
+                                     dir=os.path.dirname(path))
+        os.replace(path, os.path.join(stash_dir, 'stash'))
+        self.stashed[path] = stash_dir
+
+    def __enter__(self):
+        if self.jarvis.batch is not None:
+            raise Exception('Batches cannot be nested')
+        self.jarvis.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.jarvis.batch = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def run(self, cmds, handler):
+        """
+        Execute the commands of a batch and save the result
+
+        :param cmds: The commands (each a list of arguments)
+        :param handler: A function which executes a command given its
+        arguments (e.g., by running the jarvis argument parser)
+        :return: None
+        """
+        try:
+            with self:
+                for i, argv in enumerate(cmds):
+                    self._run_cmd(i, argv, handler)
+        except Exception:
+            print('The batch failed. Nothing was saved.', file=sys.stderr)
+            raise
+
+    @staticmethod
+    def _run_cmd(i, argv, handler):
+        if argv[0] in ['batch', 'daemon']:
+            raise Exception(f'jarvis {argv[0]} cannot be used in a batch')
+        try:
+            handler(argv)
+        except SystemExit as e:
+            if e.code not in [None, 0]:
+                raise Exception(f'Command {i + 1} ({shlex.join(argv)}) '
+                                f'exited with {e.code}') from e
+        except Exception as e:
+            raise Exception(f'Command {i + 1} ({shlex.join(argv)}) '
+                            f'failed: {e}') from e
+
+    def commit(self):
+        """
+        Save the pipelines and the jarvis configuration
+
+        :return: None
+        """
+        for pipeline in self.dirty.values():
+            pipeline.save()
+        if self.save_manager:
+            self.jarvis.save()
+        for stash_dir in self.stashed.values():
+            shutil.rmtree(stash_dir, ignore_errors=True)
+        self.dirty = {}
+        self.save_manager = False
+        self.stashed = {}
+
+    def rollback(self):
+        """
+        Discard the pending saves. The directories of pipelines created
+        by the batch (and never saved) are removed, and the directories
+        stashed by the batch are restored.
+
+        :return: None
+        """
+        for global_id in self.created:
+            pipeline = self.pipelines.get(global_id)
+            if pipeline is not None and \
+                    not pipeline._has_config():  # pylint: disable=W0212
+                shutil.rmtree(pipeline.config_dir, ignore_errors=True)
+        for path, stash_dir in self.stashed.items():
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(os.path.join(stash_dir, 'stash'), path)
+            shutil.rmtree(stash_dir, ignore_errors=True)
+        self.pipelines = {}
+        self.created = set()
+        self.dirty = {}
+        self.save_manager = False
+        self.stashed = {}
@@ -0,0 +1,269 @@
+"""
+This module provides a cache of build directories for pkgs which compile
+code while configuring. A build is keyed by a hash of its inputs (the
+revision of the source tree, build options, environment, and compiler),
+so reconfiguring a pkg with different runtime parameters reuses the
+existing build. The cache is shared by all pipelines and the least
+recently used builds are evicted when it exceeds its maximum size.
+"""
+
+from jarvis_util.serialize.yaml_file import YamlFile
+from contextlib import contextmanager
+import subprocess
+import hashlib
+import shutil
+import fcntl
+import json
+import time
+import os
+
+# The files which identify the revision of a source tree that is not a git
+# repo. Other files (e.g., objects, executables, and generated files) may
+# be produced by in-source builds, so they are not hashed.
+SOURCE_EXTS = ('.c', '.h', '.cc', '.cpp', '.cxx', '.hpp', '.hh', '.hxx',
+               '.f', '.F', '.for', '.f90', '.F90', '.f95', '.F95', '.f03',
+               '.F03', '.inc', '.cu', '.cuh', '.py', '.sh', '.cmake', '.in',
+               '.mk')
+SOURCE_NAMES = ('Makefile', 'makefile', 'GNUmakefile', 'CMakeLists.txt',
+                'configure')
+
+
+def source_revision(src_dir):
+    """
+    Identify the state of a source tree. For git repos, this is the
+    current commit plus the hash of uncommitted changes to tracked files.
+    Otherwise, it is a hash of the sizes and modification times of the
+    source files (see SOURCE_EXTS).
+
+    :param src_dir: The root of the source tree
+    :return: str
+    """
+    if os.path.exists(os.path.join(src_dir, '.git')):
+        try:
+            head = subprocess.run(['git', '-C', src_dir, 'rev-parse', 'HEAD'],
+                                  capture_output=True, text=True,
+                                  check=True).stdout.strip()
+            diff = subprocess.run(['git', '-C', src_dir, 'diff', 'HEAD'],
+                                  capture_output=True, check=True).stdout
+            return f'{head}-{hashlib.sha256(diff).hexdigest()[:16]}'
+        except (OSError, subprocess.CalledProcessError):
+            pass
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(src_dir):
+        dirs[:] = sorted(d for d in dirs
+                         if not d.startswith('.') and d != 'build')
+        for file_name in sorted(files):
+            if not file_name.endswith(SOURCE_EXTS) and \
+                    file_name not in SOURCE_NAMES:
+                continue
+            path = os.path.join(root, file_name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'
+                          .encode('utf-8'))
+    return digest.hexdigest()
+
+
+def compiler_info(env):
+    """
+    Identify the compilers used by a build
+
+    :param env: The environment the build executes with
+    :return: dict
+    """
+    path = env.get('PATH', os.environ.get('PATH'))
+    info = {}
+    for var, default in [('CC', 'cc'), ('CXX', 'c++'), ('FC', 'gfortran'),
+                         ('MPICC', 'mpicc')]:
+        compiler = env.get(var, default)
+        info[var] = shutil.which(compiler, path=path) or compiler
+    return info
+
+
+class BuildCache:
+    """
+    A size-bounded cache of build directories
+    """
+
+    def __init__(self, cache_dir, max_size=32 * (1 << 30)):
+        """
+        Initialize the cache
+
+        :param cache_dir: Where builds are stored
+        :param max_size: The maximum total size of all builds (bytes)
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.index_path = os.path.join(cache_dir, 'index.yaml')
+
+    def _lock_path(self, name):
+        return os.path.join(self.cache_dir, f'.{name}.lock')
+
+    @contextmanager
+    def lock(self, name='index', blocking=True):
+        """
+        Acquire an exclusive lock on the cache (or an entry of it). The
+        holder of the lock of an entry may remove its lock file.
+
+        :param name: The name of the lock
+        :param blocking: Whether to wait for the lock
+        :return: Whether the lock was acquired
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        lock_path = self._lock_path(name)
+        flags = fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        while True:
+            with open(lock_path, 'a', encoding='utf-8') as fp:
+                try:
+                    fcntl.flock(fp, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    # The lock file may have been removed by the previous
+                    # holder, in which case the lock must be taken again
+                    if os.stat(lock_path).st_ino != \
+                            os.fstat(fp.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+                return
+
+    def _remove_entry(self, entry):
+        """
+        Remove the directory and lock file of an entry. The lock of the
+        entry must be held.
+
+        :param entry: The entry
+        :return: None
+        """
+        shutil.rmtree(os.path.join(self.cache_dir, entry),
+                      ignore_errors=True)
+        try:
+            os.remove(self._lock_path(entry))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def get_key(inputs):
+        text = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        return YamlFile(self.index_path).load() or {}
+
+    def _save_index(self, index):
+        YamlFile(self.index_path).save(index)
+
+    def build(self, name, inputs, build_fn, log=None, outputs=None):
+        """
+        Get the build directory for a set of build inputs. If no build
+        exists for these inputs, build_fn is called to create it.
+
+        :param name: The name of the software being built (e.g., gadget2)
+        :param inputs: A dict of everything the build depends on
+        :param build_fn: A function taking the build directory as input
+        :param log: A function used to print progress
+        :param outputs: Files the build must have produced, relative to the
+        build directory or absolute (e.g., for in-source builds). A cached
+        build is redone if any of them is missing.
+        :return: The build directory
+        """
+        entry = f'{name}-{self.get_key(inputs)}'
+        entry_dir = os.path.join(self.cache_dir, entry)
+        build_dir = os.path.join(entry_dir, 'build')
+        complete_path = os.path.join(entry_dir, '.complete')
+        if outputs is None:
+            outputs = []
+        outputs = [os.path.join(build_dir, path) for path in outputs]
+        # Only one process builds a given entry at a time
+        with self.lock(entry):
+            if os.path.exists(complete_path) and \
+                    all(os.path.exists(path) for path in outputs):
+                if log is not None:
+                    log(f'Reusing cached build: {build_dir}')
+                with self.lock():
+                    index = self._load_index()
+                    index.setdefault(entry, {'size': 0})
+                    index[entry]['last_used'] = time.time()
+                    self._save_index(index)
+                return build_dir
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.makedirs(build_dir)
+            if log is not None:
+                log(f'Building {name} in: {build_dir}')
+            build_fn(build_dir)
+            missing = [path for path in outputs if not os.path.exists(path)]
+            if missing:
+                raise Exception(f'The build of {name} did not produce: '
+                                f'{", ".join(missing)}')
+            with open(complete_path, 'w', encoding='utf-8') as fp:
+                json.dump(inputs, fp, sort_keys=True, default=str)
+        with self.lock():
+            index = self._load_index()
+            index[entry] = {
+                'size': self.dir_size(entry_dir),
+                'last_used': time.time()
+            }
+            self._evict(index, keep=entry)
+            self._save_index(index)
+        return build_dir
+
+    def _evict(self, index, keep):
+        """
+        Remove the least recently used builds until the cache fits
+
+        :param index: The cache index
+        :param keep: The entry which must not be evicted
+        :return: None
+        """
+        total = sum(info['size'] for info in index.values())
+        lru = sorted(index, key=lambda entry: index[entry]['last_used'])
+        for entry in lru:
+            if total <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            # Entries being used by another process are skipped
+            with self.lock(entry, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                self._remove_entry(entry)
+            total -= index.pop(entry)['size']
+
+    def clear(self):
+        """
+        Remove all builds
+
+        :return: None
+        """
+        with self.lock():
+            index = self._load_index()
+            for entry in list(index):
+                with self.lock(entry, blocking=False) as acquired:
+                    if not acquired:
+                        continue
+                    self._remove_entry(entry)
+                index.pop(entry)
+            self._save_index(index)
+
+    @staticmethod
+    def dir_size(path):
+        size = 0
+        for root, dirs, files in os.walk(path):
+            for file_name in files:
+                try:
+                    size += os.lstat(os.path.join(root, file_name)).st_size
+                except OSError:
+                    pass
+        return size
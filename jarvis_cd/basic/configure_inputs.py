@@ -0,0 +1,363 @@
+"""
+This module records the inputs a pkg's _configure consumed: the
+parameters and environment variables it read, whether it used the
+hostfile, and the resource graph queries it made. On a later update, a
+pkg is only reconfigured if one of its recorded inputs changed. For
+example, changing the hostfile reconfigures the pkgs which generate host
+lists, but not a pkg which only reads its own parameters.
+
+A hostfile which is only passed to fs_plan.mkdir is not an input. The
+mkdir is recorded instead and replayed on the new hosts when the pkg is
+not reconfigured. Any other use of the hostfile object (reading its
+hosts, saving it, passing it to an exec info, ...) makes it an input.
+
+Inputs which are not read through the pkg's config, env, or jarvis
+manager are not recorded: os.environ, the config of other pkgs, and
+files read from outside the pkg's directory. The source files of the
+pkg (e.g., templates next to pkg.py) are covered by the pkg's static
+digest. Pkgs which read other inputs should set configure_cache to
+False.
+"""
+
+import threading
+import hashlib
+import json
+import os
+
+
+def _jsonable(val):
+    if hasattr(val, 'rows'):
+        return val.rows
+    if hasattr(val, 'to_dict'):
+        return val.to_dict()
+    if isinstance(val, (set, frozenset)):
+        return sorted(val, key=str)
+    return str(val)
+
+
+def digest(val):
+    """
+    A short hash of a (JSON-like) value
+
+    :param val: The value
+    :return: str
+    """
+    text = json.dumps(val, sort_keys=True, default=_jsonable)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def env_digest(env, key):
+    from jarvis_cd.basic.ssh_pool import strip_pool_path
+    val = env.get(key)
+    if key == 'PATH':
+        val = strip_pool_path(val)
+    return digest(val)
+
+
+def hostfile_digest(hostfile):
+    return digest([hostfile.path, list(hostfile.hosts)])
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class TrackedDict(dict):
+    """
+    A dict which records the keys read before they were written. Reading
+    every entry (e.g., iterating or copying) marks all keys as read.
+    """
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = set()
+        self.writes = set()
+        self.read_all = False
+
+    def _read(self, key):
+        if key not in self.writes:
+            self.reads.add(key)
+
+    def __getitem__(self, key):
+        self._read(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self._read(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self._read(key)
+        return super().__contains__(key)
+
+    def __setitem__(self, key, val):
+        self.writes.add(key)
+        super().__setitem__(key, val)
+
+    def __delitem__(self, key):
+        self.writes.add(key)
+        super().__delitem__(key)
+
+    def setdefault(self, key, default=None):
+        self._read(key)
+        self.writes.add(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._read(key)
+        self.writes.add(key)
+        return super().pop(key, *args)
+
+    def update(self, *args, **kwargs):
+        for key, val in dict(*args, **kwargs).items():
+            self[key] = val
+
+    def __iter__(self):
+        self.read_all = True
+        return super().__iter__()
+
+    def keys(self):
+        self.read_all = True
+        return super().keys()
+
+    def values(self):
+        self.read_all = True
+        return super().values()
+
+    def items(self):
+        self.read_all = True
+        return super().items()
+
+    def copy(self):
+        self.read_all = True
+        return dict(super().items())
+
+    def input_keys(self):
+        """
+        The keys whose values were read from the original dict
+
+        :return: set
+        """
+        if self.read_all:
+            return set(super().keys()) - self.writes | self.reads
+        return set(self.reads)
+
+
+class _TrackedHostfile:
+    """
+    Mixed into the class of the hostfile given to a pkg, so that every use
+    of the hostfile is recorded. The tracked hostfile shares its attributes
+    with the real one.
+    """
+
+    __slots__ = ()
+
+    def __getattribute__(self, name):
+        object.__getattribute__(self, '_input_trace').use_hostfile()
+        return super().__getattribute__(name)
+
+
+# Special methods are looked up on the class, bypassing __getattribute__
+_HOSTFILE_DUNDERS = ['__len__', '__iter__', '__getitem__', '__contains__',
+                     '__bool__', '__str__', '__repr__', '__eq__', '__hash__']
+_TRACKED_HOSTFILE_CLASSES = {}
+
+
+def _hostfile_dunder(name):
+    def dunder(self, *args):
+        object.__getattribute__(self, '_input_trace').use_hostfile()
+        return getattr(super(_TrackedHostfile, self), name)(*args)
+    return dunder
+
+
+def _track_hostfile(hostfile, trace):
+    """
+    Wrap a hostfile so that its uses are recorded in a trace
+
+    :param hostfile: The hostfile of the jarvis manager
+    :param trace: The InputTrace
+    :return: The tracked hostfile
+    """
+    cls = type(hostfile)
+    if not hasattr(hostfile, '__dict__'):
+        trace.use_hostfile()
+        return hostfile
+    if cls not in _TRACKED_HOSTFILE_CLASSES:
+        attrs = {name: _hostfile_dunder(name) for name in _HOSTFILE_DUNDERS
+                 if getattr(cls, name, None) is not None}
+        # The trace is kept out of the __dict__ shared with the hostfile
+        attrs['__slots__'] = ('_input_trace',)
+        _TRACKED_HOSTFILE_CLASSES[cls] = type(
+            f'Tracked{cls.__name__}', (_TrackedHostfile, cls), attrs)
+    tracked = object.__new__(_TRACKED_HOSTFILE_CLASSES[cls])
+    object.__setattr__(tracked, '__dict__', hostfile.__dict__)
+    object.__setattr__(tracked, '_input_trace', trace)
+    return tracked
+
+
+class _TrackedManager:
+    """
+    Records the hostfile and resource graph accesses of a pkg
+    """
+
+    def __init__(self, jarvis, trace):
+        object.__setattr__(self, '_jarvis', jarvis)
+        object.__setattr__(self, '_trace', trace)
+
+    def __getattr__(self, name):
+        jarvis = object.__getattribute__(self, '_jarvis')
+        trace = object.__getattribute__(self, '_trace')
+        if name == 'hostfile' and jarvis.hostfile is not None:
+            return _track_hostfile(jarvis.hostfile, trace)
+        if name in ['resource_graph', 'rg_index']:
+            return _TrackedResourceGraph(getattr(jarvis, name), name, trace)
+        return getattr(jarvis, name)
+
+    def __setattr__(self, name, val):
+        setattr(object.__getattribute__(self, '_jarvis'), name, val)
+
+
+class _TrackedResourceGraph:
+    """
+    Records the queries made to the resource graph
+    """
+
+    def __init__(self, rg, source, trace):
+        self._rg = rg
+        self._source = source
+        self._trace = trace
+
+    def __getattr__(self, name):
+        attr = getattr(self._rg, name)
+        if not callable(attr):
+            self._trace.add_query(self._source, name, None, attr)
+            return attr
+
+        def query(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            self._trace.add_query(self._source, name,
+                                  [list(args), kwargs], result)
+            return result
+        return query
+
+
+class _TrackedFsPlan:
+    """
+    Records the directories a pkg creates on every host
+    """
+
+    def __init__(self, plan, trace):
+        self._plan = plan
+        self._trace = trace
+
+    def mkdir(self, paths, hosts, env=None):
+        if isinstance(hosts, _TrackedHostfile):
+            # Passing the hostfile here is not a use of it
+            hosts = self._trace.jarvis.hostfile
+            with self._trace.lock:
+                self._trace.mkdirs.append(paths)
+        return self._plan.mkdir(paths, hosts, env)
+
+    def __getattr__(self, name):
+        return getattr(self._plan, name)
+
+
+class InputTrace:
+    """
+    The inputs consumed by one configure of a pkg
+    """
+
+    def __init__(self, jarvis):
+        """
+        Initialize the trace
+
+        :param jarvis: The JarvisManager
+        """
+        self.jarvis = jarvis
+        self.lock = threading.Lock()
+        # Whether the hostfile was used other than by fs_plan.mkdir
+        self.hostfile_used = False
+        self.queries = []
+        self.mkdirs = []
+
+    def manager(self):
+        return _TrackedManager(self.jarvis, self)
+
+    def fs_plan(self, plan):
+        return _TrackedFsPlan(plan, self)
+
+    def use_hostfile(self):
+        self.hostfile_used = True
+
+    def add_query(self, source, name, args, result):
+        try:
+            # Only queries whose arguments survive JSON can be re-run
+            replayable = json.loads(json.dumps(args)) == args
+        except TypeError:
+            replayable = False
+        with self.lock:
+            self.queries.append([source, name, args if replayable else None,
+                                 replayable, digest(result)])
+
+    def record(self, pkg, config_keys, env_keys, static):
+        """
+        Build the record of the inputs
+
+        :param pkg: The configured pkg
+        :param config_keys: The parameters read by _configure
+        :param env_keys: The environment variables read by _configure
+        :param static: The digest of the pkg's type, source, and dirs
+        :return: dict
+        """
+        inputs = {
+            'static': static,
+            'config': {key: digest(pkg.config.get(key))
+                       for key in sorted(config_keys, key=str)},
+            'env': {key: env_digest(pkg.env, key)
+                    for key in sorted(env_keys, key=str)},
+            'mkdirs': self.mkdirs,
+        }
+        if self.hostfile_used:
+            inputs['hostfile'] = hostfile_digest(self.jarvis.hostfile)
+        if self.queries:
+            inputs['rg'] = {
+                'stamp': file_stamp(self.jarvis.resource_graph_path),
+                'queries': self.queries
+            }
+        return inputs
+
+
+def inputs_changed(pkg, inputs, static):
+    """
+    Whether any input of a previous configure changed
+
+    :param pkg: The pkg
+    :param inputs: The recorded inputs (see InputTrace.record)
+    :param static: The current digest of the pkg's type, source, and dirs
+    :return: bool
+    """
+    if inputs['static'] != static:
+        return True
+    for key, val in inputs['config'].items():
+        if digest(pkg.config.get(key)) != val:
+            return True
+    for key, val in inputs['env'].items():
+        if env_digest(pkg.env, key) != val:
+            return True
+    if 'hostfile' in inputs and \
+            hostfile_digest(pkg.jarvis.hostfile) != inputs['hostfile']:
+        return True
+    if 'rg' in inputs and \
+            file_stamp(pkg.jarvis.resource_graph_path) != inputs['rg']['stamp']:
+        for source, name, args, replayable, val in inputs['rg']['queries']:
+            if not replayable:
+                return True
+            attr = getattr(getattr(pkg.jarvis, source), name)
+            result = attr(*args[0], **args[1]) if args is not None else attr
+            if digest(result) != val:
+                return True
+    return False
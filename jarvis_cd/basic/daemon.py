@@ -0,0 +1,441 @@
+"""
+This module implements an optional jarvis daemon. Every jarvis command
+normally re-reads the jarvis configuration, the resource graph, and the
+current pipeline, and re-imports the classes of its pkgs. The daemon is a
+long-running process which keeps these warm. The client (bin/jarvis)
+forwards a command to the daemon over a unix socket along with its
+stdin, stdout, and stderr. The daemon forks a child, which inherits the
+warm state, to execute the command, so a command behaves exactly as if it
+ran in-process. Warm state is invalidated when the files it was loaded
+from change. If the daemon is not running, the client executes the
+command in-process.
+
+The socket lives in a directory only the user can access
+($XDG_RUNTIME_DIR/jarvis-daemon if set). The client only forwards its
+command (along with its environment and file descriptors) to a daemon
+running as the same user.
+"""
+
+from jarvis_cd.basic.runtime_dir import runtime_dir, secure_dir
+
+import subprocess
+import threading
+import tempfile
+import traceback
+import getpass
+import select
+import signal
+import socket
+import struct
+import json
+import time
+import sys
+import os
+
+# The directory containing the socket, pid file, and log of the daemon.
+# Socket paths must be short (< 108 characters).
+DAEMON_ROOT = runtime_dir('jarvis-daemon', os.path.join(
+    tempfile.gettempdir(), f'jarvis-daemon-{getpass.getuser()}'))
+SOCK_PATH = os.path.join(DAEMON_ROOT, 'daemon.sock')
+PID_PATH = os.path.join(DAEMON_ROOT, 'daemon.pid')
+LOG_PATH = os.path.join(DAEMON_ROOT, 'daemon.log')
+
+
+def _peer_uid(sock):
+    """
+    The user of the process at the other end of a unix socket
+
+    :param sock: A connected unix socket
+    :return: int or None if the platform cannot tell
+    """
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                            struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', creds)
+    return uid
+
+
+def _connect():
+    if not os.path.exists(SOCK_PATH):
+        return None
+    try:
+        # Another user could otherwise replace the socket
+        secure_dir(DAEMON_ROOT, create=False)
+    except Exception as e:  # pylint: disable=broad-except
+        print(f'Not using the jarvis daemon: {e}', file=sys.stderr)
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SOCK_PATH)
+        # Commands run in-process on platforms which cannot verify that
+        # the daemon belongs to the current user
+        if _peer_uid(sock) != os.getuid():
+            raise OSError('The daemon is not run by the current user')
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def forward(argv):
+    """
+    Execute a command in the daemon, if it is running
+
+    :param argv: The arguments of the command (excluding the program)
+    :return: The exit code of the command or None if the command must
+    be executed in-process
+    """
+    if os.environ.get('JARVIS_NO_DAEMON'):
+        return None
+    sock = _connect()
+    if sock is None:
+        return None
+    with sock:
+        request = {'argv': argv, 'cwd': os.getcwd(),
+                   'env': dict(os.environ)}
+        try:
+            socket.send_fds(sock, [b'\0'], [0, 1, 2])
+            sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            reply = sock.makefile('rb').readline()
+        except KeyboardInterrupt:
+            # Closing the connection interrupts the command
+            return 130
+        except OSError:
+            return None
+    if not reply:
+        print('The jarvis daemon exited during the command', file=sys.stderr)
+        return 1
+    reply = json.loads(reply)
+    if reply.get('fallback'):
+        return None
+    return reply['exit_code']
+
+
+def status():
+    """
+    The pid of the daemon
+
+    :return: int or None if the daemon is not running
+    """
+    sock = _connect()
+    if sock is None:
+        return None
+    sock.close()
+    try:
+        with open(PID_PATH, 'r', encoding='utf-8') as fp:
+            return int(fp.read())
+    except (OSError, ValueError):
+        return None
+
+
+def start(script, timeout=10):
+    """
+    Start the daemon in the background
+
+    :param script: The jarvis executable
+    :param timeout: How long (seconds) to wait for the daemon to start
+    :return: The pid of the daemon
+    """
+    pid = status()
+    if pid is not None:
+        return pid
+    secure_dir(DAEMON_ROOT)
+    env = dict(os.environ)
+    env['JARVIS_NO_DAEMON'] = '1'
+    with open(LOG_PATH, 'a', encoding='utf-8') as log:
+        proc = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, script, 'daemon', 'run'],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=log, env=env,
+            start_new_session=True)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise Exception(f'The jarvis daemon failed to start. '
+                            f'See {LOG_PATH}')
+        pid = status()
+        if pid is not None:
+            return pid
+        time.sleep(.05)
+    raise Exception(f'The jarvis daemon did not start within {timeout}s')
+
+
+def stop(timeout=10):
+    """
+    Stop the daemon. Commands already being executed are not interrupted.
+
+    :param timeout: How long (seconds) to wait for the daemon to exit
+    :return: The pid of the stopped daemon or None if it was not running
+    """
+    pid = status()
+    if pid is None:
+        return None
+    os.kill(pid, signal.SIGTERM)
+    deadline = time.time() + timeout
+    while time.time() < deadline and os.path.exists(SOCK_PATH):
+        time.sleep(.05)
+    return pid
+
+
+class JarvisDaemon:
+    """
+    Executes forwarded jarvis commands in forked children of a process
+    which keeps the jarvis state warm
+    """
+
+    def __init__(self, handler):
+        """
+        Initialize the daemon
+
+        :param handler: A function which executes a command given its
+        arguments (e.g., by running the jarvis argument parser)
+        """
+        self.handler = handler
+        self.jarvis = None
+        self.server = None
+        # Kept across reloads of the jarvis manager
+        self.yaml_cache = {}
+        # The stamps of the files the jarvis manager was loaded from
+        self.manager_stamp = None
+        self.rg_stamp = None
+        self.index_stamp = None
+        # The modification time of each imported pkg module
+        self.module_mtimes = {}
+        # The (connection, pipe) of each command being waited on
+        self.waiting = set()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def log(self, msg):
+        print(f'[{time.strftime("%Y-%m-%d %H:%M:%S")}] {msg}', flush=True)
+
+    def refresh(self):
+        """
+        Invalidate the warm state whose files changed. Must be called
+        before forking a command.
+
+        :return: None
+        """
+        from jarvis_cd.basic.jarvis_manager import JarvisManager
+        jarvis = JarvisManager.get_instance()
+        manager_stamp = (self._stamp(jarvis.jarvis_conf_path),
+                         self._stamp(jarvis.jarvis_repos_path))
+        if self.manager_stamp is not None and \
+                manager_stamp != self.manager_stamp:
+            self.log('The jarvis configuration changed. Reloading.')
+            classes = jarvis.pkg_index.classes
+            JarvisManager.instance_ = None
+            jarvis = JarvisManager.get_instance()
+            if manager_stamp[1] == self.manager_stamp[1]:
+                jarvis.pkg_index.classes = classes
+        self.manager_stamp = manager_stamp
+        jarvis.yaml_cache = self.yaml_cache
+        self.jarvis = jarvis
+
+        rg_stamp = self._stamp(jarvis.resource_graph_path)
+        if rg_stamp != self.rg_stamp:
+            jarvis.resource_graph = None
+            self.rg_stamp = rg_stamp
+        index_stamp = self._stamp(jarvis.pkg_index.index_path)
+        if index_stamp != self.index_stamp:
+            jarvis.pkg_index.index = None
+            self.index_stamp = index_stamp
+
+        # Re-import pkgs whose source changed
+        for pkg_type, cls in list(jarvis.pkg_index.classes.items()):
+            module = sys.modules.get(cls.__module__)
+            path = getattr(module, '__file__', None)
+            stamp = self._stamp(path) if path else None
+            if self.module_mtimes.setdefault(cls.__module__, stamp) != stamp:
+                self.log(f'The pkg {pkg_type} changed. Reloading.')
+                del jarvis.pkg_index.classes[pkg_type]
+                sys.modules.pop(cls.__module__, None)
+                del self.module_mtimes[cls.__module__]
+
+    def warm(self):
+        """
+        Load the resource graph (and its index) and the current pipeline
+        (and the classes of its pkgs), so forked commands do not have to
+
+        :return: None
+        """
+        from jarvis_cd.basic.pkg import Pipeline
+        jarvis = self.jarvis
+        try:
+            if os.path.exists(jarvis.resource_graph_path):
+                jarvis.rg_index  # pylint: disable=pointless-statement
+            if jarvis.cur_pipeline is not None and \
+                    os.path.exists(f'{jarvis.config_dir}/'
+                                   f'{jarvis.cur_pipeline}'):
+                Pipeline().load()
+        except Exception:  # pylint: disable=broad-except
+            self.log(f'Failed to load the jarvis state:\n'
+                     f'{traceback.format_exc()}')
+
+    def serve(self):
+        """
+        Serve commands until the daemon is stopped
+
+        :return: None
+        """
+        secure_dir(DAEMON_ROOT)
+        if status() is not None:
+            raise Exception('The jarvis daemon is already running')
+        if os.path.exists(SOCK_PATH):
+            os.remove(SOCK_PATH)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(SOCK_PATH)
+        os.chmod(SOCK_PATH, 0o600)
+        self.server.listen(64)
+        with open(PID_PATH, 'w', encoding='utf-8') as fp:
+            fp.write(str(os.getpid()))
+        signal.signal(signal.SIGTERM, self._terminate)
+        self.log(f'Serving on {SOCK_PATH} (pid {os.getpid()})')
+        try:
+            self.refresh()
+            self.warm()
+            while True:
+                conn, _ = self.server.accept()
+                self._handle(conn)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.close()
+            for path in [SOCK_PATH, PID_PATH]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.log('Stopped')
+
+    @staticmethod
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt()
+
+    @staticmethod
+    def _reply(conn, reply):
+        try:
+            conn.sendall(json.dumps(reply).encode('utf-8') + b'\n')
+        except OSError:
+            pass
+
+    def _handle(self, conn):
+        """
+        Fork a child to execute a forwarded command
+
+        :param conn: The connection to the client
+        :return: None
+        """
+        fds = []
+        try:
+            _, fds, _, _ = socket.recv_fds(conn, 1, 3)
+            request = json.loads(conn.makefile('rb').readline())
+        except (OSError, ValueError):
+            request = None
+        # Clients of another user environment execute commands in-process
+        if request is None or len(fds) != 3 or \
+                _peer_uid(conn) != os.getuid() or \
+                request['env'].get('HOME') != os.environ.get('HOME'):
+            for fd in fds:
+                os.close(fd)
+            self._reply(conn, {'fallback': True})
+            conn.close()
+            return
+        self.refresh()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        done_r, done_w = os.pipe()
+        # The child only inherits the calling thread. The _wait threads
+        # of other commands block in select() and waitpid() without
+        # holding any state the child uses, but the child does inherit
+        # their connections and pipes. Forking under the lock gives the
+        # child a consistent set of them to close, so a command (or a
+        # process it leaves running) cannot hold another client's
+        # connection open.
+        with self.lock:
+            pid = os.fork()
+            if pid == 0:
+                os.close(done_r)
+                conn.close()
+                for other_conn, other_done_r in self.waiting:
+                    other_conn.close()
+                    os.close(other_done_r)
+                self._run(fds, request)
+            self.waiting.add((conn, done_r))
+        os.close(done_w)
+        for fd in fds:
+            os.close(fd)
+        threading.Thread(target=self._wait, args=(conn, pid, done_r),
+                         daemon=True).start()
+        # Warm the state for the next command while this one executes
+        self.warm()
+
+    def _run(self, fds, request):
+        """
+        Execute a command in the forked child. Never returns.
+
+        :param fds: The stdin, stdout, and stderr of the client
+        :param request: The arguments, cwd, and environment of the client
+        :return: None
+        """
+        exit_code = 1
+        try:
+            self.server.close()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            for i, fd in enumerate(fds):
+                os.dup2(fd, i)
+                os.close(fd)
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            sys.argv = ['jarvis'] + request['argv']
+            self.handler(request['argv'])
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None:
+                exit_code = 0
+            elif isinstance(e.code, int):
+                exit_code = e.code
+            else:
+                print(e.code, file=sys.stderr)
+        except BaseException:  # pylint: disable=broad-except
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(exit_code)  # pylint: disable=protected-access
+
+    def _wait(self, conn, pid, done_r):
+        """
+        Wait for a command to complete and send its exit code to the
+        client. The command is interrupted if the client exits first.
+
+        :param conn: The connection to the client
+        :param pid: The child executing the command
+        :param done_r: A pipe which is closed when the child exits
+        :return: None
+        """
+        watch = [conn, done_r]
+        while True:
+            readable, _, _ = select.select(watch, [], [])
+            if done_r in readable:
+                break
+            if conn in readable and not conn.recv(1):
+                os.kill(pid, signal.SIGINT)
+                watch.remove(conn)
+        _, wait_status = os.waitpid(pid, 0)
+        exit_code = os.waitstatus_to_exitcode(wait_status)
+        if exit_code < 0:
+            exit_code = 128 - exit_code
+        self._reply(conn, {'exit_code': exit_code})
+        with self.lock:
+            self.waiting.discard((conn, done_r))
+            os.close(done_r)
+            conn.close()
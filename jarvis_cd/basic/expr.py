@@ -0,0 +1,124 @@
+"""
+This module evaluates the expressions used in sweep definitions
+(constraints and derived variables). Expressions are Python syntax
+restricted to arithmetic, comparisons, boolean logic, conditionals, and
+a few functions. Variables are written as pkg_id.var_name (e.g.,
+ior.nprocs). Each expression is validated and compiled once, so
+evaluating it for every point of a sweep is cheap.
+"""
+
+import ast
+import math
+import re
+
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def size(text):
+    """
+    Convert a size string (e.g., 4k, 1g) to bytes
+
+    :param text: The size
+    :return: int
+    """
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = re.fullmatch(r'\s*([0-9.]+)\s*([kmgt]?)b?\s*', str(text).lower())
+    if match is None:
+        raise Exception(f'Invalid size: {text}')
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+FUNCTIONS = {
+    'min': min, 'max': max, 'abs': abs, 'round': round,
+    'int': int, 'float': float, 'str': str, 'len': len,
+    'ceil': math.ceil, 'floor': math.floor, 'log2': math.log2,
+    'sqrt': math.sqrt, 'size': size,
+}
+
+NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.BinOp, ast.Add,
+    ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.UnaryOp, ast.USub, ast.UAdd, ast.Not, ast.Compare, ast.Eq,
+    ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.IfExp, ast.Call, ast.Name, ast.Load, ast.Constant, ast.Attribute,
+    ast.List, ast.Tuple,
+)
+
+
+class _Rename(ast.NodeTransformer):
+    """
+    Replace each variable with a unique python identifier
+    """
+
+    def __init__(self):
+        self.vars = {}
+
+    def _rename(self, node, var):
+        if var not in self.vars:
+            self.vars[var] = f'_v{len(self.vars)}'
+        return ast.copy_location(ast.Name(id=self.vars[var], ctx=ast.Load()),
+                                 node)
+
+    def visit_Attribute(self, node):
+        if not isinstance(node.value, ast.Name):
+            raise Exception('Only pkg_id.var_name attributes are allowed')
+        return self._rename(node, f'{node.value.id}.{node.attr}')
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or \
+                node.func.id not in FUNCTIONS or node.keywords:
+            raise Exception(f'Unsupported function call: '
+                            f'{ast.unparse(node.func)}')
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        if node.id in FUNCTIONS:
+            raise Exception(f'{node.id} is a function')
+        return self._rename(node, node.id)
+
+
+class Expr:
+    """
+    A compiled sweep expression
+    """
+
+    def __init__(self, text):
+        """
+        Validate and compile an expression
+
+        :param text: The expression (e.g., ior.ppn <= ior.nprocs)
+        """
+        self.text = str(text)
+        try:
+            tree = ast.parse(self.text, mode='eval')
+        except SyntaxError as e:
+            raise Exception(f'Invalid expression "{self.text}": {e.msg}')
+        for node in ast.walk(tree):
+            if not isinstance(node, NODES):
+                raise Exception(f'Invalid expression "{self.text}": '
+                                f'{node.__class__.__name__} is not allowed')
+        rename = _Rename()
+        tree = ast.fix_missing_locations(rename.visit(tree))
+        # The variables referenced by the expression (var -> identifier)
+        self.vars = rename.vars
+        self.code = compile(tree, '<sweep>', 'eval')
+
+    def eval(self, lookup):
+        """
+        Evaluate the expression
+
+        :param lookup: A function mapping a variable name to its value
+        :return: The value of the expression
+        """
+        scope = {'__builtins__': {}, **FUNCTIONS}
+        for var, ident in self.vars.items():
+            scope[ident] = lookup(var)
+        try:
+            return eval(self.code, scope)  # pylint: disable=eval-used
+        except Exception as e:
+            raise Exception(f'Failed to evaluate "{self.text}": {e}')
+
+    def __repr__(self):
+        return self.text
@@ -5,19 +5,21 @@ of all relevant paths needed by most jarvis repos.
 
 import pathlib
 import os
-from jarvis_util.shell.filesystem import Rm
 from jarvis_util.serialize.yaml_file import YamlFile
-from jarvis_util.util.import_mod import load_class
 from jarvis_util.util.naming import to_camel_case
 from jarvis_util.util.expand_env import expand_env
 from jarvis_util.util.hostfile import Hostfile
-from jarvis_util.introspect.system_info import ResourceGraph
-from jarvis_util.shell.filesystem import Mkdir
-from jarvis_util.shell.pssh_exec import PsshExecInfo
-from jarvis_util.shell.local_exec import LocalExecInfo
+from jarvis_cd.basic.pkg_index import PkgIndex
 import getpass
 import yaml
 import shutil
+import copy
+import time
+
+# NOTE: The resource graph, filesystem and pssh modules of jarvis_util are
+# imported within the methods that use them. Every CLI command constructs
+# the JarvisManager, so keeping this module light keeps simple commands
+# (e.g., jarvis cd) fast.
 
 
 class JarvisManager:
@@ -63,8 +65,29 @@ class JarvisManager:
         #  The path to the jarvis resource graph (global across users)
         self.resource_graph_path = os.path.join(self.local_config_dir, 
                                                 'resource_graph.yaml')
-        # The Jarvis resource graph (global across users)
-        self.resource_graph = None
+        # The Jarvis resource graph (global across users). Loaded on first use.
+        self._resource_graph = None
+        # Whether the resource graph must be saved
+        self.resource_graph_dirty = False
+        # The indexed view of the resource graph. Built on first use.
+        self._rg_index = None
+        # When each host of the resource graph was introspected
+        self._rg_hosts = None
+        # The config and repos as of the last load or save
+        self._saved_state = None
+        # The cache of pkg builds (shared across pipelines)
+        self._build_cache = None
+        # The cache of library locations found by Pkg.find_library
+        self._lib_cache = None
+        # The index of pkgs provided by each repo
+        self.pkg_index = PkgIndex(os.path.join(self.local_config_dir,
+                                               'pkg_index.yaml'))
+        # Parsed YAML files (path -> (stamp, parse time, data)). Disabled
+        # unless set to a dict (e.g., by the jarvis daemon).
+        self.yaml_cache = None
+        # The batch being executed (see jarvis_cd.basic.batch). Saves are
+        # deferred until the batch completes.
+        self.batch = None
         self.hostfile = None
         self.repos = []
         self.load()
@@ -95,6 +118,7 @@ class JarvisManager:
             'HOSTFILE': None,
             'CUR_PIPELINE': None,
         }
+        from jarvis_util.introspect.system_info import ResourceGraph
         self.add_repo(self.builtin_dir, True)
         self.resource_graph = ResourceGraph()
         self.hostfile = Hostfile()
@@ -129,18 +153,19 @@ class JarvisManager:
         self.env_dir = os.path.join(self.config_dir, 'env')
         os.makedirs(f'{self.config_dir}', exist_ok=True)
         os.makedirs(f'{self.env_dir}', exist_ok=True)
+        # The private directory is created on the hosts lazily, when a pkg
+        # is configured (see SimplePkg.update_config). This avoids a
+        # parallel-ssh for commands which never touch private storage.
         self.private_dir = expand_env(self.jarvis_conf['PRIVATE_DIR'])
-        Mkdir(self.private_dir,
-              PsshExecInfo(hostfile=self.hostfile))
         if self.jarvis_conf['SHARED_DIR'] is not None:
             self.shared_dir = expand_env(self.jarvis_conf['SHARED_DIR'])
             os.makedirs(f'{self.shared_dir}', exist_ok=True)
-        # Read global resource graph
-        if os.path.exists(self.resource_graph_path):
-            self.resource_graph = ResourceGraph().load(self.resource_graph_path)
-        else:
-            self.resource_graph = ResourceGraph()
+        # The global resource graph is read on first access
+        self._resource_graph = None
+        self._rg_index = None
+        self.resource_graph_dirty = False
         self.cur_pipeline = self.jarvis_conf['CUR_PIPELINE']
+        self._saved_state = copy.deepcopy((self.jarvis_conf, self.repos))
         try:
             self.hostfile = Hostfile(hostfile=self.jarvis_conf['HOSTFILE'])
         except Exception as e:
@@ -148,24 +173,152 @@ class JarvisManager:
             self.hostfile = Hostfile()
         return self
 
+    @property
+    def resource_graph(self):
+        """
+        The global resource graph. It is only parsed the first time it
+        is needed.
+
+        :return: ResourceGraph
+        """
+        if self._resource_graph is None:
+            from jarvis_util.introspect.system_info import ResourceGraph
+            if os.path.exists(self.resource_graph_path):
+                self._resource_graph = ResourceGraph().load(
+                    self.resource_graph_path)
+            else:
+                self._resource_graph = ResourceGraph()
+        return self._resource_graph
+
+    @resource_graph.setter
+    def resource_graph(self, resource_graph):
+        self._resource_graph = resource_graph
+        self._rg_index = None
+        self.resource_graph_dirty = resource_graph is not None
+
+    @property
+    def rg_index(self):
+        """
+        The indexed view of the resource graph, which pkgs use to query
+        it. It is built on first use and dropped when the resource graph
+        changes.
+
+        :return: ResourceGraphIndex
+        """
+        if self._rg_index is None:
+            from jarvis_cd.basic.rg_index import ResourceGraphIndex
+            self._rg_index = ResourceGraphIndex(self.resource_graph)
+        return self._rg_index
+
+    @property
+    def rg_hosts(self):
+        """
+        When each host of the resource graph was introspected (see
+        resource_graph_build)
+
+        :return: ResourceGraphHosts
+        """
+        if self._rg_hosts is None:
+            from jarvis_cd.basic.rg_build import ResourceGraphHosts
+            self._rg_hosts = ResourceGraphHosts(
+                os.path.join(self.local_config_dir,
+                             'resource_graph_hosts.yaml'))
+        return self._rg_hosts
+
+    def resource_graph_changed(self):
+        """
+        Mark the resource graph as modified in place, so that it is saved
+        and its index is rebuilt
+
+        :return: None
+        """
+        self.resource_graph_dirty = True
+        self._rg_index = None
+
+    @property
+    def lib_cache(self):
+        """
+        The cache of library locations
+
+        :return: LibraryCache
+        """
+        if self._lib_cache is None:
+            from jarvis_cd.basic.lib_cache import LibraryCache
+            self._lib_cache = LibraryCache(
+                os.path.join(self.local_config_dir, 'lib_cache.yaml'))
+        return self._lib_cache
+
+    @property
+    def build_cache(self):
+        """
+        The cache of pkg builds. It is stored in the shared directory
+        (if there is one), so that builds are visible to all hosts. Its
+        size is bounded by BUILD_CACHE_GB in the jarvis config.
+
+        :return: BuildCache
+        """
+        if self._build_cache is None:
+            from jarvis_cd.basic.build_cache import BuildCache
+            base_dir = self.shared_dir
+            if base_dir is None:
+                base_dir = self.private_dir
+            max_gb = self.jarvis_conf.get('BUILD_CACHE_GB', 32)
+            self._build_cache = BuildCache(
+                os.path.join(base_dir, '.build_cache'),
+                int(max_gb * (1 << 30)))
+        return self._build_cache
+
+    def load_yaml(self, path):
+        """
+        Load a YAML file. When the YAML cache is enabled, a file is only
+        parsed again if it changed since it was last parsed.
+
+        :param path: The YAML file
+        :return: The parsed data (a private copy)
+        """
+        if self.yaml_cache is None:
+            return YamlFile(path).load()
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        entry = self.yaml_cache.get(path)
+        # Timestamps are coarse, so a file modified shortly before it was
+        # parsed may change again without changing its stamp
+        if entry is None or entry[0] != stamp or \
+                entry[1] - stat.st_mtime_ns < 2 * 10 ** 9:
+            entry = (stamp, time.time_ns(), YamlFile(path).load())
+            self.yaml_cache[path] = entry
+        return copy.deepcopy(entry[2])
+
     def save(self):
         """
         Save the jarvis config to config/jarvis_config.yaml
 
         :return: None
         """
+        if self.batch is not None:
+            self.batch.save_manager = True
+            return
         # Update jarvis conf
         if self.jarvis_conf:
             self.jarvis_conf['CUR_PIPELINE'] = self.cur_pipeline
             self.jarvis_conf['HOSTFILE'] = self.hostfile.path
+        # Save global resource graph (only if it was modified)
+        if self._resource_graph and self.resource_graph_dirty:
+            self._resource_graph.save(self.resource_graph_path)
+            if self._rg_hosts is not None and \
+                    self._rg_hosts.entries is not None:
+                self._rg_hosts.save()
+            self.resource_graph_dirty = False
+        # Only rewrite the repos and conf if they changed
+        state = (self.jarvis_conf, self.repos)
+        if state == self._saved_state:
+            return
         # Update repos
         YamlFile(self.jarvis_repos_path).save({'REPOS': self.repos})
-        # Save global resource graph
-        if self.resource_graph:
-            self.resource_graph.save(self.resource_graph_path)
         # Save global and per-user conf
         if self.jarvis_conf:
             YamlFile(self.jarvis_conf_path).save(self.jarvis_conf)
+        self._saved_state = copy.deepcopy(state)
 
     def set_hostfile(self, path):
         """
@@ -202,6 +355,7 @@ class JarvisManager:
 
         rg_path = f'{self.builtin_dir}/resource_graph/{machine}.yaml'
         if os.path.exists(rg_path):
+            from jarvis_util.introspect.system_info import ResourceGraph
             self.resource_graph = ResourceGraph().load(rg_path)
             new_rg_path = f'{self.local_config_dir}/resource_graph.yaml'
             self.resource_graph.save(new_rg_path)
@@ -222,6 +376,9 @@ class JarvisManager:
 
         :return: None
         """
+        from jarvis_util.shell.filesystem import Rm
+        from jarvis_util.shell.pssh_exec import PsshExecInfo
+        from jarvis_util.shell.local_exec import LocalExecInfo
         Rm(self.shared_dir, LocalExecInfo())
         Rm(self.private_dir, PsshExecInfo(
             hostfile=self.hostfile))
@@ -243,22 +400,53 @@ class JarvisManager:
         print("net:")
         self.resource_graph.print_df(self.resource_graph.net)
 
-    def resource_graph_build(self, net_sleep):
+    def resource_graph_build(self, net_sleep, incremental=False, ttl=None,
+                             max_workers=16):
         """
         Introspect the system and construct a resource graph.
 
+        :param net_sleep: How long to sleep in network tests
+        :param incremental: Only introspect the hosts which are not in the
+        resource graph yet (or stale) and merge them into it. Hosts are
+        introspected concurrently, each with its networks tested against
+        a host already in the graph (see rg_build).
+        :param ttl: The age (seconds) after which a host is introspected
+        again by an incremental build. None means never.
+        :param max_workers: The maximum number of hosts to introspect at
+        once in an incremental build
         :return: None
         """
+        from jarvis_cd.basic.rg_build import build_incremental, \
+            host_row_names
+        hosts = self.hostfile.hosts
+        if incremental:
+            built, failed = build_incremental(
+                self.resource_graph, self.rg_hosts, hosts, net_sleep, ttl,
+                max_workers)
+            if built:
+                self.resource_graph_changed()
+            print(f'Introspected {len(built)} of {len(hosts)} hosts')
+            for host, err in failed.items():
+                print(f'Failed to introspect {host}: {err}')
+            return
+        from jarvis_util.introspect.system_info import ResourceGraph
+        from jarvis_util.shell.pssh_exec import PsshExecInfo
         self.resource_graph = ResourceGraph()
         self.resource_graph.build(
             PsshExecInfo(hostfile=self.hostfile), net_sleep=net_sleep)
+        self.rg_hosts.entries = {}
+        for host, names in host_row_names(self.resource_graph,
+                                          hosts).items():
+            self.rg_hosts.record(host, names)
 
     def resource_graph_modify(self, net_sleep):
         """
         Modify the resource graph to retest resources
         """
+        from jarvis_util.shell.pssh_exec import PsshExecInfo
         self.resource_graph.modify(
             PsshExecInfo(hostfile=self.hostfile), net_sleep=net_sleep)
+        self.resource_graph_changed()
 
     def list_pipelines(self):
         """
@@ -398,24 +586,27 @@ class JarvisManager:
         if not os.path.exists(repo['path']):
             print(f'Repo {repo["path"]} does not exist')
             return
-        pkg_types = os.listdir(os.path.join(repo['path'], repo['name']))
-        pkg_types.sort()
+        pkg_types = self.pkg_index.list_pkgs(repo, self.repos)
         print(f'{repo["name"]}: {repo["path"]}')
         for pkg_type in pkg_types:
-            if not pkg_type.startswith('_'):
-                print(f'  {pkg_type}')
+            print(f'  {pkg_type}')
+
+    def build_pkg_index(self):
+        """
+        Re-scan all repos for pkgs
+
+        :return: None
+        """
+        self.pkg_index.build(self.repos)
 
     def construct_pkg(self, pkg_type):
         """
-        Construct a pkg by searching repos for the pkg type
+        Construct a pkg by looking up the pkg type in the pkg index
 
         :param pkg_type: The type of pkg to load (snake case).
         :return: A object of type "pkg_type"
         """
-        for repo in self.repos:
-            cls = load_class(f'{repo["name"]}.{pkg_type}.pkg',
-                             repo['path'],
-                             to_camel_case(pkg_type))
-            if cls is None:
-                continue
-            return cls()
+        cls = self.pkg_index.get_class(pkg_type, self.repos)
+        if cls is None:
+            return None
+        return cls()
@@ -0,0 +1,129 @@
+"""
+This module caches the results of Pkg.find_library. Resolving a library
+requires running the compiler and listing every directory in
+LD_LIBRARY_PATH. Results are persisted in the jarvis config directory and
+remain valid as long as the environment, the compiler, and the searched
+directories are unchanged.
+"""
+
+from jarvis_util.serialize.yaml_file import YamlFile
+import hashlib
+import shutil
+import json
+import yaml
+import os
+
+# The contents of each directory listed by this process: path -> (mtime, set)
+_dir_index = {}
+
+
+def dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def compiler_key(path):
+    """
+    Identify the compiler used to resolve libraries. Upgrading the
+    compiler in place changes its mtime, which invalidates its results.
+
+    :param path: The PATH the compiler is searched in
+    :return: A list [real path, mtime] or None if there is no compiler
+    """
+    cc = shutil.which('cc', path=path)
+    if cc is None:
+        return None
+    return [os.path.realpath(cc), dir_mtime(cc)]
+
+
+def list_dir(path):
+    """
+    List the files in a directory. Listings are cached until the
+    directory is modified.
+
+    :param path: The directory to list
+    :return: A set of file names (empty if the directory does not exist)
+    """
+    mtime = dir_mtime(path)
+    if mtime is None:
+        return set()
+    cached = _dir_index.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    filenames = set(os.listdir(path))
+    _dir_index[path] = (mtime, filenames)
+    return filenames
+
+
+class LibraryCache:
+    """
+    A persistent cache of library lookups
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the cache
+
+        :param path: Where the cache is stored
+        """
+        self.path = path
+        self.entries = None
+
+    def load(self):
+        if self.entries is None:
+            self.entries = {}
+            if os.path.exists(self.path):
+                try:
+                    self.entries = YamlFile(self.path).load() or {}
+                except (yaml.YAMLError, OSError):
+                    # A corrupt or unreadable cache is rebuilt
+                    self.entries = {}
+        return self.entries
+
+    def save(self):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        YamlFile(tmp_path).save(self.entries)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def get_key(lib_name, inputs):
+        text = json.dumps([lib_name, inputs], sort_keys=True)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()[:24]
+
+    def get(self, lib_name, inputs):
+        """
+        Get the cached location of a library
+
+        :param lib_name: The library being searched for
+        :param inputs: Everything the search depends on (e.g., env vars)
+        :return: The path to the library or None
+        """
+        entry = self.load().get(self.get_key(lib_name, inputs))
+        if entry is None:
+            return None
+        if not os.path.exists(entry['path']):
+            return None
+        for path, mtime in entry['dirs'].items():
+            if dir_mtime(path) != mtime:
+                return None
+        return entry['path']
+
+    def put(self, lib_name, inputs, lib_path, dirs):
+        """
+        Cache the location of a library
+
+        :param lib_name: The library being searched for
+        :param inputs: Everything the search depends on (e.g., env vars)
+        :param lib_path: Where the library was found
+        :param dirs: The directories which were searched. The result is
+        invalid if one of them is modified.
+        :return: None
+        """
+        self.load()[self.get_key(lib_name, inputs)] = {
+            'lib': lib_name,
+            'path': lib_path,
+            'dirs': {path: dir_mtime(path) for path in dirs},
+        }
+        self.save()
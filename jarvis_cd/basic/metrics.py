@@ -0,0 +1,473 @@
+"""
+This module extracts typed metrics (bandwidth, IOPS, latency, ...) from
+the output of applications. A MetricParser is a set of named extractors,
+each of which converts the values it matches to a numeric type and a
+canonical unit. Text output is parsed one line at a time as it is read
+from a file, so the output of an application is never held in memory.
+
+Builtin parsers are provided for IOR, fio, YCSB, redis-benchmark, and
+filebench. Units used by the builtin parsers:
+    bandwidth: MiB/s, throughput and IOPS: ops/s, latency: us, time: s
+"""
+
+import csv
+import json
+import re
+
+# The size of each unit, relative to the base unit of its dimension
+UNITS = {
+    'B': 1, 'KB': 10 ** 3, 'MB': 10 ** 6, 'GB': 10 ** 9, 'TB': 10 ** 12,
+    'KiB': 1 << 10, 'MiB': 1 << 20, 'GiB': 1 << 30, 'TiB': 1 << 40,
+    'ns': 1, 'us': 10 ** 3, 'ms': 10 ** 6, 's': 10 ** 9,
+    'ops': 1,
+}
+
+UNIT_ALIASES = {
+    'b': 'B', 'kb': 'KB', 'mb': 'MB', 'gb': 'GB', 'tb': 'TB',
+    'kib': 'KiB', 'mib': 'MiB', 'gib': 'GiB', 'tib': 'TiB',
+    'k': 'KiB', 'm': 'MiB', 'g': 'GiB', 't': 'TiB',
+    'sec': 's', 'usec': 'us', 'msec': 'ms', 'nsec': 'ns',
+}
+
+
+def _norm_unit(unit):
+    return UNIT_ALIASES.get(unit.lower(), unit) \
+        if unit not in UNITS else unit
+
+
+def convert(value, src_unit, dst_unit):
+    """
+    Convert a value between units of the same dimension. Rates are
+    written as <unit>/s (e.g., MiB/s).
+
+    :param value: The value to convert
+    :param src_unit: The unit of the value
+    :param dst_unit: The unit to convert to
+    :return: The converted value
+    """
+    if src_unit is None or dst_unit is None or src_unit == dst_unit:
+        return value
+    src_rate = src_unit.endswith('/s')
+    dst_rate = dst_unit.endswith('/s')
+    if src_rate != dst_rate:
+        raise Exception(f'Cannot convert {src_unit} to {dst_unit}')
+    if src_rate:
+        src_unit = src_unit[:-2]
+        dst_unit = dst_unit[:-2]
+    src_unit = _norm_unit(src_unit)
+    dst_unit = _norm_unit(dst_unit)
+    if src_unit not in UNITS or dst_unit not in UNITS:
+        raise Exception(f'Unknown unit: {src_unit} or {dst_unit}')
+    return value * UNITS[src_unit] / UNITS[dst_unit]
+
+
+def reduce_values(values, reduce):
+    if not values:
+        return None
+    if reduce == 'last':
+        return values[-1]
+    if reduce == 'first':
+        return values[0]
+    if reduce == 'sum':
+        return sum(values)
+    if reduce == 'mean':
+        return sum(values) / len(values)
+    if reduce == 'max':
+        return max(values)
+    if reduce == 'min':
+        return min(values)
+    raise Exception(f'Unknown reduction: {reduce}')
+
+
+class Extractor:
+    """
+    A named metric. Every value matched in the output is cast to dtype
+    and converted from src_unit to unit. If a metric matches more than
+    once, the values are combined using reduce.
+    """
+
+    def __init__(self, name, dtype=float, unit=None, src_unit=None,
+                 reduce='last'):
+        """
+        Initialize the extractor
+
+        :param name: The name of the metric (i.e., the stat column)
+        :param dtype: The type of the metric (e.g., float, int, str)
+        :param unit: The unit the metric is reported in
+        :param src_unit: The unit the application prints the metric in.
+        Default is unit.
+        :param reduce: How to combine matches (last, first, sum, mean,
+        max, min)
+        """
+        self.name = name
+        self.dtype = dtype
+        self.unit = unit
+        self.src_unit = src_unit if src_unit is not None else unit
+        self.reduce = reduce
+        self.values = []
+
+    def add(self, value, src_unit=None):
+        """
+        Record a matched value
+
+        :param value: The value as printed by the application
+        :param src_unit: The unit printed with the value (optional)
+        :return: None
+        """
+        if isinstance(value, str):
+            value = value.strip().replace(',', '')
+            if self.dtype is not str:
+                try:
+                    value = float(value)
+                except ValueError:
+                    return
+        if self.dtype is not str:
+            value = convert(value, src_unit or self.src_unit, self.unit)
+            value = self.dtype(value)
+        self.values.append(value)
+
+    def feed_line(self, line):
+        pass
+
+    def feed_doc(self, doc):
+        pass
+
+    def value(self):
+        value = reduce_values(self.values, self.reduce)
+        if value is not None:
+            value = self.dtype(value)
+        return value
+
+
+class RegexExtractor(Extractor):
+    """
+    Extract a metric from lines of text using a regex. If the regex has
+    a group named "unit", it is used as the unit of the value.
+    """
+
+    def __init__(self, name, pattern, group=1, after=None, **kwargs):
+        """
+        Initialize the extractor
+
+        :param name: The name of the metric
+        :param pattern: The regex to search each line for
+        :param group: The regex group containing the value
+        :param after: Only search the lines following the first line
+        matching this regex (e.g., the start of a summary)
+        :param kwargs: See Extractor
+        """
+        super().__init__(name, **kwargs)
+        self.pattern = re.compile(pattern)
+        self.group = group
+        self.after = re.compile(after) if after is not None else None
+
+    def feed_line(self, line):
+        if self.after is not None:
+            if self.after.search(line):
+                self.after = None
+            return
+        match = self.pattern.search(line)
+        if match is None:
+            return
+        unit = match.groupdict().get('unit')
+        self.add(match.group(self.group), unit)
+
+
+class CsvExtractor(Extractor):
+    """
+    Extract a metric from a column of CSV rows. Rows are selected by
+    the values of their leading columns.
+    """
+
+    def __init__(self, name, column, key=None, delimiter=',', **kwargs):
+        """
+        Initialize the extractor
+
+        :param name: The name of the metric
+        :param column: The index of the column containing the value
+        :param key: A tuple of values the leading columns of a row must
+        have (e.g., ('SET',)). Default matches every row.
+        :param delimiter: The CSV delimiter
+        :param kwargs: See Extractor
+        """
+        super().__init__(name, **kwargs)
+        self.column = column
+        self.key = tuple(key) if key is not None else ()
+        self.delimiter = delimiter
+
+    def feed_line(self, line):
+        row = next(csv.reader([line], delimiter=self.delimiter,
+                              skipinitialspace=True), None)
+        if not row or len(row) <= self.column:
+            return
+        row = [col.strip() for col in row]
+        if tuple(row[:len(self.key)]) != self.key:
+            return
+        self.add(row[self.column])
+
+
+class JsonExtractor(Extractor):
+    """
+    Extract a metric from a JSON document
+    """
+
+    def __init__(self, name, path, **kwargs):
+        """
+        Initialize the extractor
+
+        :param name: The name of the metric
+        :param path: A sequence of keys (or list indices) leading to the
+        value. "*" matches every element of a list or dict.
+        :param kwargs: See Extractor
+        """
+        super().__init__(name, **kwargs)
+        self.path = path
+
+    def feed_doc(self, doc):
+        nodes = [doc]
+        for key in self.path:
+            next_nodes = []
+            for node in nodes:
+                if key == '*':
+                    if isinstance(node, dict):
+                        next_nodes += list(node.values())
+                    elif isinstance(node, list):
+                        next_nodes += node
+                elif isinstance(node, dict) and key in node:
+                    next_nodes.append(node[key])
+                elif isinstance(node, list) and isinstance(key, int) \
+                        and -len(node) <= key < len(node):
+                    next_nodes.append(node[key])
+            nodes = next_nodes
+        for node in nodes:
+            if isinstance(node, (dict, list)):
+                continue
+            self.add(node)
+
+
+class MetricParser:
+    """
+    A set of extractors applied to the output of an application
+    """
+
+    def __init__(self, extractors, fmt='text'):
+        """
+        Initialize the parser
+
+        :param extractors: A list of Extractors
+        :param fmt: The format of the output (text or json)
+        """
+        self.extractors = extractors
+        self.fmt = fmt
+
+    def feed(self, line):
+        for extractor in self.extractors:
+            extractor.feed_line(line)
+
+    def parse_lines(self, lines):
+        """
+        Parse the lines of an output
+
+        :param lines: An iterable of lines
+        :return: self
+        """
+        if self.fmt == 'json':
+            return self.parse_doc(json.loads(''.join(lines)))
+        for line in lines:
+            self.feed(line.rstrip('\n'))
+        return self
+
+    def parse_doc(self, doc):
+        for extractor in self.extractors:
+            extractor.feed_doc(doc)
+        return self
+
+    def parse_file(self, path):
+        """
+        Parse an output file. Text files are streamed line by line.
+
+        :param path: The file to parse
+        :return: self
+        """
+        with open(path, 'r', encoding='utf-8', errors='replace') as fp:
+            if self.fmt == 'json':
+                return self.parse_doc(json.load(fp))
+            for line in fp:
+                self.feed(line.rstrip('\n'))
+        return self
+
+    def results(self):
+        """
+        Get the metrics which were found in the output
+
+        :return: Dict of metric name -> value
+        """
+        results = {}
+        for extractor in self.extractors:
+            value = extractor.value()
+            if value is not None:
+                results[extractor.name] = value
+        return results
+
+    def units(self):
+        return {extractor.name: extractor.unit
+                for extractor in self.extractors}
+
+
+FLOAT = r'([-+]?[0-9][0-9,]*\.?[0-9]*(?:[eE][-+]?[0-9]+)?)'
+
+
+def ior_parser():
+    """
+    Parse the "Summary of all tests" table printed by IOR. Values are
+    the mean over all repetitions.
+
+    :return: MetricParser
+    """
+    extractors = []
+    for op in ['write', 'read']:
+        row = rf'^{op}\s+' + r'\s+'.join([FLOAT] * 9)
+        after = r'^Summary of all tests'
+        extractors += [
+            RegexExtractor(f'{op}_bw', row, group=3, after=after,
+                           unit='MiB/s'),
+            RegexExtractor(f'{op}_bw_max', row, group=1, after=after,
+                           unit='MiB/s'),
+            RegexExtractor(f'{op}_iops', row, group=7, after=after,
+                           unit='ops/s'),
+            RegexExtractor(f'{op}_time', row, group=9, after=after,
+                           unit='s'),
+        ]
+    return MetricParser(extractors)
+
+
+def fio_parser():
+    """
+    Parse the JSON output of fio (--output-format=json). Bandwidth and
+    IOPS are summed over all jobs and latencies are averaged.
+
+    :return: MetricParser
+    """
+    extractors = []
+    for op in ['read', 'write']:
+        extractors += [
+            JsonExtractor(f'{op}_bw', ['jobs', '*', op, 'bw'],
+                          unit='MiB/s', src_unit='KiB/s', reduce='sum'),
+            JsonExtractor(f'{op}_iops', ['jobs', '*', op, 'iops'],
+                          unit='ops/s', reduce='sum'),
+            JsonExtractor(f'{op}_lat', ['jobs', '*', op, 'lat_ns', 'mean'],
+                          unit='us', src_unit='ns', reduce='mean'),
+            JsonExtractor(f'{op}_lat_p99',
+                          ['jobs', '*', op, 'clat_ns', 'percentile',
+                           '99.000000'],
+                          unit='us', src_unit='ns', reduce='max'),
+        ]
+    return MetricParser(extractors, fmt='json')
+
+
+def ycsb_parser():
+    """
+    Parse the summary of YCSB (both the Java "[OP], Metric, Value" format
+    and the "throughput(ops/sec): X" format of the C++ port). The run time
+    is not parsed, since jarvis measures it.
+
+    :return: MetricParser
+    """
+    extractors = [
+        CsvExtractor('throughput', 2,
+                     key=('[OVERALL]', 'Throughput(ops/sec)'),
+                     unit='ops/s'),
+        RegexExtractor('throughput', r'throughput\(ops/sec\):\s*' + FLOAT,
+                       unit='ops/s'),
+    ]
+    for op in ['READ', 'UPDATE', 'INSERT', 'SCAN', 'READ-MODIFY-WRITE']:
+        name = op.lower().replace('-', '_')
+        extractors += [
+            CsvExtractor(f'{name}_lat', 2,
+                         key=(f'[{op}]', 'AverageLatency(us)'), unit='us'),
+            CsvExtractor(f'{name}_lat_p99', 2,
+                         key=(f'[{op}]', '99thPercentileLatency(us)'),
+                         unit='us'),
+            RegexExtractor(f'{name}_lat', rf'\b{op}:.*?\bAvg=' + FLOAT,
+                           unit='us'),
+            RegexExtractor(f'{name}_lat_p99', rf'\b{op}:.*?\b99=' + FLOAT,
+                           unit='us'),
+        ]
+    return MetricParser(_merge(extractors))
+
+
+def redis_benchmark_parser(tests=('SET', 'GET')):
+    """
+    Parse the output of redis-benchmark --csv. Each row is
+    "test","rps","avg_latency_ms",...,"p99_latency_ms","max_latency_ms".
+    Older versions only print "test","rps".
+
+    :param tests: The tests to report
+    :return: MetricParser
+    """
+    extractors = []
+    for test in tests:
+        name = test.lower()
+        extractors += [
+            CsvExtractor(f'{name}_throughput', 1, key=(test,), unit='ops/s'),
+            CsvExtractor(f'{name}_lat', 2, key=(test,),
+                         unit='us', src_unit='ms'),
+            CsvExtractor(f'{name}_lat_p99', 6, key=(test,),
+                         unit='us', src_unit='ms'),
+        ]
+    return MetricParser(extractors)
+
+
+def filebench_parser():
+    """
+    Parse the "IO Summary" line printed by filebench. When filebench runs
+    on multiple nodes, throughput and bandwidth are summed and latencies
+    are averaged.
+
+    :return: MetricParser
+    """
+    summary = r'IO Summary:\s*(?:[0-9]+ ops,?\s*)?'
+    return MetricParser([
+        RegexExtractor('throughput', summary + FLOAT + r'\s*ops/s',
+                       unit='ops/s', reduce='sum'),
+        RegexExtractor('bw', r'IO Summary:.*?' + FLOAT + r'\s*mb/s',
+                       unit='MiB/s', reduce='sum'),
+        RegexExtractor('lat', r'IO Summary:.*?' + FLOAT +
+                       r'\s*(?P<unit>ms|us)(?:/op| latency)',
+                       unit='us', reduce='mean'),
+    ])
+
+
+class _AnyExtractor(Extractor):
+    """
+    Several extractors for the same metric (e.g., for different versions
+    of an application's output). The first one with a value is used.
+    """
+
+    def __init__(self, extractors):
+        first = extractors[0]
+        super().__init__(first.name, first.dtype, first.unit)
+        self.extractors = extractors
+
+    def feed_line(self, line):
+        for extractor in self.extractors:
+            extractor.feed_line(line)
+
+    def feed_doc(self, doc):
+        for extractor in self.extractors:
+            extractor.feed_doc(doc)
+
+    def value(self):
+        for extractor in self.extractors:
+            value = extractor.value()
+            if value is not None:
+                return value
+        return None
+
+
+def _merge(extractors):
+    by_name = {}
+    for extractor in extractors:
+        by_name.setdefault(extractor.name, []).append(extractor)
+    return [group[0] if len(group) == 1 else _AnyExtractor(group)
+            for group in by_name.values()]
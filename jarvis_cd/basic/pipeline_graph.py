@@ -0,0 +1,156 @@
+"""
+This module schedules the pkgs of a pipeline according to their
+dependencies. Pkgs whose dependencies are satisfied are executed
+concurrently in a thread pool.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def implicit_deps(ids, deps):
+    """
+    Complete the declared dependencies of a pipeline with its list order.
+    A pkg which declares no dependencies runs after the pkg listed before
+    it, so declaring one dependency does not make every other pkg
+    concurrent. An empty list declares that a pkg has no dependencies.
+
+    :param ids: The pkg ids in pipeline order
+    :param deps: The declared dependencies (pkg id -> list of pkg ids)
+    :return: The dependencies of every pkg
+    """
+    full = {}
+    prev_id = None
+    for node_id in ids:
+        if node_id in deps:
+            full[node_id] = list(deps[node_id])
+        elif prev_id is not None:
+            full[node_id] = [prev_id]
+        prev_id = node_id
+    return full
+
+
+def merge_envs(env, base, pkg_envs):
+    """
+    Apply the changes pkgs made to their copies of an environment. The
+    copies are applied in order, so later pkgs win, as if the pkgs had
+    run one at a time.
+
+    :param env: The environment to update
+    :param base: The environment the copies were made from
+    :param pkg_envs: The copies, in pipeline order
+    :return: None
+    """
+    for pkg_env in pkg_envs:
+        for key in base:
+            if key not in pkg_env:
+                env.pop(key, None)
+        for key, val in pkg_env.items():
+            if key not in base or base[key] != val:
+                env[key] = val
+
+
+class PipelineGraph:
+    """
+    A dependency graph over a set of nodes (typically pkgs).
+    """
+
+    def __init__(self, nodes, deps, get_id=None):
+        """
+        Build the dependency graph
+
+        :param nodes: An ordered list of nodes
+        :param deps: A dict mapping a node id to the list of node ids it
+        must run after. Ids which are not in nodes are ignored, since they
+        are assumed to have been satisfied already.
+        :param get_id: A function returning the id of a node. By default,
+        the node's pkg_id.
+        """
+        if get_id is None:
+            get_id = lambda node: node.pkg_id
+        self.nodes = list(nodes)
+        self.ids = [get_id(node) for node in self.nodes]
+        self.node_dict = dict(zip(self.ids, self.nodes))
+        self.parents = {node_id: [] for node_id in self.ids}
+        self.children = {node_id: [] for node_id in self.ids}
+        for node_id in self.ids:
+            for dep_id in deps.get(node_id, []):
+                if dep_id not in self.node_dict or dep_id == node_id:
+                    continue
+                self.parents[node_id].append(dep_id)
+                self.children[dep_id].append(node_id)
+        self.order()
+
+    def order(self, reverse=False):
+        """
+        Get a topological order of the node ids. Ties are broken by the
+        order nodes were given in.
+
+        :param reverse: Whether to order teardown (dependents first)
+        :return: List of node ids
+        """
+        parents, children = self._edges(reverse)
+        counts = {node_id: len(parents[node_id]) for node_id in self.ids}
+        ready = [node_id for node_id in self.ids if counts[node_id] == 0]
+        order = []
+        while len(ready):
+            node_id = ready.pop(0)
+            order.append(node_id)
+            for child_id in children[node_id]:
+                counts[child_id] -= 1
+                if counts[child_id] == 0:
+                    ready.append(child_id)
+        if len(order) != len(self.ids):
+            cycle = [node_id for node_id in self.ids if counts[node_id] > 0]
+            raise Exception(f'Dependency cycle between pkgs: {cycle}')
+        return order
+
+    def run(self, fn, reverse=False, max_workers=None):
+        """
+        Call fn on every node. A node is only passed to fn once all of its
+        dependencies have finished. Independent nodes run concurrently.
+
+        :param fn: The function to call on each node
+        :param reverse: Whether to run in reverse topological order
+        (e.g., for stopping pkgs)
+        :param max_workers: The maximum number of nodes to run at once.
+        None means no limit.
+        :return: None
+        """
+        if len(self.ids) == 0:
+            return
+        if len(self.ids) == 1:
+            fn(self.nodes[0])
+            return
+        parents, children = self._edges(reverse)
+        counts = {node_id: len(parents[node_id]) for node_id in self.ids}
+        if max_workers is None:
+            max_workers = len(self.ids)
+        error = None
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            for node_id in self.ids:
+                if counts[node_id] == 0:
+                    node = self.node_dict[node_id]
+                    running[pool.submit(fn, node)] = node_id
+            while len(running):
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_id = running.pop(future)
+                    if future.exception() is not None:
+                        if error is None:
+                            error = future.exception()
+                        continue
+                    if error is not None:
+                        continue
+                    for child_id in children[node_id]:
+                        counts[child_id] -= 1
+                        if counts[child_id] == 0:
+                            child = self.node_dict[child_id]
+                            running[pool.submit(fn, child)] = child_id
+        if error is not None:
+            raise error
+
+    def _edges(self, reverse):
+        if reverse:
+            return self.children, self.parents
+        return self.parents, self.children
@@ -0,0 +1,105 @@
+"""
+This module stores the state of a pipeline (the config of every pkg and
+the pipeline's environment) in a single JSON file. Loading one JSON file
+is much faster than parsing a YAML file per pkg. The YAML layout is kept
+as an export format (see Pipeline.export_state).
+"""
+
+import json
+import os
+
+STATE_FILE = 'state.json'
+
+
+class PipelineStore:
+    """
+    The compact state of a pipeline
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the store
+
+        :param path: The path to the state file
+        """
+        self.path = path
+        self.env = None
+        self.pkgs = {}
+        self.dirty = False
+
+    @staticmethod
+    def get_path(config_dir):
+        return os.path.join(config_dir, STATE_FILE)
+
+    @staticmethod
+    def open(config_dir):
+        """
+        Open the store of a pipeline, if it has one
+
+        :param config_dir: The config directory of the pipeline
+        :return: PipelineStore or None
+        """
+        path = PipelineStore.get_path(config_dir)
+        if not os.path.exists(path):
+            return None
+        return PipelineStore(path).load()
+
+    def load(self):
+        with open(self.path, 'r', encoding='utf-8') as fp:
+            state = json.load(fp)
+        self.env = state['env']
+        self.pkgs = state['pkgs']
+        self.dirty = False
+        return self
+
+    def has(self, global_id):
+        return global_id in self.pkgs
+
+    def get(self, global_id):
+        return self.pkgs[global_id]
+
+    def put(self, global_id, config):
+        """
+        Update the config of a pkg
+
+        :param global_id: The global id of the pkg
+        :param config: The config dict of the pkg
+        :return: None
+        """
+        self.pkgs[global_id] = config
+        self.dirty = True
+
+    def set_env(self, env):
+        self.env = env
+        self.dirty = True
+
+    def drop(self, global_id):
+        """
+        Remove a pkg and all of its sub-pkgs
+
+        :param global_id: The global id of the pkg
+        :return: None
+        """
+        prefix = f'{global_id}.'
+        for pkg_id in list(self.pkgs):
+            if pkg_id == global_id or pkg_id.startswith(prefix):
+                del self.pkgs[pkg_id]
+                self.dirty = True
+
+    def save(self, force=False):
+        """
+        Atomically write the state file, if anything changed
+
+        :param force: Write even if nothing changed
+        :return: None
+        """
+        if not self.dirty and not force:
+            return
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as fp:
+            json.dump({'env': self.env, 'pkgs': self.pkgs}, fp,
+                      separators=(',', ':'), default=str)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -5,6 +5,23 @@ pkg types in Jarvis.
 
 from abc import ABC, abstractmethod
 from jarvis_cd.basic.jarvis_manager import JarvisManager
+from jarvis_cd.basic.pipeline_graph import PipelineGraph, implicit_deps, \
+    merge_envs
+from jarvis_cd.basic.readiness import wait_ready
+from jarvis_cd.basic.sweep import SweepScheduler
+from jarvis_cd.basic.remote_fs import RemoteFsPlan
+from jarvis_cd.basic.ssh_pool import SshPool, pool_root, strip_pool_path
+from jarvis_cd.basic.pipeline_store import PipelineStore
+from jarvis_cd.basic.build_cache import source_revision, compiler_info
+from jarvis_cd.basic.lib_cache import list_dir, compiler_key
+from jarvis_cd.basic.trace import Tracer, get_tracer, set_tracer, span
+from jarvis_cd.basic.results_store import ResultsStore
+from jarvis_cd.basic.adaptive_repeat import AdaptiveRepeat
+from jarvis_cd.basic.search import make_search, derive_seed
+from jarvis_cd.basic.expr import Expr
+from jarvis_cd.basic.transaction import PipelineTransaction
+from jarvis_cd.basic.configure_inputs import TrackedDict, InputTrace, \
+    digest, inputs_changed
 from jarvis_util.util.logging import ColorPrinter, Color
 from jarvis_util.util.naming import to_snake_case
 from jarvis_util.serialize.yaml_file import YamlFile
@@ -14,6 +31,7 @@ from jarvis_util.util.argparse import ArgParse
 from jarvis_util.jutil_manager import JutilManager
 from jarvis_util.shell.filesystem import Mkdir, Rm
 from jarvis_util.shell.pssh_exec import PsshExecInfo
+from contextlib import contextmanager
 from enum import Enum
 import yaml
 import inspect
@@ -22,7 +40,9 @@ import shutil
 import math
 import os
 import time
-import pandas as pd
+import json
+import hashlib
+from statistics import mean
 
 
 class PkgArgParse(ArgParse):
@@ -72,11 +92,28 @@ class PipelineIterator:
         self.iter_vars = ppl.config['iterator']['vars']
         self.iter_loop = ppl.config['iterator']['loop']
         self.repeat = ppl.config['iterator']['repeat']
+        self.parallel = ppl.config['iterator'].get('parallel', 1)
+        # Keep services running between points when their configuration
+        # is unchanged
+        self.hot = ppl.config['iterator'].get('hot_services', False)
+        # Stop repeating a point once a metric's confidence interval is
+        # narrow enough. repeat is the maximum number of repetitions.
+        self.adaptive = None
+        if 'adaptive' in ppl.config['iterator']:
+            adaptive = dict(ppl.config['iterator']['adaptive'])
+            adaptive.setdefault('max_repeat', self.repeat)
+            self.adaptive = AdaptiveRepeat(**adaptive)
+            self.repeat = self.adaptive.max_repeat
         ppl.set_config_env_vars()
         self.iter_out = os.path.expandvars(ppl.config['iterator']['output'])
         print(f'ITER OUT: {self.iter_out} (from: {ppl.config["iterator"]["output"]})')
         self.stats_path = f'{self.iter_out}/stats_dict.csv'
         self.stats = []
+        # An append-only record of every completed (point, repeat)
+        self.ledger_path = f'{self.iter_out}/ledger.jsonl'
+        self.completed = set()
+        # The stats of every completed run, stored by column
+        self.results = ResultsStore(f'{self.iter_out}/results')
 
         Mkdir(self.iter_out)
         self.iter_vars = self.iter_vars
@@ -86,6 +123,42 @@ class PipelineIterator:
                 pkg_name, var_name = zip_name.split('.')
                 pkg = ppl.sub_pkgs_dict[pkg_name]
                 self.add_to_for_zip(pkg, var_name, self.iter_vars[zip_name])
+        if self.hot:
+            # The last zip group varies fastest. Placing the groups of
+            # hot services first means they change as rarely as possible.
+            # This only orders the full grid. Search strategies pick their
+            # own order, and adaptive repetition repeats each point in
+            # place, so neither is affected.
+            self.fors.sort(key=lambda for_zip: not any(
+                Pipeline.is_hot(pkg) for pkg, _, _ in for_zip.zip))
+        # The points to evaluate (None for the full grid). The seed is
+        # kept in the iterator config, so a resumed sweep draws the same
+        # points.
+        search_conf = ppl.config['iterator'].get('search')
+        if search_conf is not None and search_conf.get('seed') is None:
+            search_conf['seed'] = derive_seed(ppl.config['iterator'])
+        self.search = make_search([for_zip.zip_len for for_zip in self.fors],
+                                  search_conf or {})
+        self.trial = None
+        # The values of the search metric at each point
+        self.point_metric = {}
+        # Points which violate a constraint are skipped. Derived variables
+        # are computed from the variables of each point.
+        self.constraints = [Expr(text) for text in
+                            ppl.config['iterator'].get('constraints', [])]
+        self.derived = {var: Expr(text) for var, text in
+                        ppl.config['iterator'].get('derived', {}).items()}
+        self.pruned = 0
+        for var in self._extra_vars() + list(self.derived):
+            pkg_name, var_name = var.split('.')
+            self.conf_dict.setdefault(ppl.sub_pkgs_dict[pkg_name], {})
+
+    def _extra_vars(self):
+        """
+        The variables set by the search strategy (e.g., a budget)
+        """
+        budget = getattr(self.search, 'budget', None)
+        return [budget] if budget is not None else []
 
     def add_for(self):
         self.fors.append(PipelineZip())
@@ -96,6 +169,97 @@ class PipelineIterator:
         self.conf_dict[pkg] = {}
 
     def begin(self):
+        self.pruned = 0
+        return self._prune(self._begin())
+
+    def next(self):
+        return self._prune(self._next())
+
+    def _lookup(self, values):
+        """
+        Create a function which gets the value of a variable in a sweep
+        expression. Variables are looked up in the derived values, the
+        variables of the current point, and then the pkg configs.
+
+        :param values: The derived variables computed so far
+        :return: Function
+        """
+        def lookup(var):
+            if var in values:
+                return values[var]
+            if var in self.linear_conf_dict and var not in self.derived:
+                return self.linear_conf_dict[var]
+            if var == 'nodes':
+                return len(self.ppl.jarvis.hostfile)
+            if '.' in var:
+                pkg_name, var_name = var.split('.', 1)
+                pkg = self.ppl.sub_pkgs_dict.get(pkg_name)
+                if pkg is not None and var_name in pkg.config:
+                    return pkg.config[var_name]
+            raise Exception(f'Unknown variable: {var}')
+        return lookup
+
+    def _prune(self, conf_dict):
+        """
+        Skip the points which violate a constraint and set the derived
+        variables of the first valid point
+
+        :param conf_dict: The current point (or None)
+        :return: The conf_dict of the first valid point or None
+        """
+        if not self.constraints and not self.derived:
+            return conf_dict
+        diff = list(self.cur_pos_diff)
+        while conf_dict is not None:
+            values = {}
+            lookup = self._lookup(values)
+            for var, expr in self.derived.items():
+                values[var] = expr.eval(lookup)
+            if all(expr.eval(lookup) for expr in self.constraints):
+                break
+            self.pruned += 1
+            conf_dict = self._next()
+            # A pkg differs from the last valid point if it changed at
+            # any of the skipped points
+            diff = [max(old, new) for old, new in
+                    zip(diff, self.cur_pos_diff)]
+        if conf_dict is None:
+            if self.pruned:
+                self.ppl.log(f'[ITER] Skipped {self.pruned} points which '
+                             f'violate the constraints', Color.BRIGHT_BLUE)
+            return None
+        self.cur_pos_diff = diff
+        conf_dict = self.current()
+        for var, val in values.items():
+            self._set_var(conf_dict, var, val)
+        return conf_dict
+
+    def _set_var(self, conf_dict, var, val):
+        """
+        Set a variable of the current point which is not part of the loop
+        (e.g., a budget or a derived variable)
+
+        :param conf_dict: The current point
+        :param var: The variable (pkg_id.var_name)
+        :param val: The value of the variable
+        :return: None
+        """
+        pkg_name, var_name = var.split('.')
+        pkg = self.ppl.sub_pkgs_dict[pkg_name]
+        changed = int(conf_dict[pkg].get(var_name) != val)
+        if any(pkg is loop_pkg for for_zip in self.fors
+               for loop_pkg, _, _ in for_zip.zip):
+            pkg.iter_diff = max(pkg.iter_diff, changed)
+        else:
+            pkg.iter_diff = changed
+        conf_dict[pkg][var_name] = val
+        self.linear_conf_dict[var] = val
+
+    def _begin(self):
+        if self.search is not None:
+            self.iter_count = 0
+            self.cur_pos = []
+            return self._ask()
         for i in range(len(self.fors)):
             self.cur_iters.append(iter(range(self.fors[i].zip_len)))
             self.cur_pos.append(next(self.cur_iters[i]))
@@ -106,7 +270,7 @@ class PipelineIterator:
         return self.conf_dict
 
     def current(self):
-        for i in range(len(self.cur_iters)):
+        for i in range(len(self.fors)):
             for pkg, var_name, var_vals in self.fors[i].zip:
                 self.conf_dict[pkg][var_name] = var_vals[self.cur_pos[i]]
                 pkg.iter_diff = self.cur_pos_diff[i]
@@ -115,7 +279,46 @@ class PipelineIterator:
                 self.linear_conf_dict[f'{pkg.pkg_id}.{key}'] = val
         return self.conf_dict
 
-    def next(self):
+    def _ask(self):
+        """
+        Move to the next point of the search strategy
+
+        :return: The conf_dict of the point or None
+        """
+        trial = self.search.ask()
+        if trial is None:
+            return None
+        self.trial = trial
+        pos, extra = trial
+        if self.cur_pos:
+            self.cur_pos_diff = [int(new != old)
+                                 for new, old in zip(pos, self.cur_pos)]
+        else:
+            self.cur_pos_diff = [1] * len(pos)
+        self.cur_pos = list(pos)
+        self.max_iter_count = self.search.max_trials()
+        conf_dict = self.current()
+        for var, val in extra.items():
+            self._set_var(conf_dict, var, val)
+        return conf_dict
+
+    def _tell(self):
+        """
+        Give the search strategy the metric of the current point (the mean
+        over its repetitions)
+
+        :return: None
+        """
+        vals = self.point_metric.get(self._point_key(self.linear_conf_dict))
+        self.search.tell(self.trial, mean(vals) if vals else None)
+
+    def _next(self):
+        if self.search is not None:
+            self._tell()
+            conf_dict = self._ask()
+            if conf_dict is not None:
+                self.iter_count += 1
+            return conf_dict
         self.cur_pos_diff = [0] * len(self.cur_pos)
         for i in range(len(self.cur_iters) - 1, -1, -1):
             try:
@@ -134,29 +337,187 @@ class PipelineIterator:
         return conf_dict
 
     def config_pkgs(self, conf_dict):
+        # Create all private directories using a single parallel ssh
+        self.ppl.fs_plan.mkdir([pkg.private_dir for pkg in conf_dict],
+                               self.ppl.jarvis.hostfile)
+        for pkg in self.ppl.sub_pkgs:
+            pkg.configure_time = 0
         for pkg, conf in conf_dict.items():
             pkg.skip_run = False
             if pkg.pkg_id in self.norerun and pkg.iter_diff == 0:
                 pkg.skip_run = True
             pkg.set_config_env_vars()
-            pkg.configure(**conf)
-            pkg.save()
+            self.ppl.configure_pkg(pkg, **conf)
+            if not pkg.config_cached:
+                pkg.save()
 
-    def save_run(self, conf_dict):
+    def save_run(self, conf_dict, rep=0):
         stat_dict = {**self.linear_conf_dict}
+        # Get the time spent in each phase. Cleaning happens before a run,
+        # so clean_time is the time spent preparing for this run.
+        for pkg in self.ppl.sub_pkgs:
+            for phase in ['configure', 'start', 'stop', 'clean']:
+                stat_dict[f'{pkg.pkg_id}.{phase}_time'] = \
+                    getattr(pkg, f'{phase}_time')
         # Get the package-specific stats
         for pkg in self.ppl.sub_pkgs:
+            if isinstance(pkg, Application):
+                pkg.get_metrics(stat_dict)
             if hasattr(pkg, '_get_stat'):
                 pkg._get_stat(stat_dict)
         # Save the stats to the list
         self.stats.append(stat_dict)
+        self.log_run(self.iter_count, rep, self.linear_conf_dict, stat_dict)
+
+    @staticmethod
+    def _point_key(linear_conf_dict):
+        return json.dumps(linear_conf_dict, sort_keys=True, default=str)
+
+    @staticmethod
+    def _ledger_key(linear_conf_dict, rep):
+        return PipelineIterator._point_key(linear_conf_dict), rep
+
+    def log_run(self, iter_count, rep, linear_conf_dict, stat_dict):
+        """
+        Append a completed run to the ledger and the results store. The
+        ledger is flushed to disk so that it survives the job being killed.
+
+        :param iter_count: The index of the parameter point
+        :param rep: The repetition of the parameter point
+        :param linear_conf_dict: The configuration of the point
+        :param stat_dict: The stats collected for the run
+        :return: None
+        """
+        self.completed.add(self._ledger_key(linear_conf_dict, rep))
+        if self.adaptive is not None:
+            self.adaptive.add(self._point_key(linear_conf_dict), stat_dict)
+        self._add_point_metric(self._point_key(linear_conf_dict), stat_dict)
+        if self.ledger_path is None:
+            return
+        record = {
+            'iter': iter_count,
+            'rep': rep,
+            'conf': linear_conf_dict,
+            'stat': stat_dict,
+        }
+        with open(self.ledger_path, 'a', encoding='utf-8') as fp:
+            fp.write(json.dumps(record, default=str) + '\n')
+            fp.flush()
+            os.fsync(fp.fileno())
+        self.results.append([stat_dict], f'{iter_count:06d}-{rep:03d}')
+
+    def _add_point_metric(self, point, stat_dict):
+        if self.search is None or self.search.metric is None:
+            return
+        val = stat_dict.get(self.search.metric)
+        if isinstance(val, (int, float)) and not isinstance(val, bool):
+            self.point_metric.setdefault(point, []).append(val)
+
+    def log_best(self):
+        """
+        Log the best point found by the search strategy
+
+        :return: None
+        """
+        if self.search is None or not self.point_metric:
+            return
+        point, vals = max(self.point_metric.items(),
+                          key=lambda item: self.search.score(mean(item[1])))
+        self.ppl.log(f'[ITER] Best point: {point} '
+                     f'({self.search.metric} = {mean(vals)})',
+                     Color.BRIGHT_BLUE)
+
+    def load_ledger(self):
+        """
+        Load the runs completed by a previous invocation of the sweep.
+        Their stats are included in the analysis.
+
+        :return: The number of completed runs
+        """
+        if not os.path.exists(self.ledger_path):
+            return 0
+        with open(self.ledger_path, 'rb+') as fp:
+            data = fp.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                # The last record is truncated if the job was killed while
+                # writing it. Drop it, so the next record starts on its
+                # own line.
+                fp.truncate(end)
+        for line in data[:end].decode('utf-8').splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = self._ledger_key(record['conf'], record['rep'])
+            if key in self.completed:
+                continue
+            self.completed.add(key)
+            self.stats.append(record['stat'])
+            if self.adaptive is not None:
+                self.adaptive.add(key[0], record['stat'])
+            self._add_point_metric(key[0], record['stat'])
+        return len(self.completed)
+
+    def reset_ledger(self):
+        """
+        Discard the runs of previous invocations of the sweep.
+
+        :return: None
+        """
+        if os.path.exists(self.ledger_path):
+            os.remove(self.ledger_path)
+        self.results.clear()
+        self.completed = set()
+
+    def pending_reps(self, linear_conf_dict=None):
+        """
+        Get the repetitions of a parameter point which have not completed.
+
+        :param linear_conf_dict: The point. Default is the current point.
+        :return: List of repetition indices
+        """
+        if linear_conf_dict is None:
+            linear_conf_dict = self.linear_conf_dict
+        if self.adaptive is not None and \
+                self.adaptive.converged(self._point_key(linear_conf_dict)):
+            return []
+        return [i for i in range(self.repeat)
+                if self._ledger_key(linear_conf_dict, i) not in self.completed]
+
+    def point_converged(self, linear_conf_dict=None):
+        """
+        Whether a parameter point needs no more repetitions. Only
+        applies to adaptive repetition.
+
+        :param linear_conf_dict: The point. Default is the current point.
+        :return: bool
+        """
+        if self.adaptive is None:
+            return False
+        if linear_conf_dict is None:
+            linear_conf_dict = self.linear_conf_dict
+        point = self._point_key(linear_conf_dict)
+        if not self.adaptive.converged(point):
+            return False
+        avg, half_width = self.adaptive.interval(point)
+        self.ppl.log(f'[ITER] Converged after '
+                     f'{len(self.adaptive.samples[point])} runs: '
+                     f'{self.adaptive.metric} = {avg:.4g} +/- '
+                     f'{half_width:.4g}', Color.BRIGHT_BLUE)
+        return True
 
     def analysis(self):
+        # The store holds every run of the sweep, including the runs of
+        # previous invocations which were resumed
+        stats = self.results.read_rows()
         for pkg in self.ppl.sub_pkgs:
             if hasattr(pkg, '_analysis'):
-                pkg._analysis(self.stats)
-        df = pd.DataFrame(self.stats)
-        df.to_csv(self.stats_path, index=False)
+                pkg._analysis(stats)
+        # stats_dict.csv is exported from the results store for
+        # compatibility with existing analysis scripts
+        self.results.compact()
+        self.results.to_csv(self.stats_path)
 
 class Pkg(ABC):
     """
@@ -184,6 +545,7 @@ class Pkg(ABC):
         sub_pkgs_dict: the sub-packages of this package (dict)
         env_path: the path to the environment file
         env: the environment data
+        store: the compact state of the pipeline (root only, optional)
         mod_env: the environment data + LD_PRELOAD
         iter_vars: the iteration variables
         iter_loop: the iteration loop
@@ -212,9 +574,16 @@ class Pkg(ABC):
         self.mod_env = None
         self.iterator = None
         self.exit_code = 0
+        self.configure_time = 0
         self.start_time = 0
         self.stop_time = 0
+        self.clean_time = 0
         self.skip_run = False
+        self._fs_plan = None
+        # The inputs read by _configure, while it executes
+        self._input_trace = None
+        self.store = None
+        self._saved_state = None
 
     def log(self, msg, color=None):
         ColorPrinter.print(msg, color)
@@ -242,6 +611,34 @@ class Pkg(ABC):
             self.env_path = None
         else:
             self.env_path = f'{self.config_dir}/env.yaml'
+        if self.root is self and self.store is None:
+            self.store = PipelineStore.open(self.config_dir)
+
+    def _has_config(self):
+        store = self.root.store
+        if store is not None:
+            return store.has(self.global_id)
+        return os.path.exists(self.config_path)
+
+    def _get_state(self):
+        # A digest of the saved state, used to skip unchanged pkgs on save
+        env = self.env if self.env_path is not None else None
+        return digest([self.config, env])
+
+    @property
+    def fs_plan(self):
+        """
+        The plan used to batch remote mkdir/rm operations. It is shared
+        by all pkgs in a pipeline.
+
+        :return: RemoteFsPlan
+        """
+        root = self.root if self.root is not None else self
+        if root._fs_plan is None:
+            root._fs_plan = RemoteFsPlan()
+        if self._input_trace is not None:
+            return self._input_trace.fs_plan(root._fs_plan)
+        return root._fs_plan
 
     def _get_global_id(self, global_id):
         if global_id is None:
@@ -258,13 +655,18 @@ class Pkg(ABC):
         this pkg. Indicates where configuration data is stored.
         :return: self
         """
+        if self.root is None:
+            pipeline = self._batch_get(global_id)
+            if pipeline is not None:
+                return pipeline
         self._init_common(global_id, self.root)
-        if os.path.exists(self.config_path):
+        if self._has_config():
             self.load(global_id, self.root)
             return self
         self.config = {
             'sub_pkgs': []
         }
+        self._saved_state = None
         self.sub_pkgs = []
         self.env_path = f'{self.config_dir}/env.yaml'
         if self.env is None:
@@ -273,6 +675,8 @@ class Pkg(ABC):
         if self.shared_dir is not None:
             os.makedirs(self.shared_dir, exist_ok=True)
         self._init()
+        if self.root is self and self.jarvis.batch is not None:
+            self.jarvis.batch.add(self, created=True)
         return self
 
     def load(self, global_id=None, root=None, with_config=True):
@@ -286,16 +690,27 @@ class Pkg(ABC):
         :param with_config: Whether to load pkg configurations
         :return: self
         """
+        if root is None:
+            pipeline = self._batch_get(global_id)
+            if pipeline is not None:
+                return pipeline
         self._init_common(global_id, root)
-        if self.env_path is not None and os.path.exists(self.env_path):
-            self.env = YamlFile(self.env_path).load()
+        store = self.root.store
+        if self.env_path is not None and store is not None:
+            self.env = store.env
+        elif self.env_path is not None and os.path.exists(self.env_path):
+            self.env = self.jarvis.load_yaml(self.env_path)
         elif self.root is not None:
             self.env = self.root.env
-        if not os.path.exists(self.config_path):
+        if not self._has_config():
             return self.create(global_id)
         if not with_config:
             return self
-        self.config = YamlFile(self.config_path).load()
+        if store is not None:
+            self.config = store.get(self.global_id)
+        else:
+            self.config = self.jarvis.load_yaml(self.config_path)
+        self._saved_state = self._get_state()
         for sub_pkg_type, sub_pkg_id in self.config['sub_pkgs']:
             sub_pkg = self.jarvis.construct_pkg(sub_pkg_type)
             if sub_pkg is None:
@@ -305,20 +720,63 @@ class Pkg(ABC):
             self.sub_pkgs.append(sub_pkg)
             self.sub_pkgs_dict[sub_pkg.pkg_id] = sub_pkg
         self._init()
+        if self.root is self and self.jarvis.batch is not None:
+            self.jarvis.batch.add(self)
         return self
 
+    def _batch_get(self, global_id):
+        """
+        Get a pipeline kept in memory by the batch being executed
+
+        :param global_id: The id of the pipeline (None for the current)
+        :return: Pipeline or None
+        """
+        if self.jarvis.batch is None:
+            return None
+        return self.jarvis.batch.get(self._get_global_id(global_id))
+
     def save(self):
         """
-        Save a pkg and its sub-pkgs
+        Save a pkg and its sub-pkgs. Only pkgs whose config or environment
+        changed since they were loaded are written. During a batch, the
+        pipeline is saved when the batch completes.
+
         :return: Self
         """
+        if self.jarvis.batch is not None:
+            self.jarvis.batch.defer(self.root)
+            return self
+        self._save()
+        if self.root.store is not None:
+            self.root.store.save()
+        return self
+
+    def _save(self):
         self.config['pkg_type'] = self.pkg_type
-        YamlFile(self.config_path).save(self.config)
-        if self.env_path is not None:
-            YamlFile(self.env_path).save(self.env)
+        state = self._get_state()
+        if state != self._saved_state:
+            store = self.root.store
+            if store is not None:
+                store.put(self.global_id, self.config)
+                if self.root is self:
+                    store.set_env(self.env)
+            else:
+                YamlFile(self.config_path).save(self.config)
+                if self.env_path is not None:
+                    YamlFile(self.env_path).save(self.env)
+            self._saved_state = state
         for pkg in self.sub_pkgs:
-            pkg.save()
-        return self
+            pkg._save()
+
+    def walk(self):
+        """
+        Iterate over this pkg and all of its sub-pkgs (recursively)
+
+        :return: Generator of pkgs
+        """
+        yield self
+        for pkg in self.sub_pkgs:
+            yield from pkg.walk()
 
     def set_config_env_vars(self, cur_iter_temp=None):
         if cur_iter_temp is not None:
@@ -347,7 +805,10 @@ class Pkg(ABC):
                 path = os.path.join(self.config_dir, dir_name)
                 if os.path.isdir(path):
                     shutil.rmtree(path)
-            os.remove(self.config_path)
+            if self.root.store is not None:
+                self.root.store.drop(self.global_id)
+            else:
+                os.remove(self.config_path)
             self.create(self.global_id)
         except FileNotFoundError:
             pass
@@ -371,6 +832,10 @@ class Pkg(ABC):
         for pkg in self.sub_pkgs:
             if pkg is not None:
                 pkg.destroy()
+        if self.root is self and self.jarvis.batch is not None:
+            self.jarvis.batch.forget(self.global_id)
+        if self.root is not None and self.root.store is not None:
+            self.root.store.drop(self.global_id)
         try:
             shutil.rmtree(self.config_dir)
         except FileNotFoundError:
@@ -406,6 +871,7 @@ class Pkg(ABC):
         if pkg is None:
             raise Exception(f'Could not find pkg: {pkg_type}')
         global_id = f'{self.global_id}.{pkg_id}'
+        pkg.root = self.root
         pkg.create(global_id)
         if do_configure:
             pkg.update_env(self.env)
@@ -475,6 +941,31 @@ class Pkg(ABC):
             [test_pkg_type, test_pkg_id]
             for test_pkg_type, test_pkg_id in self.config['sub_pkgs']
             if test_pkg_id != pkg_id]
+        if 'deps' in self.config:
+            self.config['deps'].pop(pkg_id, None)
+            for deps in self.config['deps'].values():
+                if pkg_id in deps:
+                    deps.remove(pkg_id)
+        return self
+
+    def set_deps(self, pkg_id, after):
+        """
+        Declare the pkgs which must be started before a pkg (see
+        run_graph)
+
+        :param pkg_id: The name of the pkg
+        :param after: A pkg name or list of pkg names. An empty list means
+        the pkg depends on nothing, so it can start concurrently with the
+        pkgs before it.
+        :return: self
+        """
+        if isinstance(after, str):
+            after = [after]
+        for dep_id in after:
+            if self.get_pkg(dep_id) is None:
+                raise Exception(f'{pkg_id} depends on an unknown pkg: '
+                                f'{dep_id}')
+        self.config.setdefault('deps', {})[pkg_id] = list(after)
         return self
 
     def get_pkg(self, pkg_id):
@@ -613,10 +1104,48 @@ class Pkg(ABC):
         """
         self.env[env_var] = val
 
+    def cached_build(self, name, src_dir, build_fn, opts=None,
+                     env_vars=None, outputs=None):
+        """
+        Build software through the jarvis build cache. The build is only
+        executed if no build exists with the same source revision, options,
+        environment variables, and compilers.
+
+        :param name: The name of the software being built
+        :param src_dir: The root of the source tree
+        :param build_fn: A function which builds into the directory it is
+        given
+        :param opts: The build options (e.g., cmake options)
+        :param env_vars: The environment variables the build depends on
+        :param outputs: Files the build must produce (see BuildCache.build).
+        In-source builds should list their outputs, since they are not
+        removed with the cached build directory.
+        :return: The build directory
+        """
+        if env_vars is None:
+            env_vars = []
+        inputs = {
+            'src_dir': src_dir,
+            'revision': source_revision(src_dir),
+            'opts': opts,
+            'env': {var: self.env.get(var) for var in env_vars},
+            'compiler': compiler_info(self.env),
+        }
+        build_dir = self.jarvis.build_cache.build(name, inputs, build_fn,
+                                                  log=self.log,
+                                                  outputs=outputs)
+        # Another pipeline may evict the build, which must invalidate the
+        # cached configure of this pkg (see SimplePkg.configure)
+        self.build_files += [build_dir] + [
+            os.path.join(build_dir, path) for path in outputs or []]
+        return build_dir
+
     def find_library(self, lib_name, env_vars=None):
         """
         Find the location of a shared object automatically using environment
-        variables. If None, will search LD_LIBRARY_PATH.
+        variables. If None, will search LD_LIBRARY_PATH. Results are cached
+        (see LibraryCache) until the environment, compiler, or searched
+        directories change.
 
         :param lib_name: The library to search for. We will search for
         any file matching lib{lib_name}.so and {lib_name}.so.
@@ -624,6 +1153,19 @@ class Pkg(ABC):
         a string for a single variable.
         :return: string or None
         """
+        if env_vars is None:
+            env_vars = ['LD_LIBRARY_PATH']
+        if isinstance(env_vars, str):
+            env_vars = [env_vars]
+        inputs = {
+            'env': {env_var: self.env.get(env_var)
+                    for env_var in env_vars + ['LIBRARY_PATH']},
+            'cc': compiler_key(self.env.get('PATH')),
+        }
+        lib_cache = self.jarvis.lib_cache
+        lib_path = lib_cache.get(lib_name, inputs)
+        if lib_path is not None:
+            return lib_path
         name_opts = [
             f'{lib_name}.so',
             f'lib{lib_name}.so',
@@ -635,21 +1177,22 @@ class Pkg(ABC):
                                       collect_output=True))
             res = exec.stdout['localhost'].strip()
             if len(res) and res != name:
+                lib_cache.put(lib_name, inputs, res, [])
                 return res
-        if env_vars is None:
-            env_vars = ['LD_LIBRARY_PATH']
 
+        searched = []
         for env_var in env_vars:
             if env_var not in self.env:
                 continue
             paths = self.env[env_var].split(':')
             for path in paths:
-                if not os.path.exists(path):
-                    continue
-                filenames = os.listdir(path)
+                filenames = list_dir(path)
+                searched.append(path)
                 for name_opt in name_opts:
                     if name_opt in filenames:
-                        return f'{path}/{name_opt}'
+                        lib_path = f'{path}/{name_opt}'
+                        lib_cache.put(lib_name, inputs, lib_path, searched)
+                        return lib_path
         return None
 
     def __str__(self):
@@ -665,7 +1208,7 @@ class Pkg(ABC):
         space = ' ' * depth
         info = [f'{space}{self.pkg_type} with name {self.pkg_id}']
         for key, val in self.config.items():
-            if key == 'sub_pkgs':
+            if key == 'sub_pkgs' or key.startswith('_'):
                 continue
             info.append(f'{space}  {key}={val}')
         for sub_pkg in self.sub_pkgs:
@@ -688,6 +1231,25 @@ class SimplePkg(Pkg):
     A SimplePkg represents a single program. A pipeline is not a SimplePkg
     because it represents a combination of multiple programs.
     """
+    # Whether _configure can be skipped when its inputs are unchanged.
+    # Pkgs whose _configure has side effects that are not captured by
+    # their config, env, or files in the config/shared dirs should
+    # set this to False.
+    configure_cache = True
+    # Whether to record the inputs _configure reads (see configure_inputs)
+    # and only reconfigure when one of them changed. Otherwise, any change
+    # to the pkg's parameters, environment, or the hostfile reconfigures it.
+    # Reads of os.environ, of other pkgs' configs, and of files outside
+    # the pkg's directory are not recorded. Pkgs whose _configure depends
+    # on them should set configure_cache to False.
+    track_configure_inputs = True
+
+    def __init__(self):
+        super().__init__()
+        # Whether the last call to configure was skipped
+        self.config_cached = False
+        # The build directories and outputs used by the last configure
+        self.build_files = []
 
     def configure_menu(self):
         """
@@ -703,6 +1265,13 @@ class SimplePkg(Pkg):
                 'type': int,
                 'default': 0,
             },
+            {
+                'name': 'ready_timeout',
+                'msg': 'The maximum time to wait for a service to become '
+                       'ready during start (seconds)',
+                'type': int,
+                'default': 120,
+            },
             {
                 'name': 'reinit',
                 'msg': 'Destroy previous configuration and rebuild',
@@ -767,7 +1336,176 @@ class SimplePkg(Pkg):
         if kwargs['stderr'] == 'stdout':
             kwargs['stderr'] = kwargs['stdout']
         self.update_config(kwargs, rebuild=kwargs['reinit'])
-        self._configure(**kwargs)
+        cache = self.config.pop('_configure_cache', None)
+        config_hash = self.configure_hash(cache)
+        self.config_cached = False
+        if self.configure_cache and not kwargs['reinit'] and \
+                self.is_configure_cached(cache, config_hash):
+            self.log(f'[CONFIGURE] {self.pkg_id}: unchanged, skipping',
+                     color=Color.YELLOW)
+            self.env.update(cache['env'])
+            # Directories made on every host may be missing on new hosts
+            for paths in cache.get('inputs', {}).get('mkdirs', []):
+                self.fs_plan.mkdir(paths, self.jarvis.hostfile)
+            self.config['_configure_cache'] = cache
+            self.config_cached = True
+            return
+        self.fs_plan.mkdir(self.private_dir, self.jarvis.hostfile)
+        env = dict(self.env)
+        start = time.time()
+        self.build_files = []
+        inputs = None
+        if self.track_configure_inputs:
+            inputs = self._configure_tracked(kwargs)
+        else:
+            self._configure(**kwargs)
+        self.config['_configure_cache'] = {
+            'hash': config_hash,
+            'env': {key: strip_pool_path(val) if key == 'PATH' else val
+                    for key, val in self.env.items()
+                    if key not in env or env[key] != val},
+            'files': self._find_new_files(start) + self.build_files
+        }
+        if inputs is not None:
+            self.config['_configure_cache']['inputs'] = inputs
+
+    def _configure_tracked(self, kwargs):
+        """
+        Call _configure and record the inputs it read
+
+        :param kwargs: The parameters passed to _configure
+        :return: The inputs (see InputTrace.record)
+        """
+        config, env = self.config, self.env
+        trace = InputTrace(self.jarvis)
+        self.config = TrackedDict(config)
+        self.env = TrackedDict(env)
+        self.jarvis = trace.manager()
+        self._input_trace = trace
+        try:
+            self._configure(**kwargs)
+        finally:
+            self.jarvis = trace.jarvis
+            self._input_trace = None
+            tracked_config, tracked_env = self.config, self.env
+            if isinstance(tracked_config, TrackedDict):
+                config_keys = tracked_config.input_keys()
+                config.clear()
+                config.update(dict.items(tracked_config))
+                self.config = config
+            else:
+                config_keys = set(self.config)
+            # The environment may be shared with the pipeline, so the
+            # changes are applied to the original dict
+            if isinstance(tracked_env, TrackedDict):
+                env_keys = tracked_env.input_keys() - tracked_env.writes
+                for key in tracked_env.writes:
+                    if dict.__contains__(tracked_env, key):
+                        env[key] = dict.__getitem__(tracked_env, key)
+                    else:
+                        env.pop(key, None)
+                self.env = env
+            else:
+                env_keys = set(self.env)
+        config_keys |= set(kwargs) - {'reinit', 'sleep'}
+        return trace.record(self, config_keys, env_keys,
+                            self.configure_static_hash())
+
+    def _src_mtime(self):
+        """
+        The last modification of the pkg's source. For pkgs in a repo
+        (repo/pkg_type/pkg.py), this includes the files next to pkg.py,
+        such as configuration templates.
+
+        :return: float
+        """
+        try:
+            path = inspect.getfile(self.__class__)
+            if os.path.basename(path) != 'pkg.py':
+                return os.path.getmtime(path)
+            mtime = 0
+            for root, dirs, files in os.walk(os.path.dirname(path)):
+                dirs[:] = [name for name in dirs if name != '__pycache__']
+                for name in files:
+                    mtime = max(mtime,
+                                os.path.getmtime(os.path.join(root, name)))
+            return mtime
+        except OSError:
+            return 0
+
+    def configure_hash(self, cache=None):
+        """
+        Hash the inputs of _configure: the pkg's source, its CLI-configurable
+        parameters, its environment (excluding variables the pkg itself set
+        during the last configure), the hostfile, and its directories.
+
+        :param cache: The cache record of the previous configure
+        :return: str
+        """
+        exports = cache['env'] if cache else {}
+        menu_keys = [m['name'] for m in self.configure_menu()]
+        inputs = {
+            'pkg_type': self.pkg_type,
+            'src_mtime': self._src_mtime(),
+            'config': {key: self.config.get(key) for key in menu_keys
+                       if key not in ['reinit', 'sleep']},
+            'env': {key: strip_pool_path(val) if key == 'PATH' else val
+                    for key, val in self.env.items()
+                    if key not in exports},
+            'hosts': self.jarvis.hostfile.hosts,
+            'dirs': [self.config_dir, self.shared_dir, self.private_dir],
+        }
+        text = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def configure_static_hash(self):
+        """
+        Hash the inputs of _configure which are not read through the
+        config, env, or jarvis manager: the pkg's source (see _src_mtime)
+        and directories.
+
+        :return: str
+        """
+        return digest([self.pkg_type, self._src_mtime(),
+                       [self.config_dir, self.shared_dir, self.private_dir]])
+
+    def is_configure_cached(self, cache, config_hash):
+        """
+        Check whether a previous configure can be reused. If the inputs
+        of the previous configure were recorded, only those are compared.
+
+        :param cache: The cache record of the previous configure
+        :param config_hash: The hash of the current configure inputs
+        :return: True or False
+        """
+        if not cache:
+            return False
+        if 'inputs' in cache:
+            if inputs_changed(self, cache['inputs'],
+                              self.configure_static_hash()):
+                return False
+        elif cache['hash'] != config_hash:
+            return False
+        for path in cache['files']:
+            if not os.path.exists(path):
+                return False
+        return True
+
+    def _find_new_files(self, start):
+        """
+        Find the files in the config and shared dirs modified since start.
+
+        :param start: The time to compare modification times against
+        :return: List of paths
+        """
+        paths = []
+        for dir_path in [self.config_dir, self.shared_dir]:
+            if dir_path is None or not os.path.exists(dir_path):
+                continue
+            for entry in os.scandir(dir_path):
+                if entry.is_file() and entry.stat().st_mtime >= start - 1:
+                    paths.append(entry.path)
+        return paths
 
     @abstractmethod
     def _configure(self, **kwargs):
@@ -790,8 +1528,6 @@ class SimplePkg(Pkg):
         from self.conifgure_menu
         :return:
         """
-        Mkdir(self.private_dir,
-              PsshExecInfo(hostfile=self.jarvis.hostfile))
         menu = self.configure_menu()
         menu_keys = {m['name']: True for m in menu}
         args = []
@@ -913,6 +1649,36 @@ class Service(SimplePkg):
         """
         pass
 
+    def reset_state(self):
+        """
+        Reset a running service to its initial state (e.g., delete all
+        of its data), so that the next iteration of a sweep can reuse it
+        instead of restarting it. Services which override this are kept
+        running between iterations in hot_services mode.
+
+        :return: True if the state was reset. False to restart instead.
+        """
+        return False
+
+    def wait_ready(self, probes=None):
+        """
+        Wait for a service to become ready. If no readiness probes are
+        given, sleep for the configured amount of time instead.
+
+        :param probes: A list of ReadinessProbes (see readiness.py)
+        :return: None
+        """
+        if not probes:
+            self.log(f'Sleeping for {self.config["sleep"]} seconds',
+                     color=Color.YELLOW)
+            time.sleep(self.config['sleep'])
+            return
+        timeout = self.config.get('ready_timeout', 120)
+        waited = wait_ready(probes, timeout=timeout,
+                            log=lambda msg: self.log(msg, Color.YELLOW))
+        self.log(f'{self.pkg_id} was ready after {waited:.2f} seconds',
+                 color=Color.YELLOW)
+
 
 class Application(Service):
     """
@@ -923,13 +1689,183 @@ class Application(Service):
     def status(self):
         return True
 
+    def metric_parser(self):
+        """
+        The parser used to extract metrics from the output of this
+        application (see metrics.py). Applications which report metrics
+        override this and write their output to self.metric_path().
+
+        :return: MetricParser or None
+        """
+        return None
+
+    def metric_path(self):
+        """
+        The file the output of this application is written to
+
+        :return: str
+        """
+        os.makedirs(self.config_dir, exist_ok=True)
+        return f'{self.config_dir}/{self.pkg_id}.out'
+
+    def clear_metrics(self):
+        """
+        Remove the output of a previous run, so that a failed run does not
+        report stale metrics
+
+        :return: None
+        """
+        path = f'{self.config_dir}/{self.pkg_id}.out'
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _parse_metrics(self, parser):
+        """
+        Apply the metric parser to the output of this application.
+        Override if the output is not in self.metric_path().
+
+        :param parser: The MetricParser
+        :return: None
+        """
+        path = self.metric_path()
+        if os.path.exists(path):
+            parser.parse_file(path)
+
+    def get_metrics(self, stat_dict):
+        """
+        Add the metrics of the last run to the stats
+
+        :param stat_dict: A dictionary of statistics.
+        :return: None
+        """
+        parser = self.metric_parser()
+        if parser is None:
+            return
+        try:
+            self._parse_metrics(parser)
+        except Exception as e:
+            self.log(f'{self.pkg_id}: failed to parse metrics: {e}',
+                     Color.YELLOW)
+            return
+        for name, val in parser.results().items():
+            stat_dict[f'{self.pkg_id}.{name}'] = val
+
 
 class Pipeline(Pkg):
     """
     A pipeline connects the different pkg types together in a chain.
     """
+    @classmethod
+    def transaction(cls, pipeline_id):
+        """
+        Build a pipeline in memory and create, configure, and save it
+        once the transaction completes (see transaction.py)
+
+        with Pipeline.transaction('my_pipeline') as ppl:
+            ppl.append('ior', api='posix')
+
+        :param pipeline_id: The id of the pipeline. An existing pipeline
+        with this id is replaced.
+        :return: PipelineTransaction
+        """
+        return PipelineTransaction(cls, pipeline_id)
+
     def _init(self):
-        pass
+        # The services left running by run_hot: pkg_id -> the config and
+        # environment they were started with
+        self.hot_pkgs = {}
+        # The copies of the environment given to the pkgs of the stage
+        # being run concurrently (see run_graph)
+        self.stage_envs = None
+        self.ssh_pool = None
+        pool_conf = self.config.get('ssh_pool')
+        if pool_conf:
+            persist = 600
+            if isinstance(pool_conf, dict):
+                persist = pool_conf.get('persist', persist)
+            self.ssh_pool = SshPool(self.config_dir, persist,
+                                    pool_root(self.jarvis.private_dir))
+
+    def _get_envs(self):
+        envs = [self.env, self.mod_env]
+        for pkg in self.sub_pkgs:
+            envs += [pkg.env, pkg.mod_env]
+        return envs
+
+    @contextmanager
+    def ssh_session(self):
+        """
+        Route the ssh commands of all pkgs through the pipeline's
+        connection pool (if ssh_pool is enabled).
+
+        :return: None
+        """
+        pool = self.ssh_pool
+        if pool is not None and not pool.active and \
+                pool.activate(self._get_envs()):
+            try:
+                pool.open(self.jarvis.hostfile, self.env)
+                yield
+            finally:
+                pool.deactivate(self._get_envs())
+        else:
+            yield
+
+    def compact_state(self):
+        """
+        Store the state of the pipeline in a single binary file instead of
+        a YAML file per pkg.
+
+        :return: self
+        """
+        if self.store is not None:
+            return self
+        self.store = PipelineStore(PipelineStore.get_path(self.config_dir))
+        for pkg in self.walk():
+            pkg.config['pkg_type'] = pkg.pkg_type
+            self.store.put(pkg.global_id, pkg.config)
+            pkg._saved_state = pkg._get_state()
+        self.store.set_env(self.env)
+        self.store.save()
+        for pkg in self.walk():
+            for path in [pkg.config_path, f'{pkg.config_dir}/env.yaml']:
+                if os.path.exists(path):
+                    os.remove(path)
+        return self
+
+    def export_state(self):
+        """
+        Convert the state of the pipeline back into the YAML layout
+        (a YAML file per pkg + env.yaml).
+
+        :return: self
+        """
+        if self.store is None:
+            return self
+        store = self.store
+        self.store = None
+        for pkg in self.walk():
+            pkg._saved_state = None
+        self.save()
+        os.remove(store.path)
+        return self
+
+    def set_ssh_pool(self, enable=True, persist=600):
+        """
+        Enable or disable the ssh connection pool
+
+        :param enable: Whether to multiplex ssh connections
+        :param persist: How long (seconds) idle connections stay open
+        :return: self
+        """
+        if self.ssh_pool is not None:
+            self.ssh_pool.close()
+        if enable:
+            self.config['ssh_pool'] = {'persist': persist}
+        else:
+            self.config.pop('ssh_pool', None)
+        self._init()
+        return self
 
     def configure(self, pkg_id, **kwargs):
         """
@@ -943,7 +1879,21 @@ class Pipeline(Pkg):
         if pkg is None:
             raise Exception(f'Could not find pkg: {pkg_id}')
         pkg.update_env(self.env)
-        pkg.configure(**kwargs)
+        self.configure_pkg(pkg, **kwargs)
+
+    def configure_pkg(self, pkg, **kwargs):
+        """
+        Configure a pkg and record the time spent
+
+        :param pkg: The pkg to configure
+        :param kwargs: Configuration parameters
+        :return: None
+        """
+        start = time.time()
+        with span(f'{pkg.pkg_id}.configure', 'configure',
+                  pkg_type=pkg.pkg_type):
+            pkg.configure(**kwargs)
+        pkg.configure_time = time.time() - start
 
     def build_env(self, env_track_dict=None):
         """
@@ -978,23 +1928,64 @@ class Pipeline(Pkg):
     def from_yaml_dict(self, config, do_configure=True):
         """
         Create a pipeline from a YAML file
+        YAML format:
+        name: pipeline_name
+        max_workers: 4
+        ssh_pool: true
+        pkgs:
+          - pkg_type: redis
+            pkg_name: redis
+          - pkg_type: pymonitor
+            pkg_name: pymonitor
+            after: []
+          - pkg_type: ycsbc
+            pkg_name: ycsbc
+            after: [redis, pymonitor]
+
+        If any pkg specifies after (or needs), pkgs are started concurrently
+        once the pkgs they depend on have started. A pkg which specifies
+        neither starts after the pkg listed before it, and after: []
+        means the pkg depends on nothing. Without any after (or needs),
+        pkgs are started one at a time in order.
+
+        If ssh_pool is true (or {persist: seconds}), ssh connections to
+        each host are opened once and reused by all pkgs.
 
         :param path:
         :param do_configure: Whether to append and configure
         :return: self
         """
         pipeline_id = config['name']
+        if self.jarvis.batch is not None:
+            # The pipeline is rebuilt from scratch
+            self.jarvis.batch.forget(pipeline_id)
         self.create(pipeline_id)
         self.reset()
         if 'env' in config:
             self.copy_static_env(config['env'])
+        deps = {}
         for sub_pkg in config['pkgs']:
             pkg_type = sub_pkg['pkg_type']
             pkg_name = sub_pkg['pkg_name']
             del sub_pkg['pkg_type']
             del sub_pkg['pkg_name']
+            # after/needs: the pkgs which must be started before this one
+            for key in ['after', 'needs']:
+                if key in sub_pkg:
+                    after = sub_pkg.pop(key)
+                    if isinstance(after, str):
+                        after = [after]
+                    deps.setdefault(pkg_name, []).extend(after)
             self.append(pkg_type, pkg_name,
                         do_configure, **sub_pkg)
+        if len(deps):
+            self.config['deps'] = deps
+        if 'max_workers' in config:
+            self.config['max_workers'] = config['max_workers']
+        if 'ssh_pool' in config:
+            self.config['ssh_pool'] = config['ssh_pool']
+            self._init()
+        self.get_stages()
         return self
 
     def from_yaml(self, path, do_configure=True):
@@ -1031,6 +2022,46 @@ class Pipeline(Pkg):
             - [pkg_name.var1, pkg_name.var2]
             - [pkg_name.var3]
         output: my_dir
+        repeat: 1
+        parallel: 1
+        search:
+            strategy: random
+            samples: 20
+        hot_services: false
+        constraints:
+            - pkg_name.var1 <= pkg_name.var2
+        derived:
+            pkg_name.var4: pkg_name.var1 * 2
+        adaptive:
+            metric: pkg_name.stat
+            rel_ci: 0.05
+            confidence: 0.95
+            min_repeat: 3
+            max_repeat: 10
+
+        parallel is the number of iterations to run concurrently. The
+        hostfile (or the CPUs of this node) is divided evenly between them.
+
+        search selects the points to evaluate instead of the full grid of
+        the loop (see search.py): random, lhs, halving, hyperband, or bayes.
+        halving, hyperband, and bayes optimize a metric (metric, mode).
+        The seed defaults to a hash of the iterator config, so a resumed
+        sweep evaluates the same points.
+
+        hot_services keeps services which implement reset_state running
+        between points whose configuration of the service is unchanged.
+        The loop is reordered so the variables of hot services change as
+        rarely as possible. Points chosen by a search strategy run in the
+        order the strategy generates them, so a hot service is restarted
+        whenever consecutive points configure it differently.
+
+        constraints are expressions over the variables (see expr.py).
+        Points where one is false are skipped. derived variables are
+        computed from the variables of each point, in order.
+
+        adaptive repeats each point until the confidence interval of the
+        metric is within +/- rel_ci of its mean. max_repeat defaults to
+        repeat.
 
         :param path:
         :param do_configure: Whether to append and configure
@@ -1044,6 +2075,18 @@ class Pipeline(Pkg):
         self.config['iterator']['repeat'] = config['repeat']
         if 'norerun' in config:
             self.config['iterator']['norerun'] = config['norerun']
+        if 'parallel' in config:
+            self.config['iterator']['parallel'] = config['parallel']
+        if 'adaptive' in config:
+            self.config['iterator']['adaptive'] = config['adaptive']
+        if 'search' in config:
+            self.config['iterator']['search'] = config['search']
+        if 'constraints' in config:
+            self.config['iterator']['constraints'] = config['constraints']
+        if 'hot_services' in config:
+            self.config['iterator']['hot_services'] = config['hot_services']
+        if 'derived' in config:
+            self.config['iterator']['derived'] = config['derived']
         return self
 
     def get_static_env_path(self, env_name):
@@ -1106,24 +2149,89 @@ class Pipeline(Pkg):
 
     def update(self):
         """
-        Re-run configure on all sub-pkgs.
+        Re-run configure on all sub-pkgs, in dependency order. Pkgs whose
+        configure inputs are unchanged are skipped.
 
         :return: self
         """
-        for pkg in self.sub_pkgs:
-            pkg.env = self.env
-            pkg.configure()
+        def configure(pkg):
+            pkg.env = self.pkg_env(pkg)
+            self.configure_pkg(pkg)
+        with self.ssh_session():
+            # Create all private directories using a single parallel ssh
+            self.fs_plan.mkdir([pkg.private_dir for pkg in self.sub_pkgs],
+                               self.jarvis.hostfile)
+            self.run_graph(configure)
         return self
 
     def run_iter(self, resume=False):
         """
         Run the pipeline repeatedly with new configurations
+
+        :param resume: Skip the runs recorded in the ledger of a previous
+        invocation, instead of starting over.
         """
+        tracer = Tracer(self.global_id)
+        set_tracer(tracer)
+        try:
+            with self.ssh_session(), tracer.span(self.global_id, 'pipeline'):
+                self._run_iter(resume)
+        finally:
+            self.stop_hot()
+            set_tracer(None)
+            if self.iterator is not None and \
+                    os.path.exists(self.iterator.iter_out):
+                trace_path = os.path.join(self.iterator.iter_out,
+                                          'trace.json')
+                tracer.save(trace_path)
+                self.log(f'[ITER] Stored trace in: {trace_path}',
+                         Color.BRIGHT_BLUE)
+
+    def _run_iter(self, resume):
         self.iterator = PipelineIterator(self)
-        conf_dict = self.iterator.begin()
+        if resume:
+            count = self.iterator.load_ledger()
+            self.log(f'[ITER] Resuming after {count} completed runs',
+                     Color.BRIGHT_BLUE)
+        else:
+            self.iterator.reset_ledger()
+        search = self.iterator.search
+        if self.iterator.parallel > 1 and search is not None and \
+                search.sequential:
+            self.log(f'[ITER] The {search.__class__.__name__} strategy '
+                     f'depends on previous results, so points run serially',
+                     Color.YELLOW)
+            self.iterator.parallel = 1
+        if self.iterator.parallel > 1 and self.iterator.hot:
+            self.log(f'[ITER] hot_services is ignored when points run in '
+                     f'parallel', Color.YELLOW)
+            self.iterator.hot = False
+        if self.iterator.parallel > 1:
+            SweepScheduler(self, self.iterator.parallel).run()
+            conf_dict = None
+        else:
+            conf_dict = self.iterator.begin()
+        skipped = False
         while conf_dict is not None:
-            self.clean(with_iter_out=False)
-            for i in range(self.iterator.repeat):
+            reps = self.iterator.pending_reps()
+            if len(reps) == 0:
+                self.log(f'[ITER] (skipping) Iteration'
+                         f'[(param) {self.iterator.iter_count + 1}/{self.iterator.max_iter_count}]: '
+                         f'{self.iterator.linear_conf_dict}', Color.YELLOW)
+                skipped = True
+                conf_dict = self.iterator.next()
+                continue
+            if skipped:
+                # The pkgs did not run the previous point
+                for pkg in conf_dict:
+                    pkg.iter_diff = 1
+                skipped = False
+            if not self.iterator.hot:
+                self.clean(with_iter_out=False)
+            elif not self.hot_pkgs:
+                # Remove anything left behind by a previous sweep
+                self.clean(with_iter_out=False)
+            for i in reps:
                 cur_iter_tmp = os.path.join(
                     self.iterator.iter_out,
                     f'{self.iterator.iter_count}-{i}')
@@ -1132,13 +2240,23 @@ class Pipeline(Pkg):
                          f'[(param) {self.iterator.iter_count + 1}/{self.iterator.max_iter_count}]'
                          f'[(rep) {i + 1}/{self.iterator.repeat}]: '
                          f'{self.iterator.linear_conf_dict}', Color.BRIGHT_BLUE)
-                self.iterator.config_pkgs(conf_dict)
-                self.run(kill=True)
-                self.iterator.save_run(conf_dict)
-                self.clean(with_iter_out=False)
+                with span(f'iteration {self.iterator.iter_count}-{i}',
+                          'iteration', **self.iterator.linear_conf_dict):
+                    self.iterator.config_pkgs(conf_dict)
+                    if self.iterator.hot:
+                        self.run_hot()
+                    else:
+                        self.run(kill=True)
+                    self.iterator.save_run(conf_dict, i)
+                    if not self.iterator.hot:
+                        self.clean(with_iter_out=False)
+                if self.iterator.point_converged():
+                    break
             conf_dict = self.iterator.next()
+        self.stop_hot()
         self.log(f'[ITER] Beginning analysis', Color.BRIGHT_BLUE)
         self.iterator.analysis()
+        self.iterator.log_best()
         self.log(f'[ITER] Finished analysis', Color.BRIGHT_BLUE)
         self.log(f'[ITER] Stored results in: {self.iterator.stats_path}', Color.BRIGHT_BLUE)
 
@@ -1149,11 +2267,100 @@ class Pipeline(Pkg):
         :param kill: Whether to kill the pipeline
         :return: None
         """
-        self.start()
-        if kill:
-            self.kill()
-        else:
-            self.stop()
+        tracer = None
+        if get_tracer() is None:
+            # A standalone run records its own trace
+            tracer = Tracer(self.global_id)
+            set_tracer(tracer)
+        try:
+            with self.ssh_session(), span('run', 'pipeline'):
+                self.start()
+                if kill:
+                    self.kill()
+                else:
+                    self.stop()
+        finally:
+            if tracer is not None:
+                set_tracer(None)
+                tracer.save(os.path.join(self.config_dir, 'trace.json'))
+        if self.ssh_pool is not None:
+            stats = self.ssh_pool.stats()
+            self.log(f'[SSH] {stats["ssh_calls"] + stats["scp_calls"]} '
+                     f'commands reused {stats["connections"]} connections',
+                     color=Color.GREEN)
+
+    @staticmethod
+    def is_hot(pkg):
+        """
+        Whether a pkg can be kept running between iterations
+
+        :param pkg: The pkg
+        :return: bool
+        """
+        return isinstance(pkg, Service) and \
+            type(pkg).reset_state is not Service.reset_state
+
+    def run_hot(self):
+        """
+        Run one iteration of a sweep, reusing the services started by the
+        previous iteration. A hot service is only restarted if its config
+        or environment changed, if its state cannot be reset, or if a hot
+        service before it was restarted. All other pkgs run, stop, and
+        are cleaned as in a normal iteration.
+
+        :return: None
+        """
+        self.mod_env = self.env.copy()
+        restarted = False
+        cold_pkgs = []
+        with self.ssh_session(), span('run', 'pipeline'):
+            for pkg in self.sub_pkgs:
+                if not self.is_hot(pkg):
+                    self._start_pkg(pkg)
+                    self.exit_code += pkg.exit_code
+                    cold_pkgs.append(pkg)
+                    continue
+                key = json.dumps([pkg.config, self.mod_env], sort_keys=True,
+                                 default=str)
+                if self.hot_pkgs.get(pkg.pkg_id) == key and not restarted:
+                    self.log(f'[RUN] {pkg.pkg_id}: Resetting state',
+                             color=Color.GREEN)
+                    start = time.time()
+                    with span(f'{pkg.pkg_id}.reset_state', 'start',
+                              pkg_type=pkg.pkg_type):
+                        pkg.update_env(self.env, self.mod_env)
+                        reset = pkg.reset_state()
+                    pkg.start_time = time.time() - start
+                    if reset:
+                        continue
+                if pkg.pkg_id in self.hot_pkgs:
+                    self._kill_pkg(pkg)
+                    self._clean_pkg(pkg)
+                    del self.hot_pkgs[pkg.pkg_id]
+                self._start_pkg(pkg)
+                self.exit_code += pkg.exit_code
+                self.hot_pkgs[pkg.pkg_id] = key
+                restarted = True
+            for pkg in reversed(cold_pkgs):
+                self._kill_pkg(pkg)
+            with self.fs_plan.batch():
+                for pkg in reversed(cold_pkgs):
+                    self._clean_pkg(pkg)
+
+    def stop_hot(self):
+        """
+        Kill and clean the services left running by run_hot
+
+        :return: None
+        """
+        if not self.hot_pkgs:
+            return
+        with self.ssh_session():
+            for pkg in reversed(self.sub_pkgs):
+                if pkg.pkg_id in self.hot_pkgs:
+                    self._kill_pkg(pkg)
+                    self._clean_pkg(pkg)
+        self.hot_pkgs = {}
 
     def start(self):
         """
@@ -1169,26 +2376,33 @@ class Pipeline(Pkg):
         :return: None
         """
         self.mod_env = self.env.copy()
+        with self.ssh_session():
+            self.run_graph(self._start_pkg)
         for pkg in self.sub_pkgs:
-            if pkg.skip_run:
-                self.log(f'[RUN] (skipping) {pkg.pkg_id}: Start', color=Color.YELLOW)
-            else:
-                self.log(f'[RUN] {pkg.pkg_id}: Start', color=Color.GREEN)
+            self.exit_code += pkg.exit_code
+
+    def _start_pkg(self, pkg):
+        if pkg.skip_run:
+            self.log(f'[RUN] (skipping) {pkg.pkg_id}: Start', color=Color.YELLOW)
+        else:
+            self.log(f'[RUN] {pkg.pkg_id}: Start', color=Color.GREEN)
 
-            start = time.time()
+        start = time.time()
+        with span(f'{pkg.pkg_id}.start', 'start', pkg_type=pkg.pkg_type):
+            if isinstance(pkg, Application):
+                pkg.clear_metrics()
             if isinstance(pkg, Service):
-                pkg.update_env(self.env, self.mod_env)
+                pkg.update_env(self.pkg_env(pkg), self.mod_env)
                 pkg.start()
             if isinstance(pkg, Interceptor):
-                pkg.update_env(self.env, self.mod_env)
+                pkg.update_env(self.pkg_env(pkg), self.mod_env)
                 pkg.modify_env()
-                self.mod_env.update(self.env)
-            self.exit_code += pkg.exit_code
-            end = time.time()
-            pkg.start_time = end - start
-            self.log(f'[RUN] {pkg.pkg_id}: '
-                     f'Start finished in {pkg.start_time} seconds',
-                     color=Color.GREEN)
+                self.mod_env.update(pkg.env)
+        end = time.time()
+        pkg.start_time = end - start
+        self.log(f'[RUN] {pkg.pkg_id}: '
+                 f'Start finished in {pkg.start_time} seconds',
+                 color=Color.GREEN)
 
     def stop(self):
         """
@@ -1196,17 +2410,21 @@ class Pipeline(Pkg):
 
         :return: None
         """
-        for pkg in reversed(self.sub_pkgs):
-            self.log(f'[RUN] {pkg.pkg_id}: Stop', color=Color.GREEN)
-            start = time.time()
+        with self.ssh_session():
+            self.run_graph(self._stop_pkg, reverse=True)
+
+    def _stop_pkg(self, pkg):
+        self.log(f'[RUN] {pkg.pkg_id}: Stop', color=Color.GREEN)
+        start = time.time()
+        with span(f'{pkg.pkg_id}.stop', 'stop', pkg_type=pkg.pkg_type):
             if isinstance(pkg, Service):
-                pkg.update_env(self.env, self.mod_env)
+                pkg.update_env(self.pkg_env(pkg), self.mod_env)
                 pkg.stop()
-            end = time.time()
-            pkg.stop_time = end - start
-            self.log(f'[RUN] {pkg.pkg_id}: '
-                     f'Stop finished in {pkg.stop_time} seconds',
-                     color=Color.GREEN)
+        end = time.time()
+        pkg.stop_time = end - start
+        self.log(f'[RUN] {pkg.pkg_id}: '
+                 f'Stop finished in {pkg.stop_time} seconds',
+                 color=Color.GREEN)
 
     def kill(self):
         """
@@ -1214,15 +2432,21 @@ class Pipeline(Pkg):
 
         :return: None
         """
-        for pkg in reversed(self.sub_pkgs):
-            self.log(f'[RUN] {pkg.pkg_id}: Killing', color=Color.GREEN)
+        with self.ssh_session():
+            self.run_graph(self._kill_pkg, reverse=True)
+
+    def _kill_pkg(self, pkg):
+        self.log(f'[RUN] {pkg.pkg_id}: Killing', color=Color.GREEN)
+        start = time.time()
+        with span(f'{pkg.pkg_id}.kill', 'stop', pkg_type=pkg.pkg_type):
             if isinstance(pkg, Service):
-                pkg.update_env(self.env, self.mod_env)
+                pkg.update_env(self.pkg_env(pkg), self.mod_env)
                 if hasattr(pkg, 'kill'):
                     pkg.kill()
                 else:
                     pkg.stop()
-            self.log(f'[RUN] {pkg.pkg_id}: Finished killing', color=Color.GREEN)
+        pkg.stop_time = time.time() - start
+        self.log(f'[RUN] {pkg.pkg_id}: Finished killing', color=Color.GREEN)
 
     def clean(self, with_iter_out=True):
         """
@@ -1231,19 +2455,114 @@ class Pipeline(Pkg):
         with_iter_out: Clean the iteration output
         :return: None
         """
-        for pkg in reversed(self.sub_pkgs):
-            if pkg.skip_run:
-                self.log(f'[RUN] (skipping) {pkg.pkg_id}: Cleaning', color=Color.YELLOW)
-            else:
-                self.log(f'[RUN] {pkg.pkg_id}: Cleaning', color=Color.GREEN)
-            if isinstance(pkg, Service):
-                pkg.update_env(self.env, self.mod_env)
-                pkg.clean()
-            self.log(f'[RUN] {pkg.pkg_id}: Finished cleaning', color=Color.GREEN)
+        with self.ssh_session(), self.fs_plan.batch():
+            self.run_graph(self._clean_pkg, reverse=True)
         if with_iter_out and 'iterator' in self.config:
             self.iterator = PipelineIterator(self)
             Rm(self.iterator.iter_out)
 
+    def _clean_pkg(self, pkg):
+        if pkg.skip_run:
+            self.log(f'[RUN] (skipping) {pkg.pkg_id}: Cleaning', color=Color.YELLOW)
+        else:
+            self.log(f'[RUN] {pkg.pkg_id}: Cleaning', color=Color.GREEN)
+        start = time.time()
+        with span(f'{pkg.pkg_id}.clean', 'clean', pkg_type=pkg.pkg_type):
+            if isinstance(pkg, Service):
+                pkg.update_env(self.pkg_env(pkg), self.mod_env)
+                pkg.clean()
+        pkg.clean_time = time.time() - start
+        self.log(f'[RUN] {pkg.pkg_id}: Finished cleaning', color=Color.GREEN)
+
+    def get_stages(self):
+        """
+        Divide the pipeline into stages which can be scheduled using
+        the dependency graph. Interceptors modify the environment of every
+        pkg which comes after them, so they are placed in a stage of their
+        own and act as a barrier.
+
+        :return: List of lists of pkgs
+        """
+        stages = [[]]
+        for pkg in self.sub_pkgs:
+            if isinstance(pkg, Interceptor):
+                stages.append([pkg])
+                stages.append([])
+            else:
+                stages[-1].append(pkg)
+        stages = [stage for stage in stages if len(stage)]
+        # Verify dependencies never point to a later stage
+        deps = self.config.get('deps', {})
+        seen = set()
+        for stage in stages:
+            stage_ids = {pkg.pkg_id for pkg in stage}
+            for pkg in stage:
+                for dep_id in deps.get(pkg.pkg_id, []):
+                    if dep_id in seen or dep_id in stage_ids:
+                        continue
+                    if dep_id in self.sub_pkgs_dict:
+                        raise Exception(
+                            f'{pkg.pkg_id} cannot run after {dep_id}, since '
+                            f'an interceptor is placed between them')
+                    raise Exception(
+                        f'{pkg.pkg_id} depends on an unknown pkg: {dep_id}')
+            seen.update(stage_ids)
+        return stages
+
+    def run_graph(self, fn, reverse=False):
+        """
+        Call fn on each pkg in the pipeline. If the pipeline has no
+        dependencies (after/needs), pkgs are executed one at a time in
+        order. Otherwise, pkgs are executed concurrently once their
+        dependencies finished. A pkg which declares no dependencies
+        depends on the pkg listed before it (see implicit_deps).
+
+        While pkgs run concurrently, each has its own copy of the
+        environment (see pkg_env). The changes are merged into the
+        pipeline's environment in pipeline order after each stage.
+
+        :param fn: The function to call on each pkg
+        :param reverse: Whether to use teardown order
+        :return: None
+        """
+        if not self.config.get('deps'):
+            pkgs = reversed(self.sub_pkgs) if reverse else self.sub_pkgs
+            for pkg in pkgs:
+                fn(pkg)
+            return
+        deps = implicit_deps([pkg.pkg_id for pkg in self.sub_pkgs],
+                             self.config['deps'])
+        stages = self.get_stages()
+        if reverse:
+            stages.reverse()
+        for stage in stages:
+            base = dict(self.env)
+            self.stage_envs = {pkg.pkg_id: dict(base) for pkg in stage}
+            try:
+                PipelineGraph(stage, deps).run(
+                    fn, reverse=reverse,
+                    max_workers=self.config.get('max_workers'))
+            finally:
+                stage_envs = self.stage_envs
+                self.stage_envs = None
+                merge_envs(self.env, base,
+                           [stage_envs[pkg.pkg_id] for pkg in stage])
+                for pkg in stage:
+                    if pkg.env is stage_envs[pkg.pkg_id]:
+                        pkg.env = self.env
+
+    def pkg_env(self, pkg):
+        """
+        The environment a pkg should use: the pipeline's environment, or
+        the pkg's copy of it while its stage runs concurrently
+
+        :param pkg: The pkg
+        :return: dict
+        """
+        if self.stage_envs is not None and pkg.pkg_id in self.stage_envs:
+            return self.stage_envs[pkg.pkg_id]
+        return self.env
+
     def status(self):
         """
         Get the status of the pipeline
@@ -1251,15 +2570,17 @@ class Pipeline(Pkg):
         :return: None
         """
         statuses = []
-        for pkg in reversed(self.sub_pkgs):
-            self.log(f'[RUN] {pkg.pkg_id}: Getting status', color=Color.GREEN)
-            status = None
-            if isinstance(pkg, Service):
-                pkg.update_env(self.env, self.mod_env)
-                status = pkg.status()
-                statuses.append(status)
-            self.log(f'[RUN] {pkg.pkg_id}: Status was {status}',
-                     color=Color.GREEN)
+        with self.ssh_session():
+            for pkg in reversed(self.sub_pkgs):
+                self.log(f'[RUN] {pkg.pkg_id}: Getting status',
+                         color=Color.GREEN)
+                status = None
+                if isinstance(pkg, Service):
+                    pkg.update_env(self.env, self.mod_env)
+                    status = pkg.status()
+                    statuses.append(status)
+                self.log(f'[RUN] {pkg.pkg_id}: Status was {status}',
+                         color=Color.GREEN)
         return math.prod(statuses)
 
 
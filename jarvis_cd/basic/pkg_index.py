@@ -0,0 +1,179 @@
+"""
+This module maintains an index of the pkgs provided by each jarvis repo.
+Looking up a pkg in the index avoids attempting to import it from every
+repo. The index is stored in ~/.jarvis/pkg_index.yaml and is rebuilt
+when the set of repos or the contents of a repo change.
+"""
+
+from jarvis_util.serialize.yaml_file import YamlFile
+from jarvis_util.util.import_mod import load_class
+from jarvis_util.util.naming import to_camel_case
+import os
+
+
+class PkgIndex:
+    """
+    An index mapping pkg types to the repo, module, and class which
+    implement them
+    """
+
+    def __init__(self, index_path):
+        """
+        Initialize the index
+
+        :param index_path: Where the index is stored
+        """
+        self.index_path = index_path
+        self.index = None
+        # The classes imported by this process
+        self.classes = {}
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _repo_dir(repo):
+        return os.path.join(repo['path'], repo['name'])
+
+    def scan_repo(self, repo):
+        """
+        Find the pkgs in a repo. Does not import them.
+
+        :param repo: A dict containing the name and path of the repo
+        :return: Dict mapping pkg types to their index entry
+        """
+        pkgs = {}
+        repo_dir = self._repo_dir(repo)
+        if not os.path.exists(repo_dir):
+            return pkgs
+        for entry in os.scandir(repo_dir):
+            if entry.name.startswith('_') or not entry.is_dir():
+                continue
+            pkg_file = os.path.join(entry.path, 'pkg.py')
+            mtime = self._mtime(pkg_file)
+            if mtime is None:
+                continue
+            pkgs[entry.name] = {
+                'module': f'{repo["name"]}.{entry.name}.pkg',
+                'class': to_camel_case(entry.name),
+                'file': pkg_file,
+                'mtime': mtime
+            }
+        return pkgs
+
+    def build(self, repos):
+        """
+        Scan all repos and save the index
+
+        :param repos: The list of jarvis repos
+        :return: self
+        """
+        self.index = {'repos': {}}
+        self.classes = {}
+        for repo in repos:
+            self._index_repo(repo)
+        self.save()
+        return self
+
+    def _index_repo(self, repo):
+        self.index['repos'][repo['name']] = {
+            'path': repo['path'],
+            'mtime': self._mtime(self._repo_dir(repo)),
+            'pkgs': self.scan_repo(repo)
+        }
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        YamlFile(self.index_path).save(self.index)
+
+    def load(self, repos):
+        """
+        Load the index. Repos which were added, moved, or modified since
+        the index was built are re-scanned.
+
+        :param repos: The list of jarvis repos
+        :return: The index dict
+        """
+        if self.index is None and os.path.exists(self.index_path):
+            self.index = YamlFile(self.index_path).load()
+        if not self.index or 'repos' not in self.index:
+            return self.build(repos).index
+        stale = False
+        for repo in repos:
+            indexed = self.index['repos'].get(repo['name'])
+            if indexed is None or indexed['path'] != repo['path'] or \
+                    indexed['mtime'] != self._mtime(self._repo_dir(repo)):
+                self._index_repo(repo)
+                stale = True
+        if stale:
+            self.save()
+        return self.index
+
+    def find(self, pkg_type, repos):
+        """
+        Find the index entry of a pkg. Repos are searched in order.
+
+        :param pkg_type: The type of pkg to find (snake case)
+        :param repos: The list of jarvis repos
+        :return: A tuple (repo, entry) or None
+        """
+        matches = self.find_all(pkg_type, repos)
+        if len(matches) == 0:
+            return None
+        return matches[0]
+
+    def find_all(self, pkg_type, repos):
+        """
+        Find the index entries of a pkg in every repo which provides it
+
+        :param pkg_type: The type of pkg to find (snake case)
+        :param repos: The list of jarvis repos
+        :return: A list of tuples (repo, entry), in the order of repos
+        """
+        index = self.load(repos)
+        return [(repo, index['repos'][repo['name']]['pkgs'][pkg_type])
+                for repo in repos
+                if pkg_type in index['repos'][repo['name']]['pkgs']]
+
+    def list_pkgs(self, repo, repos):
+        """
+        List the pkgs provided by a repo
+
+        :param repo: A dict containing the name and path of the repo
+        :param repos: The list of jarvis repos
+        :return: Sorted list of pkg types
+        """
+        index = self.load(repos)
+        return sorted(index['repos'][repo['name']]['pkgs'])
+
+    def get_class(self, pkg_type, repos):
+        """
+        Get the class implementing a pkg. Each class is imported at most
+        once per process.
+
+        :param pkg_type: The type of pkg to load (snake case)
+        :param repos: The list of jarvis repos
+        :return: The class or None
+        """
+        if pkg_type in self.classes:
+            return self.classes[pkg_type]
+        matches = self.find_all(pkg_type, repos)
+        if any(self._mtime(entry['file']) is None for _, entry in matches):
+            # A pkg was deleted after the index was built
+            self.build(repos)
+            matches = self.find_all(pkg_type, repos)
+        # If a repo's pkg fails to import, fall back to the next repo
+        for repo, entry in matches:
+            mtime = self._mtime(entry['file'])
+            if mtime != entry['mtime']:
+                entry['mtime'] = mtime
+                self.save()
+            cls = load_class(entry['module'], repo['path'], entry['class'])
+            if cls is not None:
+                self.classes[pkg_type] = cls
+                return cls
+        return None
@@ -0,0 +1,192 @@
+"""
+This module provides readiness probes. A probe checks whether a service
+is ready to accept work (e.g., a port is open or a log line was printed).
+Services poll their probes with exponential backoff, instead of sleeping
+for a fixed amount of time.
+"""
+
+from jarvis_util.shell.exec import Exec
+from jarvis_util.shell.local_exec import LocalExecInfo
+from abc import ABC, abstractmethod
+import socket
+import glob
+import time
+import re
+import os
+
+
+class ReadinessProbe(ABC):
+    """
+    The base class of all readiness probes.
+    """
+
+    @abstractmethod
+    def check(self):
+        """
+        Check whether the service is ready.
+
+        :return: True or False
+        """
+        pass
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+class TcpProbe(ReadinessProbe):
+    """
+    Ready when a TCP connection can be made to host:port
+    """
+
+    def __init__(self, host, port, timeout=1):
+        self.host = host
+        self.port = int(port)
+        self.timeout = timeout
+
+    def check(self):
+        try:
+            with socket.create_connection((self.host, self.port),
+                                          timeout=self.timeout):
+                return True
+        except OSError:
+            return False
+
+    def __str__(self):
+        return f'tcp {self.host}:{self.port}'
+
+
+class FileProbe(ReadinessProbe):
+    """
+    Ready when a file exists. The path may be a glob pattern. If an
+    exec_info is given, the file must exist on every host of the
+    exec_info. If since is given, only files modified at or after that
+    time (local checks only) count, so files left by a previous run are
+    ignored.
+    """
+
+    def __init__(self, path, exec_info=None, since=None):
+        self.path = path
+        self.since = since
+        self.cmd = None
+        if exec_info is not None:
+            self.cmd = CmdProbe(f'ls -d {path}', exec_info)
+
+    def check(self):
+        if self.cmd is not None:
+            return self.cmd.check()
+        for path in glob.glob(self.path):
+            if self.since is None:
+                return True
+            try:
+                if os.path.getmtime(path) >= self.since:
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def __str__(self):
+        return f'file {self.path}'
+
+
+class LogProbe(ReadinessProbe):
+    """
+    Ready when a line of a log file matches a regex. Only the data
+    appended since the last check is read.
+    """
+
+    def __init__(self, path, pattern):
+        self.path = path
+        self.pattern = re.compile(pattern)
+        self.off = 0
+        self.partial = ''
+
+    def check(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8', errors='ignore') as fp:
+            fp.seek(self.off)
+            text = fp.read()
+            self.off = fp.tell()
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        for line in lines + [self.partial]:
+            if self.pattern.search(line):
+                return True
+        return False
+
+    def __str__(self):
+        return f'log {self.path} ({self.pattern.pattern})'
+
+
+class CmdProbe(ReadinessProbe):
+    """
+    Ready when a command exits with 0. Optionally, the output of the
+    command must also match a regex. If a custom exec_info is given and
+    pattern is set, it must have collect_output=True.
+    """
+
+    def __init__(self, cmd, exec_info=None, pattern=None, env=None):
+        self.cmd = cmd
+        self.pattern = pattern
+        if exec_info is None:
+            exec_info = LocalExecInfo(env=env,
+                                      hide_output=True,
+                                      collect_output=pattern is not None)
+        self.exec_info = exec_info
+
+    def check(self):
+        node = Exec(self.cmd, self.exec_info)
+        exit_codes = node.exit_code
+        if isinstance(exit_codes, dict):
+            exit_codes = list(exit_codes.values())
+        else:
+            exit_codes = [exit_codes]
+        if any(exit_code != 0 for exit_code in exit_codes):
+            return False
+        if self.pattern is not None:
+            outputs = node.stdout
+            if isinstance(outputs, dict):
+                outputs = list(outputs.values())
+            else:
+                outputs = [outputs]
+            return all(re.search(self.pattern, output)
+                       for output in outputs)
+        return True
+
+    def __str__(self):
+        return f'cmd {self.cmd}'
+
+
+def wait_ready(probes, timeout=60, interval=.1, max_interval=4, backoff=2,
+               log=None):
+    """
+    Poll a set of probes until all of them succeed. Probes which have
+    succeeded are not checked again.
+
+    :param probes: A probe or list of probes
+    :param timeout: The maximum time to wait (seconds)
+    :param interval: The initial time between polls (seconds)
+    :param max_interval: The maximum time between polls (seconds)
+    :param backoff: The factor the interval grows by after each poll
+    :param log: A function used to print progress
+    :return: The time spent waiting (seconds)
+    """
+    if isinstance(probes, ReadinessProbe):
+        probes = [probes]
+    probes = list(probes)
+    start = time.time()
+    waiting_on = None
+    while True:
+        probes = [probe for probe in probes if not probe.check()]
+        waited = time.time() - start
+        if len(probes) == 0:
+            return waited
+        if waited >= timeout:
+            not_ready = ', '.join(str(probe) for probe in probes)
+            raise Exception(f'Timed out after {timeout} seconds waiting '
+                            f'for: {not_ready}')
+        if log is not None and waiting_on is not probes[0]:
+            waiting_on = probes[0]
+            log(f'Waiting for: {waiting_on}')
+        time.sleep(min(interval, max(timeout - waited, 0)))
+        interval = min(interval * backoff, max_interval)
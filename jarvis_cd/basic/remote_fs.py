@@ -0,0 +1,178 @@
+"""
+This module batches the directory creations and removals pkgs make on
+remote hosts. Requests are grouped into a single command per host, and
+the directories created on each host during this session are
+remembered, so creating the same directories again does not require
+ssh. The record is not persisted, since directories may be removed
+outside of jarvis between sessions (e.g., a new allocation or a purged
+scratch file system).
+"""
+
+from jarvis_util.shell.exec import Exec
+from jarvis_util.shell.pssh_exec import PsshExecInfo
+from jarvis_util.util.hostfile import Hostfile
+from contextlib import contextmanager
+from fnmatch import fnmatch
+import threading
+
+
+class RemoteFsPlan:
+    """
+    A plan of the mkdir/rm operations to execute on each host
+    """
+
+    def __init__(self):
+        """
+        Initialize the plan
+        """
+        # Host -> the directories created on it during this session
+        self.record = {}
+        self.ops = {}
+        self.env = None
+        self.depth = 0
+        self.lock = threading.RLock()
+
+    def clear_record(self):
+        """
+        Forget which directories exist. Called when remote data is
+        destroyed outside of the plan.
+
+        :return: None
+        """
+        with self.lock:
+            self.record = {}
+
+    @staticmethod
+    def _get_hosts(hosts):
+        if isinstance(hosts, Hostfile):
+            return list(hosts.hosts)
+        if isinstance(hosts, str):
+            return [hosts]
+        return list(hosts)
+
+    @staticmethod
+    def _get_paths(paths):
+        if isinstance(paths, str):
+            return [paths]
+        return list(paths)
+
+    def mkdir(self, paths, hosts, env=None):
+        """
+        Create directories on a set of hosts. Directories which were
+        already created on a host are skipped.
+
+        :param paths: A path or list of paths
+        :param hosts: The Hostfile (or list of hosts) to create them on
+        :param env: The environment to execute the command with
+        :return: self
+        """
+        with self.lock:
+            for host in self._get_hosts(hosts):
+                known = self.record.get(host, set())
+                # A pending rm may remove a directory in the record
+                pending_rm = any(op == 'rm'
+                                 for op, _ in self.ops.get(host, []))
+                for path in self._get_paths(paths):
+                    if path in known and not pending_rm:
+                        continue
+                    self.ops.setdefault(host, []).append(('mkdir', path))
+            if env is not None:
+                self.env = env
+            if self.depth == 0:
+                self.flush()
+        return self
+
+    def rm(self, paths, hosts, env=None):
+        """
+        Remove files or directories on a set of hosts
+
+        :param paths: A path or list of paths. May contain wildcards.
+        :param hosts: The Hostfile (or list of hosts) to remove them on
+        :param env: The environment to execute the command with
+        :return: self
+        """
+        with self.lock:
+            for host in self._get_hosts(hosts):
+                for path in self._get_paths(paths):
+                    self.ops.setdefault(host, []).append(('rm', path))
+            if env is not None:
+                self.env = env
+            if self.depth == 0:
+                self.flush()
+        return self
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer all operations until the outermost batch ends
+
+        :return: None
+        """
+        with self.lock:
+            self.depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.flush()
+
+    def flush(self):
+        """
+        Execute all pending operations. Hosts with the same operations
+        are executed using a single parallel ssh.
+
+        :return: None
+        """
+        with self.lock:
+            if len(self.ops) == 0:
+                return
+            groups = {}
+            for host, ops in self.ops.items():
+                groups.setdefault(tuple(ops), []).append(host)
+            self.ops = {}
+            for ops, hosts in groups.items():
+                cmd = self._to_cmd(ops)
+                node = Exec(cmd, PsshExecInfo(
+                    hostfile=Hostfile(all_hosts=hosts), env=self.env))
+                for host in hosts:
+                    if not self._succeeded(node, host):
+                        continue
+                    known = self.record.setdefault(host, set())
+                    for op, path in ops:
+                        if op == 'mkdir':
+                            known.add(path)
+                        else:
+                            self._forget(known, path)
+
+    @staticmethod
+    def _to_cmd(ops):
+        cmds = []
+        for op, path in ops:
+            if op == 'mkdir':
+                if len(cmds) and cmds[-1][0] == 'mkdir -p':
+                    cmds[-1][1].append(path)
+                else:
+                    cmds.append(('mkdir -p', [path]))
+            else:
+                if len(cmds) and cmds[-1][0] == 'rm -rf':
+                    cmds[-1][1].append(path)
+                else:
+                    cmds.append(('rm -rf', [path]))
+        return ' && '.join(f'{cmd} {" ".join(paths)}' for cmd, paths in cmds)
+
+    @staticmethod
+    def _succeeded(node, host):
+        exit_code = node.exit_code
+        if isinstance(exit_code, dict):
+            exit_code = exit_code.get(host, max(exit_code.values(), default=0))
+        return exit_code == 0
+
+    @staticmethod
+    def _forget(known, pattern):
+        prefix = pattern.rstrip('/') + '/'
+        for path in list(known):
+            if path == pattern or fnmatch(path, pattern) or \
+                    path.startswith(prefix):
+                known.remove(path)
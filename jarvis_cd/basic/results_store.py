@@ -0,0 +1,314 @@
+"""
+This module stores the stats of a pipeline sweep in a columnar format.
+The stats of every run are appended to the store as they complete, so
+they survive a failed sweep. Each run is a partition (a Parquet file if
+pyarrow is installed, otherwise a column-oriented JSON file) and the
+types of the columns are tracked in a schema. Queries only read the
+columns they need.
+"""
+
+from jarvis_util.serialize.yaml_file import YamlFile
+import statistics
+import shutil
+import math
+import json
+import csv
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TYPES = {'bool': bool, 'int': int, 'float': float, 'str': str}
+
+
+def _type_name(val):
+    if isinstance(val, bool):
+        return 'bool'
+    if isinstance(val, int):
+        return 'int'
+    if isinstance(val, float):
+        return 'float'
+    return 'str'
+
+
+def _merge_types(old, new):
+    if old is None or old == new:
+        return new
+    if {old, new} == {'int', 'float'}:
+        return 'float'
+    return 'str'
+
+
+def _cast(val, type_name):
+    if val is None:
+        return None
+    if type_name == 'str':
+        return val if isinstance(val, str) else str(val)
+    return TYPES[type_name](val)
+
+
+def percentile(vals, q):
+    """
+    Compute a percentile using linear interpolation
+
+    :param vals: A sorted list of numbers
+    :param q: The percentile (0-100)
+    :return: float
+    """
+    if not vals:
+        return None
+    pos = (len(vals) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = math.ceil(pos)
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
+
+
+def summarize(vals, stat):
+    """
+    Compute a statistic of a list of values
+
+    :param vals: A list of numbers (None values are ignored)
+    :param stat: mean, std, median, min, max, count, sum, or pXX (e.g.,
+    p99 for the 99th percentile)
+    :return: The statistic
+    """
+    vals = [val for val in vals if val is not None]
+    if stat == 'count':
+        return len(vals)
+    if not vals:
+        return None
+    if stat == 'mean':
+        return statistics.mean(vals)
+    if stat == 'std':
+        return statistics.stdev(vals) if len(vals) > 1 else 0.0
+    if stat == 'median':
+        return statistics.median(vals)
+    if stat == 'min':
+        return min(vals)
+    if stat == 'max':
+        return max(vals)
+    if stat == 'sum':
+        return sum(vals)
+    if stat.startswith('p'):
+        return percentile(sorted(vals), float(stat[1:]))
+    raise Exception(f'Unknown statistic: {stat}')
+
+
+class ResultsStore:
+    """
+    A columnar, append-only store of the stats of a sweep
+    """
+
+    def __init__(self, root, use_arrow=None):
+        """
+        Initialize the store
+
+        :param root: The directory containing the store
+        :param use_arrow: Whether to store Parquet files. Default is to use
+        Parquet when pyarrow is installed.
+        """
+        self.root = root
+        if use_arrow is None:
+            use_arrow = pyarrow is not None
+        if use_arrow and pyarrow is None:
+            raise Exception('pyarrow is required to store Parquet files')
+        self.use_arrow = use_arrow
+        self.ext = 'parquet' if use_arrow else 'json'
+        self.schema_path = os.path.join(root, 'schema.yaml')
+        self.schema = None
+
+    def load_schema(self):
+        if self.schema is None:
+            self.schema = {}
+            if os.path.exists(self.schema_path):
+                # Stored as a list to preserve the order of the columns
+                self.schema = dict(YamlFile(self.schema_path).load() or [])
+        return self.schema
+
+    def _save_schema(self):
+        tmp_path = f'{self.schema_path}.tmp'
+        YamlFile(tmp_path).save([[col, type_name] for col, type_name
+                                 in self.schema.items()])
+        os.replace(tmp_path, self.schema_path)
+
+    def partitions(self):
+        if not os.path.exists(self.root):
+            return []
+        return sorted(os.path.join(self.root, name)
+                      for name in os.listdir(self.root)
+                      if name.startswith('part-') and
+                      name.endswith(f'.{self.ext}'))
+
+    def append(self, rows, name):
+        """
+        Append a partition to the store
+
+        :param rows: A list of dicts (column -> value)
+        :param name: A unique name for the partition (e.g., 3-0)
+        :return: None
+        """
+        os.makedirs(self.root, exist_ok=True)
+        schema = self.load_schema()
+        changed = False
+        for row in rows:
+            for col, val in row.items():
+                if val is None:
+                    continue
+                type_name = _merge_types(schema.get(col), _type_name(val))
+                if schema.get(col) != type_name:
+                    schema[col] = type_name
+                    changed = True
+        if changed:
+            self._save_schema()
+        cols = [col for col in schema if any(col in row for row in rows)]
+        columns = {col: [_cast(row.get(col), schema[col]) for row in rows]
+                   for col in cols}
+        self._write(os.path.join(self.root, f'part-{name}.{self.ext}'),
+                    columns)
+
+    def _write(self, path, columns):
+        tmp_path = f'{path}.tmp'
+        if self.use_arrow:
+            table = pyarrow.table(columns)
+            pyarrow.parquet.write_table(table, tmp_path)
+        else:
+            with open(tmp_path, 'w', encoding='utf-8') as fp:
+                json.dump(columns, fp)
+        os.replace(tmp_path, path)
+
+    def _read(self, path, columns=None):
+        """
+        Read columns from a partition
+
+        :param path: The partition
+        :param columns: The columns to read. Default is all columns.
+        :return: The number of rows in the partition and a dict of
+        column -> list of values (missing columns are omitted)
+        """
+        if self.use_arrow:
+            meta = pyarrow.parquet.read_metadata(path)
+            if columns is not None:
+                names = set(meta.schema.names)
+                columns = [col for col in columns if col in names]
+            data = pyarrow.parquet.read_table(path, columns=columns) \
+                .to_pydict()
+            return meta.num_rows, data
+        with open(path, 'r', encoding='utf-8') as fp:
+            data = json.load(fp)
+        nrows = max([len(vals) for vals in data.values()], default=0)
+        if columns is not None:
+            data = {col: data[col] for col in columns if col in data}
+        return nrows, data
+
+    def read(self, columns=None, where=None):
+        """
+        Read rows from the store
+
+        :param columns: The columns to read. Default is all columns.
+        :param where: A dict of column -> value the rows must match
+        :return: Dict of column -> list of values
+        """
+        schema = self.load_schema()
+        if columns is None:
+            columns = list(schema)
+        where = where or {}
+        read_cols = list(dict.fromkeys(list(columns) + list(where)))
+        result = {col: [] for col in columns}
+        for path in self.partitions():
+            nrows, data = self._read(path, read_cols)
+            for i in range(nrows):
+                row = {col: data[col][i] if col in data else None
+                       for col in read_cols}
+                if any(row[col] != val for col, val in where.items()):
+                    continue
+                for col in columns:
+                    result[col].append(row[col])
+        return result
+
+    def read_rows(self, columns=None, where=None):
+        """
+        Read rows from the store as dicts. Columns a row has no value
+        for are omitted.
+
+        :param columns: The columns to read. Default is all columns.
+        :param where: A dict of column -> value the rows must match
+        :return: List of dicts (column -> value)
+        """
+        data = self.read(columns, where)
+        nrows = len(next(iter(data.values()), []))
+        return [{col: vals[i] for col, vals in data.items()
+                 if vals[i] is not None}
+                for i in range(nrows)]
+
+    def aggregate(self, by, metrics, stats=('mean', 'std', 'median'),
+                  where=None):
+        """
+        Aggregate metrics over the runs of each group (e.g., the repeats
+        of each point of a sweep)
+
+        :param by: The columns to group by (e.g., the sweep variables)
+        :param metrics: The columns to aggregate
+        :param stats: The statistics to compute (see summarize)
+        :param where: A dict of column -> value the rows must match
+        :return: A list of dicts, one per group. Aggregates are stored in
+        columns named <metric>.<stat>.
+        """
+        data = self.read(list(by) + list(metrics), where)
+        groups = {}
+        nrows = len(next(iter(data.values()), []))
+        for i in range(nrows):
+            key = tuple(data[col][i] for col in by)
+            group = groups.setdefault(key, {metric: [] for metric in metrics})
+            for metric in metrics:
+                group[metric].append(data[metric][i])
+        rows = []
+        for key, group in groups.items():
+            row = dict(zip(by, key))
+            for metric in metrics:
+                for stat in stats:
+                    row[f'{metric}.{stat}'] = summarize(group[metric], stat)
+            rows.append(row)
+        return rows
+
+    def to_csv(self, path):
+        """
+        Export the store as a single CSV, one partition at a time
+
+        :param path: The CSV file
+        :return: None
+        """
+        columns = list(self.load_schema())
+        with open(path, 'w', encoding='utf-8', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(columns)
+            for part in self.partitions():
+                nrows, data = self._read(part, columns)
+                for i in range(nrows):
+                    writer.writerow(['' if col not in data or
+                                     data[col][i] is None else data[col][i]
+                                     for col in columns])
+
+    def compact(self, name='0-compact'):
+        """
+        Merge all partitions into one
+
+        :param name: The name of the merged partition. The default sorts
+        before the partitions of runs (e.g., 000012-000), so the runs
+        appended after a compaction are read after the merged ones.
+        :return: None
+        """
+        parts = self.partitions()
+        if len(parts) <= 1:
+            return
+        merged = os.path.join(self.root, f'part-{name}.{self.ext}')
+        self._write(merged, self.read())
+        for part in parts:
+            if part != merged:
+                os.remove(part)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.schema = None
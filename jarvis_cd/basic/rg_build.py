@@ -0,0 +1,243 @@
+"""
+This module builds the resource graph incrementally. Only hosts which are
+not in the graph yet (or whose entry is older than a TTL) are
+introspected, concurrently with a bounded number of workers. Each is
+introspected together with a host which is already in the graph (its
+peer), so the network tests run across hosts, and the peer's rows are
+dropped from the result. The new devices and networks replace the
+previous entries of the hosts in the saved graph, so growing a hostfile
+from 64 to 72 nodes only introspects the 8 new nodes.
+"""
+
+from jarvis_util.serialize.yaml_file import YamlFile
+from concurrent.futures import ThreadPoolExecutor
+import socket
+import copy
+import time
+import os
+
+
+class ResourceGraphHosts:
+    """
+    When each host was last introspected and the host names of its rows
+    in the resource graph. Stored next to resource_graph.yaml.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the record
+
+        :param path: The path to the record
+        """
+        self.path = path
+        self.entries = None
+
+    def load(self):
+        if self.entries is None:
+            self.entries = {}
+            if os.path.exists(self.path):
+                try:
+                    self.entries = YamlFile(self.path).load() or {}
+                except Exception:
+                    self.entries = {}
+        return self.entries
+
+    def save(self):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        YamlFile(tmp_path).save(self.entries)
+        os.replace(tmp_path, self.path)
+
+    def stale(self, hosts, ttl=None, now=None):
+        """
+        The hosts which must be introspected
+
+        :param hosts: The hosts of the graph
+        :param ttl: The age (seconds) after which a host is introspected
+        again. None means never.
+        :param now: The current time
+        :return: A list of hosts
+        """
+        entries = self.load()
+        if now is None:
+            now = time.time()
+        return [host for host in hosts
+                if host not in entries or
+                (ttl is not None and now - entries[host]['time'] > ttl)]
+
+    def record(self, host, names, now=None):
+        """
+        Record that a host was introspected
+
+        :param host: The host (as named in the hostfile)
+        :param names: The host names of its rows in the resource graph
+        :param now: The time of the introspection
+        :return: None
+        """
+        if now is None:
+            now = time.time()
+        self.load()[host] = {'time': now, 'names': sorted(names)}
+
+
+def introspect_host(host, net_sleep, peer=None):
+    """
+    Build the resource graph of a single host
+
+    :param host: The host to introspect
+    :param net_sleep: How long to sleep in network tests
+    :param peer: A host to run the network tests against. Its rows are
+    included in the result.
+    :return: ResourceGraph
+    """
+    from jarvis_util.introspect.system_info import ResourceGraph
+    from jarvis_util.shell.pssh_exec import PsshExecInfo
+    from jarvis_util.util.hostfile import Hostfile
+    hosts = [host] if peer is None else [host, peer]
+    rg = ResourceGraph()
+    rg.build(PsshExecInfo(hostfile=Hostfile(all_hosts=hosts)),
+             net_sleep=net_sleep)
+    return rg
+
+
+def _rows(df):
+    return [] if df is None else df.rows
+
+
+def _row_hosts(rg):
+    return {row['host'] for table in ['fs', 'net']
+            for row in _rows(getattr(rg, table, None))
+            if row.get('host') is not None}
+
+
+def _resolve(name):
+    try:
+        return socket.gethostbyname(name)
+    except (OSError, UnicodeError):
+        return None
+
+
+def host_row_names(rg, hosts):
+    """
+    Attribute the host names of the rows of a resource graph to the hosts
+    it was built from. Rows may name a host differently than the hostfile
+    (e.g., by its fully qualified name or IP), so names which are not in
+    the hostfile are matched by address.
+
+    :param rg: The resource graph
+    :param hosts: The hosts of the hostfile it was built from
+    :return: host -> set of names. Names which match no host are omitted.
+    """
+    names = {host: {host} for host in hosts}
+    ips = None
+    for name in sorted(_row_hosts(rg) - set(hosts)):
+        if ips is None:
+            ips = {}
+            for host in hosts:
+                ips.setdefault(_resolve(host), host)
+            ips.pop(None, None)
+        owner = ips.get(_resolve(name))
+        if owner is not None:
+            names[owner].add(name)
+    return names
+
+
+def _drop_hosts(rg, names):
+    """
+    Remove the rows of some hosts from a resource graph
+
+    :param rg: The resource graph
+    :param names: The host names of the rows to remove
+    :return: None
+    """
+    for table in ['fs', 'net']:
+        df = getattr(rg, table, None)
+        if df is not None:
+            df.rows = [row for row in df.rows
+                       if row.get('host') not in names]
+
+
+def merge(rg, host_rgs, host_names):
+    """
+    Replace the rows of the introspected hosts in a resource graph
+
+    :param rg: The resource graph to update
+    :param host_rgs: host -> the ResourceGraph of that host
+    :param host_names: The host names of the rows to replace
+    :return: None
+    """
+    for table in ['fs', 'net']:
+        rows = [row for row in _rows(getattr(rg, table, None))
+                if row.get('host') not in host_names]
+        template = getattr(rg, table, None)
+        for host_rg in host_rgs.values():
+            host_df = getattr(host_rg, table, None)
+            if template is None:
+                template = host_df
+            for row in _rows(host_df):
+                # Rows without a host (e.g., a network) are shared
+                if row.get('host') is None and row in rows:
+                    continue
+                rows.append(row)
+        if template is not None:
+            df = copy.copy(template)
+            df.rows = rows
+            setattr(rg, table, df)
+
+
+def build_incremental(rg, ledger, hosts, net_sleep, ttl=None,
+                      max_workers=16, introspect=introspect_host):
+    """
+    Introspect the hosts which are missing from a resource graph (or
+    stale) and merge them into the graph. A host which fails to be
+    introspected keeps its previous rows (if any) and stays stale.
+
+    :param rg: The resource graph to update
+    :param ledger: The ResourceGraphHosts of the graph
+    :param hosts: The hosts of the graph
+    :param net_sleep: How long to sleep in network tests
+    :param ttl: The age (seconds) after which a host is introspected again
+    :param max_workers: The maximum number of hosts to introspect at once
+    :param introspect: The function used to introspect a host
+    :return: (the list of introspected hosts, host -> the exception of
+    each host which failed)
+    """
+    stale = ledger.stale(hosts, ttl)
+    failed = {}
+    if not stale:
+        return stale, failed
+    entries = ledger.load()
+    fresh = [host for host in hosts if host not in stale]
+    host_rgs = {}
+    if fresh:
+        peer = fresh[0]
+    else:
+        # Nothing to test the networks against yet. The first host is
+        # introspected alone and is the peer of the others.
+        peer = stale[0]
+        try:
+            host_rgs[peer] = introspect(peer, net_sleep, None)
+        except Exception as e:  # pylint: disable=broad-except
+            return [], {peer: e}
+    peer_names = {peer} | set(entries.get(peer, {}).get('names', []))
+    if peer in host_rgs:
+        peer_names |= _row_hosts(host_rgs[peer])
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {host: pool.submit(introspect, host, net_sleep, peer)
+                   for host in stale if host not in host_rgs}
+        for host, future in futures.items():
+            try:
+                host_rg = future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                failed[host] = e
+                continue
+            names = host_row_names(host_rg, [host, peer])
+            _drop_hosts(host_rg, peer_names | names[peer])
+            host_rgs[host] = host_rg
+    host_names = set()
+    now = time.time()
+    for host, host_rg in host_rgs.items():
+        names = {host} | _row_hosts(host_rg)
+        host_names.update(names)
+        host_names.update(entries.get(host, {}).get('names', []))
+        ledger.record(host, names, now)
+    merge(rg, host_rgs, host_names)
+    return [host for host in stale if host in host_rgs], failed
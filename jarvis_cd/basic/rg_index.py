@@ -0,0 +1,202 @@
+"""
+This module provides an indexed view of the resource graph. Pkgs query
+the storage devices and networks of the machine while they are configured
+(e.g., OrangeFS tries one device type after another), and each query of
+the ResourceGraph filters every row of its tables. The index groups the
+rows by the columns used in queries, so a query only filters the rows
+which can match, and it remembers the result of each query. The index is
+built once per JarvisManager and dropped when the resource graph changes.
+"""
+
+import copy
+import json
+
+FS_COLUMNS = ['dev_type', 'shared', 'needs_root']
+NET_COLUMNS = ['provider', 'domain']
+
+
+def _hashable(val):
+    try:
+        hash(val)
+        return val
+    except TypeError:
+        return repr(val)
+
+
+def _group(rows, columns):
+    """
+    Group the positions of rows by their values of columns
+
+    :param rows: A list of dicts
+    :param columns: The columns to group by
+    :return: Dict of value tuple -> list of row positions
+    """
+    groups = {}
+    for i, row in enumerate(rows):
+        key = tuple(_hashable(row.get(col)) for col in columns)
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def _as_list(val):
+    if val is None or isinstance(val, list):
+        return val
+    if isinstance(val, (tuple, set)):
+        return list(val)
+    return [val]
+
+
+def _hosts(hostfile):
+    if hostfile is None:
+        return None
+    if hasattr(hostfile, 'hosts'):
+        return list(hostfile.hosts)
+    return _as_list(hostfile)
+
+
+class ResourceGraphIndex:
+    """
+    The rows of a ResourceGraph grouped by dev_type, shared, needs_root,
+    host, provider, and domain, and the results of previous queries.
+    Results are shared by all callers, so they should not be modified.
+    """
+
+    def __init__(self, rg):
+        """
+        Index a resource graph
+
+        :param rg: The ResourceGraph
+        """
+        self.rg = rg
+        self.fs_rows = self._rows(rg, 'fs')
+        self.net_rows = self._rows(rg, 'net')
+        self.fs_groups = _group(self.fs_rows, FS_COLUMNS)
+        self.fs_hosts = _group(self.fs_rows, ['host'])
+        self.net_groups = _group(self.net_rows, NET_COLUMNS)
+        self.net_hosts = _group(self.net_rows, ['host'])
+        # The results of previous queries (query key -> result)
+        self.results = {}
+
+    @staticmethod
+    def _rows(rg, table):
+        df = getattr(rg, table, None)
+        if df is None:
+            return []
+        return df.rows
+
+    @staticmethod
+    def _select(groups, columns, wanted):
+        """
+        The positions of the rows matching the wanted values
+
+        :param groups: The groups made by _group
+        :param columns: The columns of the groups
+        :param wanted: Column -> list of accepted values (None for any)
+        :return: A sorted list of row positions
+        """
+        positions = []
+        for key, rows in groups.items():
+            for col, val in zip(columns, key):
+                if wanted.get(col) is not None and val not in wanted[col]:
+                    break
+            else:
+                positions += rows
+        return sorted(positions)
+
+    @staticmethod
+    def _subset(df, rows):
+        sub = copy.copy(df)
+        sub.rows = rows
+        return sub
+
+    def _cached(self, name, args, query):
+        key = json.dumps([name, args], sort_keys=True, default=str)
+        if key not in self.results:
+            self.results[key] = query()
+        return self.results[key]
+
+    def find_storage(self, dev_types=None, shared=None, needs_root=None,
+                     hosts=None, **kwargs):
+        """
+        Find storage devices. See ResourceGraph.find_storage.
+
+        :param dev_types: A device type or list of types (e.g., nvme)
+        :param shared: Whether the devices are shared across nodes
+        :param needs_root: Whether the devices need root to access
+        :param hosts: Only consider the devices of these hosts (a Hostfile
+        or list of host names)
+        :param kwargs: The other parameters of ResourceGraph.find_storage
+        :return: A dataframe of devices
+        """
+        hosts = _hosts(hosts)
+        args = {'dev_types': dev_types, 'shared': shared,
+                'needs_root': needs_root, 'hosts': hosts}
+        args.update(kwargs)
+        rg_kwargs = dict(kwargs)
+        if shared is not None:
+            rg_kwargs['shared'] = shared
+        if needs_root is not None:
+            rg_kwargs['needs_root'] = needs_root
+
+        def query():
+            if getattr(self.rg, 'fs', None) is None:
+                return self.rg.find_storage(dev_types=dev_types, **rg_kwargs)
+            positions = self._select(self.fs_groups, FS_COLUMNS, {
+                'dev_type': _as_list(dev_types),
+                'shared': _as_list(shared),
+                'needs_root': _as_list(needs_root),
+            })
+            if hosts is not None:
+                positions = self._on_hosts(positions, self.fs_hosts, hosts)
+            df = self._subset(self.rg.fs, [self.fs_rows[i]
+                                           for i in positions])
+            if len(df.rows) == 0:
+                return df
+            view = copy.copy(self.rg)
+            view.fs = df
+            return view.find_storage(dev_types=dev_types, **rg_kwargs)
+        return self._cached('find_storage', args, query)
+
+    def find_net_info(self, hostfile=None, providers=None, domain=None,
+                      **kwargs):
+        """
+        Find the networks of hosts. See ResourceGraph.find_net_info.
+
+        :param hostfile: The hosts which must share the networks
+        :param providers: A provider or list of providers (e.g., tcp)
+        :param domain: A domain or list of domains (e.g., eth0)
+        :param kwargs: The other parameters of ResourceGraph.find_net_info
+        :return: A dataframe of networks
+        """
+        hosts = _hosts(hostfile)
+        args = {'hosts': hosts,
+                'path': getattr(hostfile, 'path', None),
+                'providers': providers, 'domain': domain}
+        args.update(kwargs)
+
+        def query():
+            if getattr(self.rg, 'net', None) is None:
+                return self.rg.find_net_info(hostfile, **kwargs)
+            positions = self._select(self.net_groups, NET_COLUMNS, {
+                'provider': _as_list(providers),
+                'domain': _as_list(domain),
+            })
+            if hosts is not None and \
+                    all((host,) in self.net_hosts for host in hosts):
+                # Rows without a host are not specific to a host. If a host
+                # has no rows under its name, the graph may name it
+                # differently (e.g., by IP), so its rows cannot be found.
+                positions = self._on_hosts(positions, self.net_hosts,
+                                           hosts + [None])
+            view = copy.copy(self.rg)
+            view.net = self._subset(self.rg.net, [self.net_rows[i]
+                                                  for i in positions])
+            return view.find_net_info(hostfile, **kwargs)
+        return self._cached('find_net_info', args, query)
+
+    @staticmethod
+    def _on_hosts(positions, host_groups, hosts):
+        on_hosts = set()
+        for host in hosts:
+            on_hosts.update(host_groups.get((host,), []))
+        return [i for i in positions if i in on_hosts]
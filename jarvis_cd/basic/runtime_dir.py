@@ -0,0 +1,51 @@
+"""
+This module places the files jarvis processes use to communicate (e.g.,
+ssh control sockets and the socket of the jarvis daemon) in directories
+only the current user can access. Such directories are placed in
+$XDG_RUNTIME_DIR when it is set. This module must remain cheap to import,
+since the jarvis client imports it before every command.
+"""
+
+import stat
+import os
+
+
+def runtime_dir(name, fallback=None):
+    """
+    The path of a per-user runtime directory
+
+    :param name: The name of the directory within $XDG_RUNTIME_DIR
+    :param fallback: The path to use if XDG_RUNTIME_DIR is not set
+    :return: str
+    """
+    base = os.environ.get('XDG_RUNTIME_DIR')
+    if base:
+        return os.path.join(base, name)
+    if not fallback:
+        raise Exception(f'Cannot place {name}: XDG_RUNTIME_DIR is not set')
+    return fallback
+
+
+def secure_dir(path, create=True):
+    """
+    Create a directory only the current user can access. An existing
+    directory must be owned by the user and have mode 0700, since another
+    user could otherwise plant files in it.
+
+    :param path: The directory
+    :param create: Whether to create the directory if it does not exist
+    :return: None
+    """
+    if create:
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+    st = os.lstat(path)
+    if not stat.S_ISDIR(st.st_mode):
+        raise Exception(f'{path} is not a directory')
+    if st.st_uid != os.getuid():
+        raise Exception(f'{path} is not owned by the current user')
+    if stat.S_IMODE(st.st_mode) != 0o700:
+        raise Exception(f'{path} must have mode 0700, not '
+                        f'{oct(stat.S_IMODE(st.st_mode))}')
@@ -0,0 +1,398 @@
+"""
+This module provides search strategies for a PipelineIterator, as an
+alternative to the full grid of the iterator's loop. A point of the
+search space selects one entry of each zip group in the loop. Points are
+generated lazily by ask(), so the space is never materialized, and the
+strategies which adapt to previous results are given the metric of each
+completed point by tell().
+
+Strategies:
+    random: sample points uniformly without replacement
+    lhs: Latin hypercube sampling
+    halving: successive halving of random points over a budget variable
+    hyperband: several brackets of successive halving
+    bayes: Bayesian optimization (gaussian process + expected improvement)
+"""
+
+from abc import ABC, abstractmethod
+from statistics import NormalDist, mean, pstdev
+import hashlib
+import random
+import json
+import math
+
+
+class SearchStrategy(ABC):
+    """
+    Generates the points of a search over the zip groups of a loop
+    """
+
+    # Whether the points depend on the results of previous points (i.e.,
+    # points must be evaluated one at a time)
+    sequential = False
+
+    def __init__(self, dims, samples=10, seed=None, metric=None,
+                 mode='max'):
+        """
+        Initialize the search
+
+        :param dims: The number of entries of each zip group
+        :param samples: The number of points to evaluate
+        :param seed: The seed of the random number generator
+        :param metric: The stat to optimize (e.g., ior.write_bw)
+        :param mode: Whether to maximize (max) or minimize (min) the metric
+        """
+        if mode not in ['max', 'min']:
+            raise Exception(f'Search mode must be max or min, not {mode}')
+        self.dims = list(dims)
+        self.size = math.prod(self.dims)
+        self.samples = min(samples, self.size)
+        self.rng = random.Random(seed)
+        self.metric = metric
+        self.mode = mode
+        self.results = []
+
+    def decode(self, index):
+        """
+        Convert the index of a point to the position in each zip group
+
+        :param index: An integer in [0, size)
+        :return: tuple
+        """
+        pos = []
+        for dim in reversed(self.dims):
+            index, i = divmod(index, dim)
+            pos.append(i)
+        return tuple(reversed(pos))
+
+    def max_trials(self):
+        return self.samples
+
+    @abstractmethod
+    def ask(self):
+        """
+        Get the next point to evaluate
+
+        :return: (pos, extra) where pos is the position in each zip group
+        and extra is a dict of additional variables to set (e.g., the
+        budget). None when the search is complete.
+        """
+        pass
+
+    def tell(self, trial, value):
+        """
+        Report the metric of an evaluated point
+
+        :param trial: The trial returned by ask()
+        :param value: The value of the metric (None if not measured)
+        :return: None
+        """
+        if value is not None:
+            self.results.append((trial, value))
+
+    def score(self, value):
+        """
+        Higher scores are better
+        """
+        return value if self.mode == 'max' else -value
+
+    def best(self):
+        """
+        The best trial so far
+
+        :return: (trial, value) or None
+        """
+        if not self.results:
+            return None
+        return max(self.results, key=lambda result: self.score(result[1]))
+
+
+class RandomSearch(SearchStrategy):
+    """
+    Sample points uniformly without replacement
+    """
+
+    def __init__(self, dims, **kwargs):
+        super().__init__(dims, **kwargs)
+        # Sampling from a range does not materialize it
+        self.points = iter(self.rng.sample(range(self.size), self.samples))
+
+    def ask(self):
+        index = next(self.points, None)
+        if index is None:
+            return None
+        return self.decode(index), {}
+
+
+class LatinHypercubeSearch(SearchStrategy):
+    """
+    Sample points so that every zip group is stratified evenly
+    """
+
+    def __init__(self, dims, **kwargs):
+        super().__init__(dims, **kwargs)
+        self.perms = [self.rng.sample(range(self.samples), self.samples)
+                      for _ in self.dims]
+        self.count = 0
+        self.seen = set()
+
+    def ask(self):
+        while self.count < self.samples:
+            i = self.count
+            self.count += 1
+            pos = tuple(min(int((perm[i] + self.rng.random()) *
+                                dim / self.samples), dim - 1)
+                        for perm, dim in zip(self.perms, self.dims))
+            # Small zip groups may produce the same point more than once
+            if pos in self.seen:
+                continue
+            self.seen.add(pos)
+            return pos, {}
+        return None
+
+
+class HyperbandSearch(SearchStrategy):
+    """
+    Evaluate many random points with a small budget (e.g., a runtime or a
+    number of timesteps) and give exponentially more budget to the best
+    fraction of them. Hyperband runs several brackets, each of which
+    trades off the number of points against the initial budget.
+    """
+
+    sequential = True
+
+    def __init__(self, dims, budget, min_budget, max_budget, eta=3,
+                 brackets=None, **kwargs):
+        """
+        Initialize the search
+
+        :param dims: The number of entries of each zip group
+        :param budget: The variable which sets the budget (pkg.var)
+        :param min_budget: The smallest budget of a point
+        :param max_budget: The largest budget of a point
+        :param eta: The factor by which the points are reduced each rung
+        :param brackets: The number of brackets (1 is successive halving).
+        Default is all brackets.
+        :param kwargs: See SearchStrategy
+        """
+        kwargs.setdefault('samples', 0)
+        if kwargs.get('metric') is None:
+            raise Exception('hyperband requires a metric')
+        super().__init__(dims, **kwargs)
+        self.budget = budget
+        self.min_budget = min_budget
+        self.max_budget = max_budget
+        self.eta = eta
+        self.s_max = int(math.log(max_budget / min_budget, eta) + 1e-9)
+        if brackets is None:
+            brackets = self.s_max + 1
+        self.brackets = [self.s_max - i for i in range(brackets)]
+        self.rung = {}
+        self.trials = self._trials()
+
+    def _bracket(self, s):
+        """
+        The number of points and the initial budget of a bracket
+        """
+        n = math.ceil((self.s_max + 1) / (s + 1) * self.eta ** s)
+        return min(n, self.size), self.max_budget * self.eta ** -s
+
+    def max_trials(self):
+        count = 0
+        for s in self.brackets:
+            n, _ = self._bracket(s)
+            count += sum(int(n * self.eta ** -i) for i in range(s + 1))
+        return count
+
+    def _trials(self):
+        for s in self.brackets:
+            n, r = self._bracket(s)
+            points = [self.decode(index)
+                      for index in self.rng.sample(range(self.size), n)]
+            for i in range(s + 1):
+                budget = int(round(r * self.eta ** i))
+                self.rung = {}
+                for pos in points:
+                    yield pos, {self.budget: budget}
+                # Keep the best 1/eta of the points for the next rung.
+                # Points without a result are dropped.
+                ranked = sorted(
+                    [pos for pos in points if pos in self.rung],
+                    key=lambda pos: self.score(self.rung[pos]),
+                    reverse=True)
+                points = ranked[:int(n * self.eta ** -(i + 1))]
+                if not points:
+                    break
+
+    def ask(self):
+        return next(self.trials, None)
+
+    def tell(self, trial, value):
+        super().tell(trial, value)
+        if value is not None:
+            self.rung[trial[0]] = value
+
+
+class BayesSearch(SearchStrategy):
+    """
+    Model the metric as a gaussian process over the (normalized)
+    positions in each zip group and evaluate the candidate point with the
+    highest expected improvement.
+    """
+
+    sequential = True
+
+    def __init__(self, dims, init_samples=5, candidates=256,
+                 length_scale=.3, noise=1e-3, **kwargs):
+        """
+        Initialize the search
+
+        :param dims: The number of entries of each zip group
+        :param init_samples: The number of random points evaluated before
+        the model is used
+        :param candidates: The number of random candidates scored per point
+        :param length_scale: The length scale of the RBF kernel
+        :param noise: The noise (variance) of the observations
+        :param kwargs: See SearchStrategy
+        """
+        if kwargs.get('metric') is None:
+            raise Exception('bayes requires a metric')
+        super().__init__(dims, **kwargs)
+        self.init_samples = init_samples
+        self.candidates = candidates
+        self.length_scale = length_scale
+        self.noise = noise
+        self.count = 0
+        self.seen = set()
+
+    def _coords(self, pos):
+        return [i / (dim - 1) if dim > 1 else 0
+                for i, dim in zip(pos, self.dims)]
+
+    def _kernel(self, x, y):
+        dist = sum((a - b) ** 2 for a, b in zip(x, y))
+        return math.exp(-dist / (2 * self.length_scale ** 2))
+
+    def _random_unseen(self):
+        for _ in range(100):
+            pos = self.decode(self.rng.randrange(self.size))
+            if pos not in self.seen:
+                return pos
+        return None
+
+    def ask(self):
+        if self.count >= self.samples or len(self.seen) >= self.size:
+            return None
+        self.count += 1
+        pos = None
+        if len(self.results) >= self.init_samples:
+            pos = self._suggest()
+        if pos is None:
+            pos = self._random_unseen()
+        if pos is None:
+            return None
+        self.seen.add(pos)
+        return pos, {}
+
+    def _suggest(self):
+        xs = [self._coords(trial[0]) for trial, _ in self.results]
+        ys = [self.score(value) for _, value in self.results]
+        y_mean = mean(ys)
+        y_std = pstdev(ys) or 1
+        ys = [(y - y_mean) / y_std for y in ys]
+        n = len(xs)
+        gram = [[self._kernel(xs[i], xs[j]) + (self.noise if i == j else 0)
+                 for j in range(n)] for i in range(n)]
+        chol = _cholesky(gram)
+        alpha = _solve_upper(chol, _solve_lower(chol, ys))
+        best_y = max(ys)
+        best_ei = -1
+        best_pos = None
+        for _ in range(self.candidates):
+            pos = self._random_unseen()
+            if pos is None:
+                break
+            x = self._coords(pos)
+            k = [self._kernel(x, xi) for xi in xs]
+            mu = sum(ki * ai for ki, ai in zip(k, alpha))
+            v = _solve_lower(chol, k)
+            sigma = math.sqrt(max(1 - sum(vi * vi for vi in v), 1e-12))
+            z = (mu - best_y) / sigma
+            ei = (mu - best_y) * NormalDist().cdf(z) + \
+                sigma * NormalDist().pdf(z)
+            if ei > best_ei:
+                best_ei = ei
+                best_pos = pos
+        return best_pos
+
+
+def _cholesky(mat):
+    n = len(mat)
+    chol = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1):
+            total = sum(chol[i][k] * chol[j][k] for k in range(j))
+            if i == j:
+                chol[i][j] = math.sqrt(max(mat[i][i] - total, 1e-12))
+            else:
+                chol[i][j] = (mat[i][j] - total) / chol[j][j]
+    return chol
+
+
+def _solve_lower(chol, b):
+    x = []
+    for i in range(len(b)):
+        x.append((b[i] - sum(chol[i][k] * x[k] for k in range(i))) /
+                 chol[i][i])
+    return x
+
+
+def _solve_upper(chol, b):
+    # Solves chol^T x = b
+    n = len(b)
+    x = [0.0] * n
+    for i in reversed(range(n)):
+        x[i] = (b[i] - sum(chol[k][i] * x[k] for k in range(i + 1, n))) / \
+            chol[i][i]
+    return x
+
+
+STRATEGIES = {
+    'random': RandomSearch,
+    'lhs': LatinHypercubeSearch,
+    'halving': HyperbandSearch,
+    'hyperband': HyperbandSearch,
+    'bayes': BayesSearch,
+}
+
+
+def derive_seed(iter_config):
+    """
+    Derive the seed of a search from the iterator config. A resumed
+    sweep must draw the same points as the invocation it resumes.
+
+    :param iter_config: The iterator config (vars, loop, search, ...)
+    :return: int
+    """
+    text = json.dumps(iter_config, sort_keys=True, default=str)
+    return int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def make_search(dims, config):
+    """
+    Create the search strategy of an iterator
+
+    :param dims: The number of entries of each zip group
+    :param config: The search section of the iterator config
+    :return: SearchStrategy or None for a full grid
+    """
+    config = dict(config)
+    strategy = config.pop('strategy', 'grid')
+    if strategy == 'grid':
+        return None
+    if strategy not in STRATEGIES:
+        raise Exception(f'Unknown search strategy: {strategy}. '
+                        f'Options: grid, {", ".join(STRATEGIES)}')
+    if strategy == 'halving':
+        config['brackets'] = 1
+    return STRATEGIES[strategy](dims, **config)
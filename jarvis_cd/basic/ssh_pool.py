@@ -0,0 +1,226 @@
+"""
+This module manages a pool of persistent ssh connections for a pipeline.
+While the pipeline executes, a shim for ssh and scp is placed at the front
+of the PATH of the environments its pkgs execute commands with. The shim
+adds OpenSSH ControlMaster options, so the first command sent to a host
+opens a master connection and every later command (e.g., through
+PsshExecInfo, SshExecInfo, or Pscp) is multiplexed over it instead of
+performing a new handshake.
+
+The shims and control sockets live in a directory only the user can
+access: $XDG_RUNTIME_DIR/jarvis-ssh, or the jarvis private dir if
+XDG_RUNTIME_DIR is not set.
+"""
+
+from jarvis_util.shell.exec import Exec
+from jarvis_util.shell.pssh_exec import PsshExecInfo
+from jarvis_util.util.hostfile import Hostfile
+from jarvis_cd.basic.runtime_dir import runtime_dir, secure_dir
+import subprocess
+import hashlib
+import shutil
+import glob
+import os
+
+POOL_DIR_NAME = 'jarvis-ssh'
+
+SHIM_TEMPLATE = """#!/bin/sh
+echo "{tool}" >> "{calls_log}"
+exec "{real}" -o ControlMaster=auto -o "ControlPath={sock_dir}/%C" \\
+    -o ControlPersist={persist} "$@"
+"""
+
+
+def pool_root(private_dir=None):
+    """
+    The directory containing the pools of all pipelines. Control sockets
+    live here, so its path should be short (< 108 characters).
+
+    :param private_dir: The jarvis private dir, used if XDG_RUNTIME_DIR
+    is not set
+    :return: str
+    """
+    fallback = None
+    if private_dir:
+        fallback = os.path.join(private_dir, POOL_DIR_NAME)
+    return runtime_dir(POOL_DIR_NAME, fallback)
+
+
+def strip_pool_path(path):
+    """
+    Remove the ssh pool shims from a PATH-like string
+
+    :param path: A colon-separated list of directories
+    :return: str
+    """
+    if path is None:
+        return path
+    return ':'.join(entry for entry in path.split(':')
+                    if not (entry.endswith('/bin') and
+                            f'/{POOL_DIR_NAME}/' in entry))
+
+
+class SshPool:
+    """
+    A pool of multiplexed ssh connections shared by all pkgs of a pipeline
+    """
+
+    def __init__(self, pool_id, persist=600, root=None):
+        """
+        Initialize the pool
+
+        :param pool_id: A unique name for the pool (e.g., the config dir
+        of the pipeline)
+        :param persist: How long (seconds) idle connections stay open
+        :param root: The directory containing the pools (see pool_root)
+        """
+        if root is None:
+            root = pool_root()
+        pool_hash = hashlib.sha1(pool_id.encode('utf-8')).hexdigest()[:12]
+        self.root = root
+        self.pool_dir = os.path.join(root, pool_hash)
+        self.bin_dir = os.path.join(self.pool_dir, 'bin')
+        self.sock_dir = os.path.join(self.pool_dir, 'sock')
+        self.calls_log = os.path.join(self.pool_dir, 'calls.log')
+        self.persist = persist
+        self.active = False
+
+    def _install(self):
+        """
+        Write the ssh and scp shims
+
+        :return: True if ssh is installed
+        """
+        path = strip_pool_path(os.environ.get('PATH', ''))
+        # The private dir containing the root may not exist yet on this
+        # node (e.g., a launch node outside the hostfile)
+        os.makedirs(os.path.dirname(self.root), exist_ok=True)
+        for dir_path in [self.root, self.pool_dir, self.bin_dir,
+                         self.sock_dir]:
+            secure_dir(dir_path)
+        for tool in ['ssh', 'scp']:
+            real = shutil.which(tool, path=path)
+            if real is None:
+                if tool == 'ssh':
+                    return False
+                continue
+            shim_path = os.path.join(self.bin_dir, tool)
+            shim = SHIM_TEMPLATE.format(tool=tool, real=real,
+                                        calls_log=self.calls_log,
+                                        sock_dir=self.sock_dir,
+                                        persist=self.persist)
+            if os.path.exists(shim_path):
+                with open(shim_path, 'r', encoding='utf-8') as fp:
+                    if fp.read() == shim:
+                        continue
+            with open(shim_path, 'w', encoding='utf-8') as fp:
+                fp.write(shim)
+            os.chmod(shim_path, 0o700)
+        return True
+
+    def activate(self, envs):
+        """
+        Route the ssh commands executed with a set of environments through
+        the pool. The environment of this process is not modified, so
+        commands executed without one of these environments are not
+        routed. Must not be called while the environments are in use by
+        other threads.
+
+        :param envs: The environment dicts pkgs execute commands with
+        :return: True if the pool was activated
+        """
+        if self.active:
+            return True
+        if not self._install():
+            return False
+        for env in envs:
+            if env is not None and 'PATH' in env:
+                env['PATH'] = self._prepend(env['PATH'])
+        self.active = True
+        return True
+
+    def deactivate(self, envs):
+        """
+        Stop routing ssh commands through the pool. Connections remain
+        open until they are idle for the persist time.
+
+        :param envs: The environment dicts passed to activate
+        :return: None
+        """
+        if not self.active:
+            return
+        for env in envs:
+            if env is not None and 'PATH' in env:
+                env['PATH'] = strip_pool_path(env['PATH'])
+        self.active = False
+
+    def _prepend(self, path):
+        path = strip_pool_path(path)
+        if not path:
+            return self.bin_dir
+        return f'{self.bin_dir}:{path}'
+
+    def open(self, hostfile, env=None):
+        """
+        Open a connection to every host in parallel
+
+        :param hostfile: The hosts to connect to
+        :param env: The environment to execute the command with
+        :return: None
+        """
+        if isinstance(hostfile, list):
+            hostfile = Hostfile(all_hosts=hostfile)
+        if hostfile.is_local():
+            return
+        Exec('true', PsshExecInfo(hostfile=hostfile,
+                                  env=env,
+                                  hide_output=True))
+
+    def close(self):
+        """
+        Close all connections in the pool
+
+        :return: None
+        """
+        ssh = shutil.which('ssh', path=strip_pool_path(os.environ.get('PATH')))
+        procs = []
+        for sock in self.sockets():
+            procs.append(subprocess.Popen(
+                [ssh, '-o', f'ControlPath={sock}', '-O', 'exit', 'jarvis'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        for proc in procs:
+            proc.wait()
+        shutil.rmtree(self.pool_dir, ignore_errors=True)
+
+    def sockets(self):
+        """
+        Get the control sockets of the open connections
+
+        :return: List of paths
+        """
+        return glob.glob(os.path.join(self.sock_dir, '*'))
+
+    def stats(self):
+        """
+        Get statistics about the pool
+
+        :return: dict
+        """
+        calls = {'ssh': 0, 'scp': 0}
+        if os.path.exists(self.calls_log):
+            with open(self.calls_log, 'r', encoding='utf-8') as fp:
+                for line in fp:
+                    tool = line.strip()
+                    calls[tool] = calls.get(tool, 0) + 1
+        total = sum(calls.values())
+        connections = len(self.sockets())
+        reused = total - connections if connections else 0
+        return {
+            'pool_dir': self.pool_dir,
+            'active': self.active,
+            'persist': self.persist,
+            'ssh_calls': calls['ssh'],
+            'scp_calls': calls['scp'],
+            'connections': connections,
+            'reused': max(reused, 0),
+        }
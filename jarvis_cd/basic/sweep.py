@@ -0,0 +1,336 @@
+"""
+This module runs the iterations of a PipelineIterator concurrently.
+The hostfile (or the CPU set of this node for local runs) is partitioned
+into slots. Each slot runs one iteration at a time using its own copy of
+the pipeline, so its config, shared, and private directories never
+conflict with other slots.
+"""
+
+from jarvis_cd.basic.jarvis_manager import JarvisManager
+from jarvis_cd.basic.trace import get_tracer, span
+from jarvis_util.util.hostfile import Hostfile
+from jarvis_util.util.logging import ColorPrinter, Color
+import multiprocessing
+import traceback
+import shutil
+import queue
+import os
+
+# The state of the slot owned by this process
+_slot = None
+
+
+class SweepSlot:
+    """
+    The resources and pipeline owned by a single worker process
+    """
+
+    def __init__(self, slot_id, hosts, cpus):
+        self.slot_id = slot_id
+        self.hosts = hosts
+        self.cpus = cpus
+        self.ppl = None
+        self.iterator = None
+        self.last_conf = {}
+
+
+class SweepScheduler:
+    """
+    Run the points of a parameter sweep concurrently on disjoint slots
+    """
+
+    def __init__(self, ppl, nslots):
+        """
+        Partition the resources of the pipeline into slots
+
+        :param ppl: The pipeline being iterated over
+        :param nslots: The number of iterations to run concurrently
+        """
+        self.jarvis = JarvisManager.get_instance()
+        self.ppl = ppl
+        self.iterator = ppl.iterator
+        self.nslots = nslots
+        self.slot_dir = f'{ppl.config_dir}/slots'
+        self.slots = self.partition(nslots)
+
+    def partition(self, nslots):
+        """
+        Divide the hostfile into nslots contiguous sets of hosts. If the
+        pipeline runs on a single node, divide the CPUs instead. When the
+        hosts (or CPUs) do not divide evenly, the first slots get one more.
+
+        :param nslots: The number of slots
+        :return: List of SweepSlot
+        """
+        hosts = self.jarvis.hostfile.hosts
+        if len(hosts) > 1:
+            if len(hosts) < nslots:
+                raise Exception(f'Cannot run {nslots} iterations in parallel '
+                                f'on {len(hosts)} hosts')
+            return [SweepSlot(i, slot_hosts, None)
+                    for i, slot_hosts in enumerate(split(hosts, nslots))]
+        services = self.services()
+        if services:
+            # Slots on one node would share the ports, shared memory, and
+            # sockets of the services
+            raise Exception(f'Cannot run {nslots} iterations in parallel '
+                            f'on a single node, since the pipeline has '
+                            f'services: {", ".join(services)}')
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) < nslots:
+            raise Exception(f'Cannot run {nslots} iterations in parallel '
+                            f'on {len(cpus)} cpus')
+        return [SweepSlot(i, None, slot_cpus)
+                for i, slot_cpus in enumerate(split(cpus, nslots))]
+
+    def services(self):
+        """
+        The ids of the pkgs of the pipeline which are services (i.e., not
+        applications or interceptors)
+
+        :return: List of pkg ids
+        """
+        from jarvis_cd.basic.pkg import Service, Application
+        return [pkg.pkg_id for pkg in self.ppl.sub_pkgs
+                if isinstance(pkg, Service) and
+                not isinstance(pkg, Application)]
+
+    def run(self):
+        """
+        Run every point of the iterator and store the stats in the
+        iterator.
+
+        :return: None
+        """
+        points = []
+        conf_dict = self.iterator.begin()
+        while conf_dict is not None:
+            reps = self.iterator.pending_reps()
+            if len(reps):
+                points.append((self.iterator.iter_count,
+                               dict(self.iterator.linear_conf_dict),
+                               reps))
+            conf_dict = self.iterator.next()
+        ColorPrinter.print(f'[ITER] Running {len(points)} iterations on '
+                           f'{self.nslots} slots', Color.BRIGHT_BLUE)
+        ctx = multiprocessing.get_context('fork')
+        task_queue = ctx.Queue()
+        result_queue = ctx.Queue()
+        for point in points:
+            task_queue.put(point)
+        for _ in self.slots:
+            task_queue.put(None)
+        procs = [ctx.Process(target=_run_slot,
+                             args=(slot, self, task_queue, result_queue))
+                 for slot in self.slots]
+        results = []
+        try:
+            for proc in procs:
+                proc.start()
+            for _ in points:
+                stats, exit_code, events = self.wait_result(result_queue,
+                                                            procs)
+                for iter_count, rep, linear_conf_dict, stat_dict in stats:
+                    self.iterator.log_run(iter_count, rep,
+                                          linear_conf_dict, stat_dict)
+                results += stats
+                self.ppl.exit_code += exit_code
+                if get_tracer() is not None:
+                    get_tracer().events += events
+            self.join_slots(result_queue, procs)
+        finally:
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+                if proc.pid is not None:
+                    proc.join()
+            # Points left by a failed sweep must not block this process
+            # from exiting
+            task_queue.cancel_join_thread()
+            shutil.rmtree(self.slot_dir, ignore_errors=True)
+        results.sort(key=lambda result: (result[0], result[1]))
+        self.iterator.stats += [stat_dict for _, _, _, stat_dict in results]
+
+    def wait_result(self, result_queue, procs):
+        """
+        Wait for a slot to finish a point. A slot which fails to set up or
+        to run a point reports the error, which is raised here. A slot
+        which dies without reporting (e.g., it was killed) is detected by
+        its exit code.
+
+        :param result_queue: The queue the slots send their results to
+        :param procs: The processes of the slots
+        :return: The result of _run_point
+        """
+        failure = None
+        while True:
+            try:
+                slot_id, result, error = result_queue.get(timeout=1)
+            except queue.Empty:
+                # Give a dying slot one more chance to report its error
+                if failure is not None:
+                    raise Exception(failure)
+                for slot, proc in zip(self.slots, procs):
+                    if proc.exitcode not in (None, 0):
+                        failure = (f'Slot {slot.slot_id} exited with code '
+                                   f'{proc.exitcode}')
+                if failure is None and \
+                        not any(proc.is_alive() for proc in procs):
+                    failure = 'Every slot exited before the sweep finished'
+                continue
+            if error is not None:
+                raise Exception(f'Slot {slot_id} failed:\n{error}')
+            return result
+
+    def join_slots(self, result_queue, procs):
+        """
+        Wait for the slots to exit once every point has run. A slot which
+        failed while the others ran every point still fails the sweep.
+
+        :param result_queue: The queue the slots send their results to
+        :param procs: The processes of the slots
+        :return: None
+        """
+        for proc in procs:
+            proc.join()
+        while True:
+            try:
+                slot_id, _, error = result_queue.get(timeout=.1)
+            except queue.Empty:
+                break
+            raise Exception(f'Slot {slot_id} failed:\n{error}')
+        for slot, proc in zip(self.slots, procs):
+            if proc.exitcode != 0:
+                raise Exception(f'Slot {slot.slot_id} exited with code '
+                                f'{proc.exitcode}')
+
+
+def split(items, nslots):
+    """
+    Divide a list into nslots contiguous parts whose sizes differ by at
+    most one
+
+    :param items: The list to divide
+    :param nslots: The number of parts
+    :return: List of lists
+    """
+    per_slot, extra = divmod(len(items), nslots)
+    parts = []
+    off = 0
+    for i in range(nslots):
+        size = per_slot + (1 if i < extra else 0)
+        parts.append(items[off:off + size])
+        off += size
+    return parts
+
+
+def _run_slot(slot, sched, task_queue, result_queue):
+    """
+    The main loop of the process of a slot. Set up the slot and run points
+    until the task queue is exhausted. A failure is sent to the parent
+    instead of a result, after which the slot runs no more points.
+
+    :param slot: The SweepSlot of this process
+    :param sched: The SweepScheduler
+    :param task_queue: The queue of points to run. None ends the slot.
+    :param result_queue: The queue results and errors are sent to
+    :return: None
+    """
+    try:
+        _init_slot(slot, sched)
+        for point in iter(task_queue.get, None):
+            result_queue.put((slot.slot_id, _run_point(point), None))
+    except Exception:
+        result_queue.put((slot.slot_id, None, traceback.format_exc()))
+
+
+def _init_slot(slot, sched):
+    """
+    Load a private copy of the pipeline for a slot
+
+    :param slot: The SweepSlot of this process
+    :param sched: The SweepScheduler
+    :return: None
+    """
+    global _slot
+    _slot = slot
+    jarvis = JarvisManager.get_instance()
+    slot_name = f'slot{_slot.slot_id}'
+    ppl = sched.ppl
+    # Give the slot its own jarvis directories
+    slot_config_dir = os.path.join(sched.slot_dir, slot_name)
+    shutil.rmtree(slot_config_dir, ignore_errors=True)
+    shutil.copytree(ppl.config_dir,
+                    os.path.join(slot_config_dir, ppl.global_id),
+                    ignore=shutil.ignore_patterns('slots'))
+    jarvis.config_dir = slot_config_dir
+    jarvis.private_dir = os.path.join(jarvis.private_dir, 'slots', slot_name)
+    if jarvis.shared_dir is not None:
+        jarvis.shared_dir = os.path.join(jarvis.shared_dir, 'slots',
+                                         slot_name)
+    # Restrict the slot to its hosts or cpus
+    if _slot.hosts is not None:
+        hostfile_path = os.path.join(slot_config_dir, 'hostfile.txt')
+        Hostfile(all_hosts=_slot.hosts).save(hostfile_path)
+        jarvis.hostfile = Hostfile(hostfile=hostfile_path)
+    else:
+        os.sched_setaffinity(0, _slot.cpus)
+    # Reconfigure the copy of the pipeline for the slot's resources
+    _slot.ppl = ppl.__class__().load(ppl.global_id)
+    _slot.ppl.update().save()
+    # Reuse the iterator to configure pkgs and collect stats
+    _slot.iterator = sched.iterator
+    _slot.iterator.ppl = _slot.ppl
+    # Only the parent process writes to the ledger
+    _slot.iterator.ledger_path = None
+    # Discard the events inherited from the parent's tracer
+    if get_tracer() is not None:
+        get_tracer().take_events()
+
+
+def _run_point(point):
+    """
+    Run all repetitions of a single point of the sweep in this slot
+
+    :param point: A tuple (iter_count, linear_conf_dict, reps)
+    :return: A tuple (stats, exit_code, events). stats is a list of tuples
+    (iter_count, rep, linear_conf_dict, stat_dict). events are the trace
+    events recorded by this slot.
+    """
+    iter_count, linear_conf_dict, reps = point
+    ppl = _slot.ppl
+    iterator = _slot.iterator
+    conf_dict = {}
+    for key, val in linear_conf_dict.items():
+        pkg_id, var_name = key.split('.', 1)
+        conf_dict.setdefault(ppl.sub_pkgs_dict[pkg_id], {})[var_name] = val
+    # A pkg only differs from the previous iteration if this slot
+    # last ran it with a different configuration
+    for pkg, conf in conf_dict.items():
+        pkg.iter_diff = int(_slot.last_conf.get(pkg.pkg_id) != conf)
+        _slot.last_conf[pkg.pkg_id] = conf
+    iterator.linear_conf_dict = linear_conf_dict
+    iterator.stats = []
+    ppl.exit_code = 0
+    ppl.clean(with_iter_out=False)
+    for i in reps:
+        cur_iter_tmp = os.path.join(iterator.iter_out, f'{iter_count}-{i}')
+        ppl.set_config_env_vars(cur_iter_tmp)
+        ppl.log(f'[ITER] [slot {_slot.slot_id}] Iteration'
+                f'[(param) {iter_count + 1}/{iterator.max_iter_count}]'
+                f'[(rep) {i + 1}/{iterator.repeat}]: '
+                f'{linear_conf_dict}', Color.BRIGHT_BLUE)
+        with span(f'iteration {iter_count}-{i}', 'iteration',
+                  slot=_slot.slot_id, **linear_conf_dict):
+            iterator.config_pkgs(conf_dict)
+            ppl.run(kill=True)
+            iterator.save_run(conf_dict, i)
+            ppl.clean(with_iter_out=False)
+        if iterator.point_converged(linear_conf_dict):
+            break
+    stats = [(iter_count, i, linear_conf_dict, stat_dict)
+             for i, stat_dict in zip(reps, iterator.stats)]
+    events = []
+    if get_tracer() is not None:
+        events = get_tracer().take_events()
+    return stats, ppl.exit_code, events
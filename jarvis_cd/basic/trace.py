@@ -0,0 +1,144 @@
+"""
+This module records a timeline of a pipeline's execution. Spans are
+nested (pipeline -> iteration -> pkg phase -> Exec) and are exported in
+the Chrome trace event format, which can be opened in Perfetto
+(ui.perfetto.dev) or chrome://tracing.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+import json
+import os
+
+# The tracer recording the current run (None when not tracing)
+_tracer = None
+
+
+class Tracer:
+    """
+    Records spans as Chrome trace events
+    """
+
+    def __init__(self, name='jarvis'):
+        """
+        Initialize the tracer
+
+        :param name: The name of the process in the trace
+        """
+        self.name = name
+        self.events = []
+
+    @contextmanager
+    def span(self, name, cat='jarvis', **args):
+        """
+        Record the time spent within a block
+
+        :param name: The name of the span
+        :param cat: The category of the span (e.g., configure, exec)
+        :param args: Additional data to attach to the span
+        :return: None
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            end = time.time()
+            self.events.append({
+                'name': name,
+                'cat': cat,
+                'ph': 'X',
+                'ts': int(start * 1e6),
+                'dur': int((end - start) * 1e6),
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': args,
+            })
+
+    def take_events(self):
+        """
+        Remove and return the events recorded so far
+
+        :return: List of events
+        """
+        events = self.events
+        self.events = []
+        return events
+
+    def save(self, path):
+        """
+        Save the trace as Chrome trace JSON
+
+        :param path: The file to save to
+        :return: None
+        """
+        pids = sorted({event['pid'] for event in self.events})
+        meta = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                 'args': {'name': self.name if pid == os.getpid()
+                          else f'{self.name} ({pid})'}}
+                for pid in pids]
+        with open(path, 'w', encoding='utf-8') as fp:
+            json.dump({'traceEvents': meta + self.events,
+                       'displayTimeUnit': 'ms'}, fp, default=str)
+
+
+def get_tracer():
+    return _tracer
+
+
+def set_tracer(tracer):
+    global _tracer
+    _tracer = tracer
+    if tracer is not None:
+        instrument_exec()
+
+
+@contextmanager
+def span(name, cat='jarvis', **args):
+    """
+    Record a span in the current tracer (if there is one)
+
+    :param name: The name of the span
+    :param cat: The category of the span
+    :param args: Additional data to attach to the span
+    :return: None
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, cat, **args):
+        yield
+
+
+def _count_hosts(exec_info):
+    hostfile = getattr(exec_info, 'hostfile', None)
+    hosts = getattr(hostfile, 'hosts', None)
+    if hosts is None:
+        return 1
+    return len(hosts)
+
+
+def instrument_exec():
+    """
+    Record a span for every jarvis_util Exec (including subclasses such as
+    Mkdir and Rm) made while a tracer is set. Pkgs construct Exec
+    directly, so its constructor is wrapped once per process.
+
+    :return: None
+    """
+    from jarvis_util.shell.exec import Exec
+    if getattr(Exec, '_jarvis_traced', False):
+        return
+    init = Exec.__init__
+
+    def traced_init(self, cmd, exec_info=None, *args, **kwargs):
+        tracer = _tracer
+        if tracer is None:
+            return init(self, cmd, exec_info, *args, **kwargs)
+        with tracer.span(str(cmd)[:128], 'exec',
+                         exec_type=type(exec_info).__name__,
+                         hosts=_count_hosts(exec_info)):
+            return init(self, cmd, exec_info, *args, **kwargs)
+    Exec.__init__ = traced_init
+    Exec._jarvis_traced = True
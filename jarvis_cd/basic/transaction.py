@@ -0,0 +1,241 @@
+"""
+This module stages the construction of a pipeline in memory. Pkgs,
+configuration parameters, environment tracking, and the iterator are
+recorded as they are added, then validated together and applied in one
+pass when the transaction completes: the pkgs are created, their private
+directories are made with a single parallel ssh, independent pkgs are
+configured concurrently, and the pipeline is saved once. Invalid pkgs,
+parameters, or dependencies are reported before anything is created,
+and if configuring a pkg fails, nothing is saved and the pipeline it
+replaces (if any) is restored.
+
+Example:
+    with Pipeline.transaction('ior_test') as ppl:
+        ppl.append('hermes_run', sleep=5)
+        ppl.append('ior', api='posix', after='hermes_run')
+        ppl.configure('ior', xfer='1m')
+        ppl.track_env({'PATH': True})
+"""
+
+from jarvis_cd.basic.jarvis_manager import JarvisManager
+from jarvis_cd.basic.pipeline_store import PipelineStore
+from jarvis_cd.basic.batch import Batch
+import os
+
+ITERATOR_KEYS = ['norerun', 'parallel', 'adaptive', 'search', 'constraints',
+                 'hot_services', 'derived']
+
+
+class PipelineTransaction:
+    """
+    A pipeline whose construction is deferred until the transaction
+    completes
+    """
+
+    def __init__(self, pipeline_cls, pipeline_id):
+        """
+        Initialize the transaction
+
+        :param pipeline_cls: The class of the pipeline to build
+        :param pipeline_id: The id of the pipeline. An existing pipeline
+        with this id is replaced.
+        """
+        self.jarvis = JarvisManager.get_instance()
+        self.pipeline_cls = pipeline_cls
+        self.pipeline_id = pipeline_id
+        # [pkg_type, pkg_id, kwargs] for each pkg, in order
+        self.pkgs = []
+        self.deps = {}
+        self.static_env = None
+        self.env_track = {}
+        self.iterator = None
+        self.config = {}
+        # The pipeline, once committed
+        self.pipeline = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+
+    def _get(self, pkg_id):
+        for entry in self.pkgs:
+            if entry[1] == pkg_id:
+                return entry
+        return None
+
+    def append(self, pkg_type, pkg_id=None, after=None, **kwargs):
+        """
+        Stage a pkg at the end of the pipeline
+
+        :param pkg_type: The type of pkg to create (e.g., ior)
+        :param pkg_id: Semantic name of the pkg. Default is pkg_type.
+        :param after: The pkg(s) which must be started before this one
+        :param kwargs: The configuration parameters of the pkg
+        :return: self
+        """
+        if pkg_id is None:
+            pkg_id = pkg_type
+        if self._get(pkg_id) is not None:
+            raise Exception(f'{self.pipeline_id} already has a pkg '
+                            f'named {pkg_id}')
+        self.pkgs.append([pkg_type, pkg_id, dict(kwargs)])
+        if after is not None:
+            if isinstance(after, str):
+                after = [after]
+            self.deps.setdefault(pkg_id, []).extend(after)
+        return self
+
+    def configure(self, pkg_id, **kwargs):
+        """
+        Stage configuration parameters of a pkg
+
+        :param pkg_id: The semantic name of the pkg
+        :param kwargs: The configuration parameters
+        :return: self
+        """
+        entry = self._get(pkg_id)
+        if entry is None:
+            raise Exception(f'Could not find pkg: {pkg_id}')
+        entry[2].update(kwargs)
+        return self
+
+    def copy_static_env(self, env_name):
+        """
+        Stage copying a named environment to the pipeline
+
+        :param env_name: The name of the environment
+        :return: self
+        """
+        self.static_env = env_name
+        return self
+
+    def track_env(self, env_track_dict):
+        """
+        Stage tracking environment variables (see Pkg.track_env)
+
+        :param env_track_dict: Variable name -> bool or value
+        :return: self
+        """
+        self.env_track.update(env_track_dict)
+        return self
+
+    def set_config(self, **kwargs):
+        """
+        Stage pipeline parameters (e.g., max_workers, ssh_pool)
+
+        :param kwargs: The parameters
+        :return: self
+        """
+        self.config.update(kwargs)
+        return self
+
+    def set_iterator(self, variables, loop, output, repeat=1, **kwargs):
+        """
+        Stage the iterator of the pipeline. See
+        Pipeline.from_yaml_iter_dict for the other parameters.
+
+        :param variables: pkg_id.var -> list of values
+        :param loop: The groups of variables which are zipped together
+        :param output: The directory where iterator results are stored
+        :param repeat: The number of times to run each point
+        :return: self
+        """
+        for key in kwargs:
+            if key not in ITERATOR_KEYS:
+                raise Exception(f'Unknown iterator parameter: {key}')
+        self.iterator = {'vars': variables, 'loop': loop, 'output': output,
+                         'repeat': repeat}
+        self.iterator.update(kwargs)
+        return self
+
+    def validate(self):
+        """
+        Verify the pkgs exist, their parameters are known, and the
+        dependencies and iterator refer to pkgs of the pipeline
+
+        :return: None
+        """
+        pkg_ids = {entry[1] for entry in self.pkgs}
+        for pkg_type, pkg_id, kwargs in self.pkgs:
+            pkg = self.jarvis.construct_pkg(pkg_type)
+            if pkg is None:
+                raise Exception(f'Could not find pkg: {pkg_type}')
+            menu = {opt['name']: opt for opt in pkg.configure_menu()}
+            for key, val in kwargs.items():
+                if key not in menu:
+                    raise Exception(f'{pkg_id} ({pkg_type}) has no '
+                                    f'parameter {key}')
+                choices = menu[key].get('choices')
+                if choices and val not in choices:
+                    raise Exception(f'{pkg_id}.{key} must be one of '
+                                    f'{choices}, not {val}')
+        for pkg_id, after in self.deps.items():
+            for dep_id in after:
+                if dep_id not in pkg_ids:
+                    raise Exception(f'{pkg_id} depends on an unknown pkg: '
+                                    f'{dep_id}')
+        if self.iterator is not None:
+            for var in self.iterator['vars']:
+                if var.split('.')[0] not in pkg_ids:
+                    raise Exception(f'The iterator variable {var} does not '
+                                    f'belong to a pkg of the pipeline')
+            for group in self.iterator['loop']:
+                for var in group:
+                    if var not in self.iterator['vars']:
+                        raise Exception(f'The loop variable {var} has no '
+                                        f'values in vars')
+
+    def commit(self):
+        """
+        Build, configure, and save the pipeline
+
+        :return: The pipeline
+        """
+        self.validate()
+        if self.jarvis.batch is not None:
+            # Saved by the batch being executed
+            return self._build()
+        with Batch(self.jarvis):
+            return self._build()
+
+    def _build(self):
+        self.jarvis.batch.forget(self.pipeline_id)
+        # An existing pipeline is moved aside instead of being reset, so
+        # it is restored if configuring the new one fails
+        config_dir = os.path.join(self.jarvis.config_dir,
+                                  self.pipeline_id.replace('.', '/'))
+        compact = os.path.exists(PipelineStore.get_path(config_dir))
+        self.jarvis.batch.stash(config_dir)
+        pipeline = self.pipeline_cls().create(self.pipeline_id)
+        if self.static_env is not None:
+            pipeline.copy_static_env(self.static_env)
+        pipeline.track_env(self.env_track)
+        for pkg_type, pkg_id, _ in self.pkgs:
+            pipeline.append(pkg_type, pkg_id, do_configure=False)
+        if self.deps:
+            pipeline.config['deps'] = self.deps
+        pipeline.config.update(self.config)
+        if 'ssh_pool' in self.config:
+            pipeline._init()  # pylint: disable=protected-access
+        pipeline.get_stages()
+        if self.iterator is not None:
+            pipeline.config['iterator'] = self.iterator
+        kwargs = {pkg_id: kwargs for _, pkg_id, kwargs in self.pkgs}
+
+        def configure(pkg):
+            pkg.update_env(pipeline.pkg_env(pkg))
+            pipeline.configure_pkg(pkg, **kwargs[pkg.pkg_id])
+        with pipeline.ssh_session():
+            # Create all private directories using a single parallel ssh
+            pipeline.fs_plan.mkdir([pkg.private_dir
+                                    for pkg in pipeline.sub_pkgs],
+                                   self.jarvis.hostfile)
+            pipeline.run_graph(configure)
+        if compact:
+            pipeline.compact_state()
+        pipeline.save()
+        self.pipeline = pipeline
+        return pipeline
@@ -0,0 +1,31 @@
+"""
+Test adaptive repetition of sweep points
+"""
+from jarvis_cd.basic.adaptive_repeat import AdaptiveRepeat, t_quantile
+from unittest import TestCase
+
+
+class TestAdaptiveRepeat(TestCase):
+    """
+    Test AdaptiveRepeat
+    """
+    def test_t_quantile(self):
+        self.assertAlmostEqual(t_quantile(.975, 1), 12.706, places=3)
+        self.assertAlmostEqual(t_quantile(.975, 2), 4.303, places=3)
+        self.assertAlmostEqual(t_quantile(.975, 10), 2.228, places=3)
+        self.assertAlmostEqual(t_quantile(.995, 5), 4.032, places=2)
+
+    def test_converged(self):
+        adaptive = AdaptiveRepeat('ior.write_bw', rel_ci=.05, min_repeat=3)
+        for val in [100, 101]:
+            adaptive.add('stable', {'ior.write_bw': val})
+        self.assertFalse(adaptive.converged('stable'))
+        adaptive.add('stable', {'ior.write_bw': 100.5})
+        self.assertTrue(adaptive.converged('stable'))
+
+        for val in [50, 150, 100, 60]:
+            adaptive.add('noisy', {'ior.write_bw': val})
+        self.assertFalse(adaptive.converged('noisy'))
+        # Runs which did not report the metric are ignored
+        adaptive.add('noisy', {'ior.write_bw': None})
+        self.assertEqual(len(adaptive.samples['noisy']), 4)
@@ -0,0 +1,91 @@
+"""
+Test batch scripts
+"""
+from jarvis_cd.basic.batch import Batch, read_batch
+from unittest import TestCase
+import tempfile
+import shutil
+import os
+
+
+class FakeManager:
+    def __init__(self):
+        self.batch = None
+        self.saves = 0
+
+    def save(self):
+        if self.batch is not None:
+            self.batch.save_manager = True
+            return
+        self.saves += 1
+
+
+class TestBatch(TestCase):
+    """
+    Test Batch
+    """
+    def test_read_batch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'build.sh')
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write('# Build the pipeline\n'
+                         'jarvis ppl create test\n'
+                         '\n'
+                         'jarvis ppl append ior \\\n'
+                         '    api=posix  # the io api\n'
+                         'pkg conf ior xfer="1 m"\n')
+            self.assertEqual(read_batch(path), [
+                ['ppl', 'create', 'test'],
+                ['ppl', 'append', 'ior', 'api=posix'],
+                ['pkg', 'conf', 'ior', 'xfer=1 m'],
+            ])
+
+    def test_deferred_save(self):
+        jarvis = FakeManager()
+        cmds = [['cd', 'a'], ['cd', 'b']]
+        seen = []
+
+        def handler(argv):
+            self.assertIsNotNone(jarvis.batch)
+            seen.append(argv)
+            jarvis.save()
+        Batch(jarvis).run(cmds, handler)
+        self.assertEqual(seen, cmds)
+        self.assertEqual(jarvis.saves, 1)
+        self.assertIsNone(jarvis.batch)
+
+    def test_rollback(self):
+        jarvis = FakeManager()
+
+        def handler(argv):
+            jarvis.save()
+            if argv[0] == 'fail':
+                exit(2)
+        with self.assertRaises(Exception):
+            Batch(jarvis).run([['cd', 'a'], ['fail']], handler)
+        self.assertEqual(jarvis.saves, 0)
+        self.assertIsNone(jarvis.batch)
+
+    def test_stash(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ppl')
+            for fail in [True, False]:
+                os.makedirs(path, exist_ok=True)
+                with open(os.path.join(path, 'old'), 'w',
+                          encoding='utf-8'):
+                    pass
+                batch = Batch(FakeManager())
+                batch.stash(path)
+                self.assertFalse(os.path.exists(path))
+                os.mkdir(path)
+                with open(os.path.join(path, 'new'), 'w', encoding='utf-8'):
+                    pass
+                if fail:
+                    batch.rollback()
+                    self.assertEqual(os.listdir(path), ['old'])
+                else:
+                    batch.commit()
+                    self.assertEqual(os.listdir(path), ['new'])
+                # The stash is removed either way
+                self.assertEqual(os.listdir(tmp), ['ppl'])
+                shutil.rmtree(path)
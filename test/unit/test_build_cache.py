@@ -0,0 +1,96 @@
+"""
+Test the build cache
+"""
+from jarvis_cd.basic.build_cache import BuildCache, source_revision
+from unittest import TestCase
+import tempfile
+import os
+
+
+class TestBuildCache(TestCase):
+    """
+    Test BuildCache
+    """
+    def test_reuse_and_evict(self):
+        builds = []
+
+        def build(build_dir):
+            builds.append(build_dir)
+            with open(os.path.join(build_dir, 'app'), 'wb') as fp:
+                fp.write(b'0' * 1024)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = BuildCache(cache_dir, max_size=1536)
+            dir_a = cache.build('app', {'opts': 'a'}, build)
+            self.assertEqual(cache.build('app', {'opts': 'a'}, build), dir_a)
+            self.assertEqual(len(builds), 1)
+
+            # A new set of inputs evicts the least recently used build
+            dir_b = cache.build('app', {'opts': 'b'}, build)
+            self.assertNotEqual(dir_a, dir_b)
+            self.assertEqual(len(builds), 2)
+            self.assertFalse(os.path.exists(dir_a))
+            self.assertTrue(os.path.exists(dir_b))
+
+    def test_failed_build(self):
+        def build(build_dir):
+            raise Exception('Failed to build')
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = BuildCache(cache_dir)
+            with self.assertRaises(Exception):
+                cache.build('app', {}, build)
+            build_dir = cache.build('app', {}, lambda build_dir: None)
+            self.assertTrue(os.path.exists(build_dir))
+
+    def test_outputs(self):
+        builds = []
+
+        with tempfile.TemporaryDirectory() as tmp:
+            # An in-source build, whose output is outside the cache
+            exe = os.path.join(tmp, 'src', 'app.exe')
+            os.makedirs(os.path.dirname(exe))
+
+            def build(build_dir):
+                builds.append(build_dir)
+                with open(exe, 'w', encoding='utf-8') as fp:
+                    fp.write('')
+
+            cache = BuildCache(os.path.join(tmp, 'cache'))
+            cache.build('app', {}, build, outputs=[exe])
+            cache.build('app', {}, build, outputs=[exe])
+            self.assertEqual(len(builds), 1)
+            # The output was deleted, so the build is redone
+            os.remove(exe)
+            cache.build('app', {}, build, outputs=[exe])
+            self.assertEqual(len(builds), 2)
+            with self.assertRaises(Exception):
+                cache.build('app', {'opts': 'a'}, lambda build_dir: None,
+                            outputs=['app'])
+
+    def test_lock_files(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = BuildCache(cache_dir)
+            cache.build('app', {'opts': 'a'}, lambda build_dir: None)
+            cache.build('app', {'opts': 'b'}, lambda build_dir: None)
+            cache.clear()
+            self.assertEqual(sorted(os.listdir(cache_dir)),
+                             ['.index.lock', 'index.yaml'])
+
+    def test_source_revision(self):
+        with tempfile.TemporaryDirectory() as src_dir:
+            with open(os.path.join(src_dir, 'main.F'), 'w',
+                      encoding='utf-8') as fp:
+                fp.write('')
+            revision = source_revision(src_dir)
+            # The products of an in-source build do not change the revision
+            for name in ['main.o', 'cm1', 'generated.f.bak', 'Makefile.dep']:
+                with open(os.path.join(src_dir, name), 'w',
+                          encoding='utf-8') as fp:
+                    fp.write('build')
+            self.assertEqual(source_revision(src_dir), revision)
+            # Changes to the source do
+            with open(os.path.join(src_dir, 'main.F'), 'w',
+                      encoding='utf-8') as fp:
+                fp.write('program main')
+            self.assertNotEqual(source_revision(src_dir), revision)
@@ -7,6 +7,7 @@ from jarvis_cd.basic.jarvis_manager import JarvisManager
 from jarvis_cd.basic.pkg import Pipeline
 from unittest import TestCase
 import os
+import sys
 import yaml
 
 
@@ -144,6 +145,25 @@ class TestCli(TestCase):
         self.jarvis.cd(pipeline.global_id)
         self.jarvis.save()
 
+    def test_jarvis_startup(self):
+        # Importing the pkg module should not pull in pandas
+        code = 'import sys; import jarvis_cd.basic.pkg; ' \
+               'print("pandas" in sys.modules)'
+        exec_pkg = Exec(f'{sys.executable} -c \'{code}\'',
+                        LocalExecInfo(collect_output=True))
+        self.assertEqual(exec_pkg.stdout['localhost'].strip(), 'False')
+
+        # Loading the CLI should not import the pkg machinery. Handlers
+        # import what they use.
+        jarvis = JarvisManager.get_instance()
+        code = 'import sys, runpy; ' \
+               f'runpy.run_path("{jarvis.jarvis_root}/bin/jarvis"); ' \
+               'print([mod for mod in ["pandas", "jarvis_cd.basic.pkg"] ' \
+               'if mod in sys.modules])'
+        exec_cli = Exec(f'{sys.executable} -c \'{code}\'',
+                        LocalExecInfo(collect_output=True))
+        self.assertEqual(exec_cli.stdout['localhost'].strip(), '[]')
+
     def verify_pipeline(self, stdout, expected_lines):
         lines = stdout['localhost'].strip().splitlines()
         for line, expected_line in zip(lines, expected_lines):
@@ -0,0 +1,204 @@
+"""
+Test skipping configure when its inputs are unchanged
+"""
+from jarvis_cd.basic.pkg import SimplePkg
+from jarvis_cd.basic.build_cache import BuildCache
+from unittest import TestCase, mock
+import tempfile
+import os
+
+
+class FakeHostfile:
+    def __init__(self, hosts):
+        self.path = None
+        self.hosts = hosts
+
+    def save(self, path):
+        self.path = path
+
+
+class FakeManager:
+    def __init__(self, hosts):
+        self.hostfile = FakeHostfile(hosts)
+        self.resource_graph_path = None
+        self.build_cache = None
+
+
+class Writer(SimplePkg):
+    """
+    Writes a config file and exports its path. Optionally, lists the
+    hosts of the hostfile in the file.
+    """
+    use_hosts = False
+
+    def _init(self):
+        pass
+
+    def _configure_menu(self):
+        return [{'name': 'nprocs', 'msg': '', 'type': int, 'default': 1}]
+
+    def _configure(self, **kwargs):
+        self.calls += 1
+        path = f'{self.config_dir}/writer.conf'
+        with open(path, 'w', encoding='utf-8') as fp:
+            fp.write(f'nprocs={self.config["nprocs"]}\n')
+            if self.use_hosts:
+                fp.write(','.join(self.jarvis.hostfile.hosts))
+        self.env['WRITER_CONF'] = path
+
+    def update_config(self, kwargs, rebuild=False):
+        self.config.update({key: val for key, val in kwargs.items()
+                            if key in ['nprocs', 'reinit']})
+
+    start = stop = clean = status = None
+
+
+class HostWriter(Writer):
+    use_hosts = True
+
+
+class MkdirWriter(Writer):
+    """
+    Creates a directory on every host
+    """
+    def _configure(self, **kwargs):
+        super()._configure(**kwargs)
+        self.fs_plan.mkdir(f'{self.private_dir}/data', self.jarvis.hostfile)
+
+
+class MkdirSaver(Writer):
+    """
+    Creates a directory on every host and saves the hostfile
+    """
+    def _configure(self, **kwargs):
+        super()._configure(**kwargs)
+        hostfile = self.jarvis.hostfile
+        self.fs_plan.mkdir(f'{self.private_dir}/data', hostfile)
+        hostfile.save(f'{self.config_dir}/hostfile')
+
+
+class EnvWriter(Writer):
+    """
+    Reads an environment variable
+    """
+    def _configure(self, **kwargs):
+        super()._configure(**kwargs)
+        self.env.get('FOO')
+
+
+class Builder(Writer):
+    """
+    Builds an executable through the build cache
+    """
+    def _configure(self, **kwargs):
+        super()._configure(**kwargs)
+
+        def build(build_dir):
+            os.makedirs(f'{build_dir}/bin')
+            with open(f'{build_dir}/bin/app', 'w', encoding='utf-8'):
+                pass
+        self.config['build_dir'] = self.cached_build(
+            'app', self.config_dir, build, outputs=['bin/app'])
+
+
+def make_pkg(cls, tmp, hosts):
+    pkg = cls.__new__(cls)
+    pkg.jarvis = FakeManager(hosts)
+    pkg.pkg_type = cls.__name__.lower()
+    pkg.pkg_id = pkg.pkg_type
+    pkg.root = None
+    pkg._fs_plan = mock.Mock()
+    pkg._input_trace = None
+    pkg.config = {'nprocs': 1}
+    pkg.env = {}
+    pkg.config_dir = pkg.shared_dir = tmp
+    pkg.private_dir = os.path.join(tmp, 'private')
+    pkg.calls = 0
+    return pkg
+
+
+class TestConfigureCache(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_skip_unchanged(self):
+        pkg = make_pkg(Writer, self.tmp.name, ['node0'])
+        pkg.configure(nprocs=4)
+        pkg.env = {}
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 1)
+        self.assertTrue(pkg.config_cached)
+        # The exports of the skipped configure are applied again
+        self.assertEqual(pkg.env['WRITER_CONF'],
+                         f'{self.tmp.name}/writer.conf')
+
+    def test_reconfigure(self):
+        pkg = make_pkg(Writer, self.tmp.name, ['node0'])
+        pkg.configure(nprocs=4)
+        pkg.configure(nprocs=8)
+        self.assertEqual(pkg.calls, 2)
+        pkg.configure(nprocs=8, reinit=True)
+        self.assertEqual(pkg.calls, 3)
+        # A file written by configure was removed
+        os.remove(f'{self.tmp.name}/writer.conf')
+        pkg.configure(nprocs=8)
+        self.assertEqual(pkg.calls, 4)
+
+    def test_hostfile(self):
+        # Only pkgs which read the hostfile are reconfigured when it changes
+        for cls, calls in [(Writer, 1), (HostWriter, 2)]:
+            pkg = make_pkg(cls, self.tmp.name, ['node0'])
+            pkg.configure(nprocs=4)
+            pkg.jarvis.hostfile = FakeHostfile(['node0', 'node1'])
+            pkg.configure(nprocs=4)
+            self.assertEqual(pkg.calls, calls, cls.__name__)
+
+    def test_hostfile_mkdir(self):
+        # A hostfile only passed to mkdir is not an input, but the mkdir
+        # is replayed on the new hosts
+        pkg = make_pkg(MkdirWriter, self.tmp.name, ['node0'])
+        pkg.configure(nprocs=4)
+        hostfile = FakeHostfile(['node0', 'node1'])
+        pkg.jarvis.hostfile = hostfile
+        pkg._fs_plan.mkdir.reset_mock()
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 1)
+        pkg._fs_plan.mkdir.assert_called_with(
+            f'{pkg.private_dir}/data', hostfile)
+        # Using the same hostfile object for anything else makes it an input
+        pkg = make_pkg(MkdirSaver, self.tmp.name, ['node0'])
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.jarvis.hostfile.path,
+                         f'{self.tmp.name}/hostfile')
+        pkg.jarvis.hostfile = FakeHostfile(['node0', 'node1'])
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 2)
+
+    def test_env(self):
+        # Only the environment variables configure read are inputs
+        pkg = make_pkg(EnvWriter, self.tmp.name, ['node0'])
+        pkg.configure(nprocs=4)
+        pkg.env['BAR'] = '1'
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 1)
+        pkg.env['FOO'] = '1'
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 2)
+
+    def test_evicted_build(self):
+        pkg = make_pkg(Builder, self.tmp.name, ['node0'])
+        cache = BuildCache(os.path.join(self.tmp.name, '.build_cache'))
+        pkg.jarvis.build_cache = cache
+        pkg.configure(nprocs=4)
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 1)
+        # Another pipeline evicted the build, so the pkg is reconfigured
+        # and the build is redone
+        cache.clear()
+        self.assertFalse(os.path.exists(pkg.config['build_dir']))
+        pkg.configure(nprocs=4)
+        self.assertEqual(pkg.calls, 2)
+        self.assertTrue(os.path.exists(f'{pkg.config["build_dir"]}/bin/app'))
@@ -0,0 +1,32 @@
+"""
+Test recording the inputs of configure
+"""
+from jarvis_cd.basic.configure_inputs import TrackedDict, digest
+from unittest import TestCase
+
+
+class TestConfigureInputs(TestCase):
+    """
+    Test TrackedDict and digest
+    """
+    def test_tracked_reads(self):
+        env = TrackedDict({'A': 1, 'B': 2, 'C': 3})
+        env.get('A')
+        env['D'] = env['B'] + 1
+        env['C'] = 4
+        self.assertEqual(env['C'], 4)
+        self.assertIn('D', env)
+        self.assertEqual(env.input_keys(), {'A', 'B'})
+        self.assertEqual(env.writes, {'C', 'D'})
+
+    def test_tracked_read_all(self):
+        env = TrackedDict({'A': 1, 'B': 2})
+        env['C'] = 3
+        self.assertEqual(dict(env), {'A': 1, 'B': 2, 'C': 3})
+        self.assertEqual(env.input_keys(), {'A', 'B'})
+
+    def test_digest(self):
+        self.assertEqual(digest({'a': [1, 2], 'b': None}),
+                         digest({'b': None, 'a': [1, 2]}))
+        self.assertNotEqual(digest(['a', 'b']), digest(['b', 'a']))
+        self.assertEqual(digest({'x', 'y'}), digest({'y', 'x'}))
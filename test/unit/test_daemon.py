@@ -0,0 +1,93 @@
+"""
+Test forwarding commands to the jarvis daemon
+"""
+from jarvis_cd.basic import daemon
+from unittest import TestCase, mock
+import tempfile
+import signal
+import socket
+import time
+import sys
+import os
+
+
+class EchoDaemon(daemon.JarvisDaemon):
+    """
+    A daemon without jarvis state
+    """
+    def refresh(self):
+        pass
+
+    def warm(self):
+        pass
+
+
+def echo(argv):
+    path, exit_code = argv
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(f'{os.getcwd()} {os.environ.get("ECHO_VAR")}')
+    sys.exit(int(exit_code))
+
+
+class TestDaemon(TestCase):
+    """
+    Test the daemon client and server
+    """
+    def test_forward(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {'DAEMON_ROOT': tmp,
+                     'SOCK_PATH': os.path.join(tmp, 'daemon.sock'),
+                     'PID_PATH': os.path.join(tmp, 'daemon.pid')}
+            with mock.patch.multiple(daemon, **paths), \
+                    mock.patch.dict(os.environ, {'ECHO_VAR': 'hi'}):
+                os.environ.pop('JARVIS_NO_DAEMON', None)
+                self.assertIsNone(daemon.forward(['x', '0']))
+                pid = os.fork()
+                if pid == 0:
+                    with open(os.devnull, 'w', encoding='utf-8') as null:
+                        os.dup2(null.fileno(), 1)
+                    try:
+                        EchoDaemon(echo).serve()
+                    finally:
+                        os._exit(0)
+                try:
+                    while daemon.status() is None:
+                        time.sleep(.01)
+                    self.assertEqual(daemon.status(), pid)
+                    out_path = os.path.join(tmp, 'out')
+                    self.assertEqual(daemon.forward([out_path, '3']), 3)
+                    with open(out_path, 'r', encoding='utf-8') as fp:
+                        self.assertEqual(fp.read(), f'{os.getcwd()} hi')
+                finally:
+                    os.kill(pid, signal.SIGTERM)
+                    os.waitpid(pid, 0)
+                self.assertIsNone(daemon.status())
+                self.assertFalse(os.path.exists(paths['SOCK_PATH']))
+
+    def test_untrusted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {'DAEMON_ROOT': tmp,
+                     'SOCK_PATH': os.path.join(tmp, 'daemon.sock')}
+            with mock.patch.multiple(daemon, **paths), \
+                    socket.socket(socket.AF_UNIX) as server:
+                server.bind(paths['SOCK_PATH'])
+                server.listen(1)
+                with daemon._connect() as sock:
+                    self.assertEqual(daemon._peer_uid(sock), os.getuid())
+                # A socket owned by another user is not trusted
+                with mock.patch.object(daemon, '_peer_uid',
+                                       return_value=os.getuid() + 1):
+                    self.assertIsNone(daemon._connect())
+                # Nor is a directory others can write to
+                os.chmod(tmp, 0o777)
+                with mock.patch('sys.stderr'):
+                    self.assertIsNone(daemon._connect())
+                os.chmod(tmp, 0o700)
+
+    def test_runtime_dir(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': '/run/user/1'}):
+            self.assertEqual(daemon.runtime_dir('jarvis-daemon', '/tmp/x'),
+                             '/run/user/1/jarvis-daemon')
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            self.assertEqual(daemon.runtime_dir('jarvis-daemon', '/tmp/x'),
+                             '/tmp/x')
@@ -0,0 +1,30 @@
+"""
+Test sweep expressions
+"""
+from jarvis_cd.basic.expr import Expr
+from unittest import TestCase
+
+
+class TestExpr(TestCase):
+    """
+    Test Expr
+    """
+    def test_eval(self):
+        point = {'ior.nprocs': 8, 'ior.ppn': 4, 'ior.total_size': '1g',
+                 'nodes': 2}
+        expr = Expr('ior.ppn <= ior.nprocs and ior.nprocs % nodes == 0')
+        self.assertEqual(sorted(expr.vars), ['ior.nprocs', 'ior.ppn', 'nodes'])
+        self.assertTrue(expr.eval(point.get))
+        expr = Expr('size(ior.total_size) // ior.nprocs')
+        self.assertEqual(expr.eval(point.get), (1 << 30) // 8)
+        expr = Expr('max(1, ior.nprocs // 16) if ior.ppn > 2 else 0')
+        self.assertEqual(expr.eval(point.get), 1)
+
+    def test_unsafe(self):
+        for text in ['__import__("os")', 'ior.__class__.__bases__',
+                     '[x for x in ior.nprocs]', 'lambda: 1',
+                     'open("/etc/passwd")', 'ior.nprocs(']:
+            with self.assertRaises(Exception):
+                Expr(text)
+        with self.assertRaises(Exception):
+            Expr('ior.nprocs / 0').eval(lambda var: 1)
@@ -0,0 +1,113 @@
+"""
+Test keeping services running between the points of a sweep
+"""
+from jarvis_cd.basic.pkg import Pipeline, Service, Application
+from contextlib import nullcontext
+from unittest import TestCase, mock
+
+
+class HotService(Service):
+    """
+    A service which can reset its state
+    """
+    resettable = True
+
+    def reset_state(self):
+        self.events.append(('reset', self.pkg_id))
+        return self.resettable
+
+    def update_env(self, env, mod_env=None):
+        pass
+
+    _init = _configure = _configure_menu = None
+    start = stop = clean = status = None
+
+
+class ColdService(HotService):
+    """
+    A service which does not implement reset_state
+    """
+    reset_state = Service.reset_state
+
+
+class App(Application):
+    _init = _configure = _configure_menu = None
+    start = stop = clean = None
+
+
+def make_pkg(cls, pkg_id, events):
+    pkg = cls.__new__(cls)
+    pkg.pkg_id = pkg.pkg_type = pkg_id
+    pkg.config = {}
+    pkg.exit_code = 0
+    pkg.events = events
+    return pkg
+
+
+def make_pipeline(*pkgs):
+    ppl = Pipeline.__new__(Pipeline)
+    ppl.env = {}
+    ppl.sub_pkgs = list(pkgs)
+    ppl.hot_pkgs = {}
+    ppl.exit_code = 0
+    ppl.root = None
+    ppl._fs_plan = mock.MagicMock()
+    ppl._input_trace = None
+    ppl.log = mock.Mock()
+    ppl.ssh_session = nullcontext
+    ppl.events = pkgs[0].events
+    for phase in ['start', 'kill', 'clean']:
+        setattr(ppl, f'_{phase}_pkg',
+                lambda pkg, phase=phase: ppl.events.append((phase,
+                                                            pkg.pkg_id)))
+    return ppl
+
+
+class TestHotServices(TestCase):
+    def setUp(self):
+        self.events = []
+        self.db = make_pkg(HotService, 'db', self.events)
+        self.fs = make_pkg(HotService, 'fs', self.events)
+        self.app = make_pkg(App, 'app', self.events)
+        self.ppl = make_pipeline(self.db, self.fs, self.app)
+
+    def run_hot(self):
+        self.events.clear()
+        self.ppl.run_hot()
+        return list(self.events)
+
+    def test_is_hot(self):
+        self.assertTrue(Pipeline.is_hot(self.db))
+        self.assertFalse(Pipeline.is_hot(make_pkg(ColdService, 'c', [])))
+        self.assertFalse(Pipeline.is_hot(self.app))
+
+    def test_reuse(self):
+        self.assertEqual(self.run_hot(), [
+            ('start', 'db'), ('start', 'fs'), ('start', 'app'),
+            ('kill', 'app'), ('clean', 'app')])
+        # Unchanged services are reset instead of restarted
+        self.assertEqual(self.run_hot(), [
+            ('reset', 'db'), ('reset', 'fs'), ('start', 'app'),
+            ('kill', 'app'), ('clean', 'app')])
+        self.ppl.stop_hot()
+        self.assertEqual(self.events[-4:], [
+            ('kill', 'fs'), ('clean', 'fs'), ('kill', 'db'), ('clean', 'db')])
+        self.assertEqual(self.ppl.hot_pkgs, {})
+
+    def test_restart(self):
+        self.run_hot()
+        # A changed config restarts the service and every hot service
+        # after it
+        self.db.config = {'port': 2}
+        self.assertEqual(self.run_hot()[:6], [
+            ('kill', 'db'), ('clean', 'db'), ('start', 'db'),
+            ('kill', 'fs'), ('clean', 'fs'), ('start', 'fs')])
+        # So does a changed environment
+        self.ppl.env = {'PATH': '/bin'}
+        self.assertEqual(self.run_hot()[:3], [
+            ('kill', 'db'), ('clean', 'db'), ('start', 'db')])
+        # A service whose state cannot be reset is restarted
+        self.fs.resettable = False
+        self.assertEqual(self.run_hot()[:6], [
+            ('reset', 'db'), ('reset', 'fs'), ('kill', 'fs'),
+            ('clean', 'fs'), ('start', 'fs'), ('start', 'app')])
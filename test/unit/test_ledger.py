@@ -0,0 +1,100 @@
+"""
+Test the run ledger of resumable sweeps
+"""
+from jarvis_cd.basic.pkg import PipelineIterator
+from unittest import TestCase, mock
+import tempfile
+import json
+import os
+
+
+def make_iterator(ledger_path, repeat=2):
+    iterator = PipelineIterator.__new__(PipelineIterator)
+    iterator.ledger_path = ledger_path
+    iterator.repeat = repeat
+    iterator.completed = set()
+    iterator.stats = []
+    iterator.adaptive = None
+    iterator.search = None
+    iterator.point_metric = {}
+    iterator.results = mock.Mock()
+    return iterator
+
+
+def make_pipeline(iter_out, search):
+    ppl = mock.Mock()
+    ppl.sub_pkgs_dict = {'app': mock.Mock(pkg_id='app', config={})}
+    ppl.config = {'iterator': {
+        'vars': {'app.x': list(range(100)), 'app.y': list(range(100))},
+        'loop': [['app.x'], ['app.y']],
+        'output': iter_out,
+        'repeat': 1,
+        'search': search,
+    }}
+    return ppl
+
+
+class TestLedger(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ledger.jsonl')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path, 'r', encoding='utf-8') as fp:
+            return [json.loads(line) for line in fp]
+
+    def test_append(self):
+        iterator = make_iterator(self.path)
+        iterator.log_run(0, 0, {'ior.nprocs': 1}, {'bw': 10})
+        iterator.log_run(0, 1, {'ior.nprocs': 1}, {'bw': 12})
+        records = self.read()
+        self.assertEqual([record['rep'] for record in records], [0, 1])
+        self.assertEqual(records[1]['conf'], {'ior.nprocs': 1})
+        self.assertEqual(records[1]['stat'], {'bw': 12})
+        self.assertEqual(iterator.results.append.call_count, 2)
+
+    def test_skip_completed(self):
+        iterator = make_iterator(self.path)
+        iterator.log_run(0, 0, {'ior.nprocs': 1}, {'bw': 10})
+        iterator.log_run(0, 1, {'ior.nprocs': 1}, {'bw': 12})
+        iterator.log_run(1, 0, {'ior.nprocs': 2}, {'bw': 20})
+        resumed = make_iterator(self.path)
+        self.assertEqual(resumed.load_ledger(), 3)
+        self.assertEqual(resumed.pending_reps({'ior.nprocs': 1}), [])
+        self.assertEqual(resumed.pending_reps({'ior.nprocs': 2}), [1])
+        self.assertEqual(resumed.pending_reps({'ior.nprocs': 4}), [0, 1])
+        # The stats of the completed runs are kept for the analysis
+        self.assertEqual(resumed.stats, [{'bw': 10}, {'bw': 12}, {'bw': 20}])
+
+    def test_torn_last_line(self):
+        iterator = make_iterator(self.path)
+        iterator.log_run(0, 0, {'ior.nprocs': 1}, {'bw': 10})
+        with open(self.path, 'a', encoding='utf-8') as fp:
+            fp.write('{"iter": 0, "rep": 1, "conf": {"ior.npr')
+        resumed = make_iterator(self.path)
+        self.assertEqual(resumed.load_ledger(), 1)
+        self.assertEqual(resumed.pending_reps({'ior.nprocs': 1}), [1])
+        # The next record is not glued to the torn one
+        resumed.log_run(0, 1, {'ior.nprocs': 1}, {'bw': 12})
+        self.assertEqual([record['rep'] for record in self.read()], [0, 1])
+        self.assertEqual(make_iterator(self.path).load_ledger(), 2)
+
+    def test_resume_search(self):
+        # A resumed random search evaluates the points of the original
+        points = []
+        for _ in range(2):
+            ppl = make_pipeline(self.tmp.name,
+                                {'strategy': 'random', 'samples': 5})
+            iterator = PipelineIterator(ppl)
+            self.assertIsNotNone(ppl.config['iterator']['search']['seed'])
+            conf = iterator.begin()
+            run = []
+            while conf is not None:
+                run.append(dict(iterator.linear_conf_dict))
+                conf = iterator.next()
+            points.append(run)
+        self.assertEqual(len(points[0]), 5)
+        self.assertEqual(points[0], points[1])
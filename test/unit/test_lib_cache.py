@@ -0,0 +1,52 @@
+"""
+Test the library location cache
+"""
+from jarvis_cd.basic.lib_cache import LibraryCache, compiler_key
+from unittest import TestCase
+import tempfile
+import os
+
+
+class TestLibraryCache(TestCase):
+    """
+    Test LibraryCache
+    """
+    def test_invalidate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            lib_dir = os.path.join(tmp, 'lib')
+            os.makedirs(lib_dir)
+            lib_path = os.path.join(lib_dir, 'libfoo.so')
+            with open(lib_path, 'w', encoding='utf-8') as fp:
+                fp.write('')
+            inputs = {'env': {'LD_LIBRARY_PATH': lib_dir}}
+            cache_path = os.path.join(tmp, 'lib_cache.yaml')
+            LibraryCache(cache_path).put('foo', inputs, lib_path, [lib_dir])
+
+            cache = LibraryCache(cache_path)
+            self.assertEqual(cache.get('foo', inputs), lib_path)
+            self.assertIsNone(cache.get('foo', {'env': {}}))
+            self.assertIsNone(cache.get('bar', inputs))
+
+            # Modifying a searched directory invalidates the result
+            os.utime(lib_dir, ns=(0, 0))
+            self.assertIsNone(cache.get('foo', inputs))
+
+    def test_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'lib_cache.yaml')
+            with open(cache_path, 'w', encoding='utf-8') as fp:
+                fp.write('{: [')
+            self.assertEqual(LibraryCache(cache_path).load(), {})
+
+    def test_compiler_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(compiler_key(tmp))
+            cc = os.path.join(tmp, 'cc')
+            with open(cc, 'w', encoding='utf-8') as fp:
+                fp.write('#!/bin/sh\n')
+            os.chmod(cc, 0o755)
+            key = compiler_key(tmp)
+            self.assertEqual(key[0], os.path.realpath(cc))
+            # Replacing the compiler changes the key
+            os.utime(cc, ns=(0, 0))
+            self.assertNotEqual(compiler_key(tmp), key)
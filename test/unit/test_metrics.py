@@ -0,0 +1,100 @@
+"""
+Test metric extraction
+"""
+from jarvis_cd.basic.metrics import ior_parser, fio_parser, ycsb_parser, \
+    redis_benchmark_parser, filebench_parser, convert
+from unittest import TestCase
+import tempfile
+import json
+import os
+
+IOR_OUTPUT = """
+access    bw(MiB/s)  IOPS       Latency(s)  block(KiB) xfer(KiB)  open(s)    wr/rd(s)   close(s)   total(s)   iter
+------    ---------  ----       ----------  ---------- ---------  --------   --------   --------   --------   ----
+write     2497.33    40014      0.000025    1024.00    64.00      0.000283   0.409420   0.000083   0.410059   0
+
+Summary of all tests:
+Operation   Max(MiB)   Min(MiB)  Mean(MiB)     StdDev   Max(OPs)   Min(OPs)  Mean(OPs)     StdDev    Mean(s) Stonewall(s) Stonewall(MiB) Test# #Tasks tPN reps fPP reord reordoff reordrand seed segcnt   blksiz    xsize aggs(MiB)   API RefNum
+write        2600.00    2400.00    2500.00     100.00   41600.00   38400.00   40000.00    1600.00    0.40960         NA            NA     0      4   4    2   0     0        1         0    0      1  1048576    65536    1024.0 POSIX      0
+read         5000.00    5000.00    5000.00       0.00   80000.00   80000.00   80000.00       0.00    0.20480         NA            NA     0      4   4    2   0     0        1         0    0      1  1048576    65536    1024.0 POSIX      0
+"""
+
+
+class TestMetrics(TestCase):
+    """
+    Test the builtin metric parsers
+    """
+    def test_ior(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'ior.out')
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write(IOR_OUTPUT)
+            stats = ior_parser().parse_file(path).results()
+        self.assertEqual(stats['write_bw'], 2500.0)
+        self.assertEqual(stats['write_bw_max'], 2600.0)
+        self.assertEqual(stats['write_iops'], 40000.0)
+        self.assertEqual(stats['read_bw'], 5000.0)
+        self.assertAlmostEqual(stats['read_time'], 0.2048)
+
+    def test_fio(self):
+        job = {'read': {'bw': 2048, 'iops': 512.5,
+                        'lat_ns': {'mean': 4000.0},
+                        'clat_ns': {'percentile': {'99.000000': 9000}}},
+               'write': {'bw': 0, 'iops': 0, 'lat_ns': {'mean': 0}}}
+        doc = json.dumps({'jobs': [job, job]})
+        stats = fio_parser().parse_lines([doc]).results()
+        self.assertEqual(stats['read_bw'], 4.0)
+        self.assertEqual(stats['read_iops'], 1025.0)
+        self.assertEqual(stats['read_lat'], 4.0)
+        self.assertEqual(stats['read_lat_p99'], 9.0)
+        self.assertNotIn('write_lat_p99', stats)
+
+    def test_ycsb(self):
+        stats = ycsb_parser().parse_lines([
+            '[OVERALL], RunTime(ms), 1500',
+            '[OVERALL], Throughput(ops/sec), 6666.67',
+            '[READ], AverageLatency(us), 120.5',
+        ]).results()
+        # The run time is measured by jarvis instead
+        self.assertNotIn('runtime', stats)
+        self.assertEqual(stats['throughput'], 6666.67)
+        self.assertEqual(stats['read_lat'], 120.5)
+        stats = ycsb_parser().parse_lines([
+            'READ: Count=1000, Max=90.00, Min=2.00, Avg=10.50, 90=20, '
+            '99=40, 99.9=80',
+            'Run throughput(ops/sec): 12345.6',
+        ]).results()
+        self.assertEqual(stats['throughput'], 12345.6)
+        self.assertEqual(stats['read_lat'], 10.5)
+        self.assertEqual(stats['read_lat_p99'], 40.0)
+        self.assertIsInstance(stats['throughput'], float)
+
+    def test_redis_benchmark(self):
+        stats = redis_benchmark_parser().parse_lines([
+            '"test","rps","avg_latency_ms","min_latency_ms",'
+            '"p50_latency_ms","p95_latency_ms","p99_latency_ms",'
+            '"max_latency_ms"',
+            '"SET","100000.00","0.250","0.100","0.200","0.400","0.500","1.0"',
+            '"GET","120000.00","0.200","0.100","0.200","0.300","0.400","0.9"',
+        ]).results()
+        self.assertEqual(stats['set_throughput'], 100000.0)
+        self.assertEqual(stats['set_lat'], 250.0)
+        self.assertEqual(stats['get_lat_p99'], 400.0)
+
+    def test_filebench(self):
+        parser = filebench_parser()
+        for host in range(2):
+            parser.parse_lines([
+                '60.001: IO Summary: 5436 ops 90.599 ops/s 17/35 rd/wr '
+                '5.6mb/s 1.104ms/op',
+            ])
+        stats = parser.results()
+        self.assertAlmostEqual(stats['throughput'], 181.198)
+        self.assertAlmostEqual(stats['bw'], 11.2)
+        self.assertAlmostEqual(stats['lat'], 1104.0)
+
+    def test_convert(self):
+        self.assertEqual(convert(1024, 'KiB/s', 'MiB/s'), 1.0)
+        self.assertEqual(convert(2, 'ms', 'us'), 2000.0)
+        with self.assertRaises(Exception):
+            convert(1, 'MiB/s', 'us')
@@ -0,0 +1,78 @@
+"""
+Test the dependency-aware pipeline scheduler
+"""
+from jarvis_cd.basic.pipeline_graph import PipelineGraph, implicit_deps, \
+    merge_envs
+from unittest import TestCase
+import threading
+import time
+
+
+class TestPipelineGraph(TestCase):
+    """
+    Test PipelineGraph
+    """
+    def run_graph(self, ids, deps, reverse=False, delay=0):
+        order = []
+        lock = threading.Lock()
+
+        def fn(node_id):
+            time.sleep(delay)
+            with lock:
+                order.append(node_id)
+        graph = PipelineGraph(ids, deps, get_id=lambda node_id: node_id)
+        graph.run(fn, reverse=reverse)
+        return order
+
+    def test_dependency_order(self):
+        deps = {'ior': ['hermes', 'redis'], 'hermes': ['redis']}
+        ids = ['redis', 'hermes', 'ior']
+        order = self.run_graph(ids, deps)
+        self.assertEqual(order, ['redis', 'hermes', 'ior'])
+        order = self.run_graph(ids, deps, reverse=True)
+        self.assertEqual(order, ['ior', 'hermes', 'redis'])
+
+    def test_parallel(self):
+        ids = ['redis', 'pymonitor', 'spark_cluster']
+        start = time.time()
+        self.run_graph(ids, {'spark_cluster': []}, delay=.5)
+        self.assertLess(time.time() - start, 1.25)
+
+    def test_cycle(self):
+        deps = {'a': ['b'], 'b': ['a']}
+        with self.assertRaises(Exception):
+            PipelineGraph(['a', 'b'], deps, get_id=lambda node_id: node_id)
+
+    def test_error(self):
+        def fn(node_id):
+            if node_id == 'a':
+                raise RuntimeError('failed')
+        graph = PipelineGraph(['a', 'b'], {'b': ['a']},
+                              get_id=lambda node_id: node_id)
+        with self.assertRaises(RuntimeError):
+            graph.run(fn)
+
+    def test_implicit_deps(self):
+        # Declaring one dependency keeps the list order of the others
+        ids = ['redis', 'hermes_run', 'hermes_client', 'ior']
+        deps = implicit_deps(ids, {'ior': ['redis']})
+        self.assertEqual(deps, {'hermes_run': ['redis'],
+                                'hermes_client': ['hermes_run'],
+                                'ior': ['redis']})
+        order = self.run_graph(ids, deps, delay=.1)
+        self.assertLess(order.index('hermes_run'),
+                        order.index('hermes_client'))
+        # An empty list means no dependencies
+        self.assertEqual(implicit_deps(ids, {'hermes_run': []}),
+                         {'hermes_run': [], 'hermes_client': ['hermes_run'],
+                          'ior': ['hermes_client']})
+
+    def test_merge_envs(self):
+        env = {'PATH': '/bin', 'OLD': '1'}
+        base = dict(env)
+        first = dict(base, HERMES_CONF='/a', SHARED='first')
+        second = dict(base, ORANGEFS_CONF='/b', SHARED='second')
+        del second['OLD']
+        merge_envs(env, base, [first, second])
+        self.assertEqual(env, {'PATH': '/bin', 'HERMES_CONF': '/a',
+                               'ORANGEFS_CONF': '/b', 'SHARED': 'second'})
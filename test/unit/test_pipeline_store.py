@@ -0,0 +1,46 @@
+"""
+Test the compact pipeline state store
+"""
+from jarvis_cd.basic.pipeline_store import PipelineStore
+from unittest import TestCase
+import tempfile
+import json
+import os
+
+
+class TestPipelineStore(TestCase):
+    """
+    Test PipelineStore
+    """
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as config_dir:
+            self.assertIsNone(PipelineStore.open(config_dir))
+            store = PipelineStore(PipelineStore.get_path(config_dir))
+            store.set_env({'PATH': '/usr/bin'})
+            store.put('ppl', {'sub_pkgs': [['ior', 'ior']]})
+            store.put('ppl.ior', {'nprocs': 4})
+            store.save()
+            self.assertFalse(store.dirty)
+            self.assertFalse(os.path.exists(f'{store.path}.tmp'))
+
+            # The state is plain JSON
+            with open(store.path, 'r', encoding='utf-8') as fp:
+                self.assertEqual(json.load(fp)['pkgs']['ppl.ior'],
+                                 {'nprocs': 4})
+            store = PipelineStore.open(config_dir)
+            self.assertEqual(store.env, {'PATH': '/usr/bin'})
+            self.assertEqual(store.get('ppl.ior'), {'nprocs': 4})
+
+            # Saving without changes does not rewrite the file
+            mtime = os.path.getmtime(store.path)
+            os.utime(store.path, (mtime - 10, mtime - 10))
+            store.save()
+            self.assertEqual(os.path.getmtime(store.path), mtime - 10)
+
+    def test_drop(self):
+        store = PipelineStore('state.json')
+        store.put('ppl', {})
+        store.put('ppl.ior', {})
+        store.put('ppl.ior2', {})
+        store.drop('ppl.ior')
+        self.assertEqual(sorted(store.pkgs), ['ppl', 'ppl.ior2'])
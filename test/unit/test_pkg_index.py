@@ -0,0 +1,65 @@
+"""
+Test the pkg index
+"""
+from jarvis_cd.basic.pkg_index import PkgIndex
+from unittest import TestCase, mock
+import tempfile
+import os
+import time
+
+
+class TestPkgIndex(TestCase):
+    """
+    Test PkgIndex
+    """
+    def make_pkg(self, repo, pkg_type):
+        pkg_dir = os.path.join(repo['path'], repo['name'], pkg_type)
+        os.makedirs(pkg_dir, exist_ok=True)
+        with open(os.path.join(pkg_dir, 'pkg.py'), 'w',
+                  encoding='utf-8') as fp:
+            fp.write('')
+
+    def test_find(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            repos = [
+                {'name': 'repo_a', 'path': os.path.join(tmp, 'a')},
+                {'name': 'repo_b', 'path': os.path.join(tmp, 'b')},
+            ]
+            self.make_pkg(repos[0], 'ior')
+            self.make_pkg(repos[1], 'ior')
+            self.make_pkg(repos[1], 'redis')
+            index_path = os.path.join(tmp, 'pkg_index.yaml')
+            index = PkgIndex(index_path).build(repos)
+            self.assertTrue(os.path.exists(index_path))
+            repo, entry = index.find('ior', repos)
+            self.assertEqual(repo['name'], 'repo_a')
+            self.assertEqual(entry['module'], 'repo_a.ior.pkg')
+            self.assertEqual(entry['class'], 'Ior')
+            self.assertEqual(index.list_pkgs(repos[1], repos),
+                             ['ior', 'redis'])
+            self.assertIsNone(index.find('fio', repos))
+
+            # A pkg added to a repo is found by a new process
+            time.sleep(.01)
+            self.make_pkg(repos[1], 'fio')
+            os.utime(os.path.join(repos[1]['path'], repos[1]['name']))
+            repo, entry = PkgIndex(index_path).find('fio', repos)
+            self.assertEqual(repo['name'], 'repo_b')
+
+    def test_get_class_fallback(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            repos = [
+                {'name': 'repo_a', 'path': os.path.join(tmp, 'a')},
+                {'name': 'repo_b', 'path': os.path.join(tmp, 'b')},
+            ]
+            self.make_pkg(repos[0], 'ior')
+            self.make_pkg(repos[1], 'ior')
+            index = PkgIndex(os.path.join(tmp, 'pkg_index.yaml'))
+            classes = {'repo_b.ior.pkg': object}
+            # repo_a's ior fails to import, so repo_b's is used
+            with mock.patch('jarvis_cd.basic.pkg_index.load_class',
+                            side_effect=lambda module, path, cls:
+                            classes.get(module)) as load:
+                self.assertIs(index.get_class('ior', repos), object)
+                self.assertEqual(load.call_count, 2)
+                self.assertIsNone(index.get_class('fio', repos))
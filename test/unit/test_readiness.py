@@ -0,0 +1,74 @@
+"""
+Test the readiness probes
+"""
+from jarvis_cd.basic.readiness import ReadinessProbe, TcpProbe, FileProbe, \
+    LogProbe, wait_ready
+from unittest import TestCase
+import tempfile
+import socket
+import time
+import os
+
+
+class CountProbe(ReadinessProbe):
+    """
+    Ready after a number of checks
+    """
+    def __init__(self, ready_after):
+        self.ready_after = ready_after
+        self.checks = 0
+
+    def check(self):
+        self.checks += 1
+        return self.checks >= self.ready_after
+
+
+class TestReadiness(TestCase):
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            ReadinessProbe()
+
+    def test_tcp(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        self.assertFalse(TcpProbe('127.0.0.1', port).check())
+        server.listen(1)
+        self.assertTrue(TcpProbe('127.0.0.1', port).check())
+        server.close()
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            probe = FileProbe(f'{tmp}/*.log')
+            self.assertFalse(probe.check())
+            path = f'{tmp}/0.log'
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write('old')
+            self.assertTrue(probe.check())
+            # A file left by a previous run is not ready
+            os.utime(path, (time.time() - 60, time.time() - 60))
+            probe = FileProbe(f'{tmp}/*.log', since=time.time())
+            self.assertFalse(probe.check())
+            os.utime(path)
+            self.assertTrue(probe.check())
+
+    def test_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f'{tmp}/server.log'
+            probe = LogProbe(path, 'listening on [0-9]+')
+            self.assertFalse(probe.check())
+            with open(path, 'w', encoding='utf-8') as fp:
+                fp.write('starting\nlisten')
+            self.assertFalse(probe.check())
+            with open(path, 'a', encoding='utf-8') as fp:
+                fp.write('ing on 8080\n')
+            self.assertTrue(probe.check())
+
+    def test_wait_ready(self):
+        probes = [CountProbe(1), CountProbe(3)]
+        wait_ready(probes, timeout=5, interval=.001)
+        # Probes which succeeded are not checked again
+        self.assertEqual(probes[0].checks, 1)
+        self.assertEqual(probes[1].checks, 3)
+        with self.assertRaises(Exception):
+            wait_ready(CountProbe(10 ** 6), timeout=.05, interval=.01)
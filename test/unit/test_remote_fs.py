@@ -0,0 +1,60 @@
+"""
+Test batching remote mkdir/rm operations
+"""
+from jarvis_cd.basic.remote_fs import RemoteFsPlan
+from unittest import TestCase, mock
+
+
+class FakeNode:
+    def __init__(self, exit_code):
+        self.exit_code = exit_code
+
+
+class TestRemoteFs(TestCase):
+    def setUp(self):
+        self.cmds = []
+        self.exit_code = 0
+        patcher = mock.patch('jarvis_cd.basic.remote_fs.Exec',
+                             side_effect=self.exec)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def exec(self, cmd, exec_info):
+        self.cmds.append((cmd, sorted(exec_info.hostfile.hosts)))
+        return FakeNode(self.exit_code)
+
+    def test_batch(self):
+        plan = RemoteFsPlan()
+        with plan.batch():
+            plan.mkdir(['/a', '/b'], ['n0', 'n1'])
+            plan.mkdir('/c', ['n1'])
+            plan.rm('/d/*', ['n0', 'n1'])
+        # Hosts with the same work share one command
+        self.assertEqual(sorted(self.cmds), [
+            ('mkdir -p /a /b && rm -rf /d/*', ['n0']),
+            ('mkdir -p /a /b /c && rm -rf /d/*', ['n1']),
+        ])
+
+    def test_session_dedupe(self):
+        plan = RemoteFsPlan()
+        plan.mkdir('/a', ['n0'])
+        plan.mkdir('/a', ['n0', 'n1'])
+        self.assertEqual(self.cmds, [('mkdir -p /a', ['n0']),
+                                     ('mkdir -p /a', ['n1'])])
+        # A removed directory is created again
+        plan.rm('/a', ['n0'])
+        plan.mkdir('/a', ['n0'])
+        self.assertEqual(self.cmds[-1], ('mkdir -p /a', ['n0']))
+        # A failed mkdir is not remembered
+        self.exit_code = 1
+        plan.mkdir('/b', ['n0'])
+        self.exit_code = 0
+        plan.mkdir('/b', ['n0'])
+        self.assertEqual(self.cmds[-2:], [('mkdir -p /b', ['n0'])] * 2)
+
+    def test_new_session(self):
+        # Directories may be removed outside of jarvis between sessions,
+        # so a new plan creates them again
+        RemoteFsPlan().mkdir('/a', ['n0'])
+        RemoteFsPlan().mkdir('/a', ['n0'])
+        self.assertEqual(len(self.cmds), 2)
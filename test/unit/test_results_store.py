@@ -0,0 +1,64 @@
+"""
+Test the columnar results store
+"""
+from jarvis_cd.basic.results_store import ResultsStore, summarize
+from unittest import TestCase
+import tempfile
+import os
+
+
+class TestResultsStore(TestCase):
+    """
+    Test ResultsStore
+    """
+    def test_append_aggregate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ResultsStore(os.path.join(tmp, 'results'),
+                                 use_arrow=False)
+            for nprocs in [1, 2]:
+                for rep in range(3):
+                    store.append([{'ior.nprocs': nprocs,
+                                   'ior.write_bw': 100.0 * nprocs + rep}],
+                                 f'{nprocs:06d}-{rep:03d}')
+            # A metric which only some runs report
+            store.append([{'ior.nprocs': 2, 'ior.write_bw': 205,
+                           'ior.read_bw': 1.5}], '000002-003')
+            self.assertEqual(store.load_schema()['ior.write_bw'], 'float')
+
+            store = ResultsStore(os.path.join(tmp, 'results'),
+                                 use_arrow=False)
+            rows = store.aggregate(['ior.nprocs'], ['ior.write_bw'],
+                                   stats=['mean', 'count', 'p50'])
+            rows = {row['ior.nprocs']: row for row in rows}
+            self.assertEqual(rows[1]['ior.write_bw.mean'], 101.0)
+            self.assertEqual(rows[2]['ior.write_bw.count'], 4)
+            self.assertEqual(rows[2]['ior.write_bw.p50'], 201.5)
+            data = store.read(['ior.read_bw'], where={'ior.nprocs': 2})
+            self.assertEqual(data['ior.read_bw'], [None, None, None, 1.5])
+
+            store.compact()
+            self.assertEqual(len(store.partitions()), 1)
+            csv_path = os.path.join(tmp, 'stats_dict.csv')
+            store.to_csv(csv_path)
+            with open(csv_path, encoding='utf-8') as fp:
+                lines = fp.read().splitlines()
+            self.assertEqual(lines[0], 'ior.nprocs,ior.write_bw,ior.read_bw')
+            self.assertEqual(len(lines), 8)
+
+    def test_compact_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = ResultsStore(os.path.join(tmp, 'results'),
+                                 use_arrow=False)
+            for i in range(2):
+                store.append([{'i': i}], f'{i:06d}-000')
+            store.compact()
+            # Runs resumed after a compaction are read after the merged ones
+            store.append([{'i': 2, 'bw': 1.5}], '000002-000')
+            self.assertEqual(store.read_rows(),
+                             [{'i': 0}, {'i': 1}, {'i': 2, 'bw': 1.5}])
+
+    def test_summarize(self):
+        self.assertEqual(summarize([1, 2, 3, 4], 'median'), 2.5)
+        self.assertEqual(summarize([1, None, 3], 'mean'), 2)
+        self.assertEqual(summarize([5], 'std'), 0.0)
+        self.assertEqual(summarize(list(range(101)), 'p99'), 99)
@@ -0,0 +1,112 @@
+"""
+Test building the resource graph incrementally
+"""
+from jarvis_cd.basic.rg_build import ResourceGraphHosts, build_incremental, \
+    host_row_names
+from unittest import TestCase, mock
+import tempfile
+import threading
+import os
+
+
+class Frame:
+    def __init__(self, rows):
+        self.rows = rows
+
+
+class FakeResourceGraph:
+    def __init__(self, fs_rows=None, net_rows=None):
+        self.fs = Frame(fs_rows or [])
+        self.net = Frame(net_rows or [])
+
+
+class TestResourceGraphBuild(TestCase):
+    """
+    Test build_incremental
+    """
+    def setUp(self):
+        self.introspected = []
+        self.peers = set()
+        self.down = set()
+        self.lock = threading.Lock()
+
+    def introspect(self, host, net_sleep, peer=None):
+        with self.lock:
+            self.introspected.append(host)
+            self.peers.add(peer)
+        if host in self.down:
+            raise Exception(f'{host} is down')
+        fs_rows = [{'host': host, 'dev_type': 'ssd', 'mount': f'/{host}'}]
+        if peer is not None:
+            fs_rows.append({'host': peer, 'dev_type': 'ssd',
+                            'mount': f'/{peer}'})
+        return FakeResourceGraph(fs_rows,
+                                 [{'provider': 'tcp', 'domain': 'eth0'}])
+
+    def test_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'resource_graph_hosts.yaml')
+            rg = FakeResourceGraph()
+            ledger = ResourceGraphHosts(path)
+            hosts = [f'node{i}' for i in range(64)]
+            build_incremental(rg, ledger, hosts, 0, max_workers=8,
+                              introspect=self.introspect)
+            self.assertEqual(sorted(self.introspected), sorted(hosts))
+            # The networks of the first host are tested against nothing.
+            # The others are tested against the first host, whose rows
+            # are not duplicated.
+            self.assertEqual(self.peers, {None, 'node0'})
+            self.assertEqual(len(rg.fs.rows), 64)
+            self.assertEqual(len(rg.net.rows), 1)
+            ledger.save()
+
+            # Only the new hosts are introspected
+            self.introspected = []
+            ledger = ResourceGraphHosts(path)
+            hosts += [f'node{i}' for i in range(64, 72)]
+            self.peers = set()
+            built, failed = build_incremental(rg, ledger, hosts, 0,
+                                              introspect=self.introspect)
+            self.assertEqual(built, hosts[64:])
+            self.assertEqual(failed, {})
+            self.assertEqual(self.peers, {'node0'})
+            self.assertEqual(sorted(self.introspected), sorted(hosts[64:]))
+            self.assertEqual(len(rg.fs.rows), 72)
+
+            # Stale hosts replace their previous rows
+            self.introspected = []
+            built, _ = build_incremental(rg, ledger, hosts, 0, ttl=-1,
+                                         introspect=self.introspect)
+            self.assertEqual(len(built), 72)
+            self.assertEqual(len(rg.fs.rows), 72)
+            self.assertEqual(len(rg.net.rows), 1)
+
+    def test_failed_host(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = ResourceGraphHosts(os.path.join(tmp, 'hosts.yaml'))
+            rg = FakeResourceGraph()
+            hosts = ['node0', 'node1', 'node2']
+            self.down = {'node1'}
+            built, failed = build_incremental(rg, ledger, hosts, 0,
+                                              introspect=self.introspect)
+            # The other hosts are merged
+            self.assertEqual(built, ['node0', 'node2'])
+            self.assertEqual(list(failed), ['node1'])
+            self.assertEqual(len(rg.fs.rows), 2)
+            self.assertEqual(ledger.stale(hosts), ['node1'])
+
+    def test_host_row_names(self):
+        rg = FakeResourceGraph([{'host': 'node0'}, {'host': 'node1.hpc'},
+                                {'host': '10.0.0.2'}, {'host': 'other'}],
+                               [{'host': None}])
+        ips = {'node1': '10.0.0.1', 'node1.hpc': '10.0.0.1',
+               'node0': '10.0.0.0', '10.0.0.2': '10.0.0.2'}
+
+        def resolve(name):
+            if name not in ips:
+                raise OSError(f'Unknown host: {name}')
+            return ips[name]
+        with mock.patch('socket.gethostbyname', side_effect=resolve):
+            names = host_row_names(rg, ['node0', 'node1'])
+        self.assertEqual(names, {'node0': {'node0'},
+                                 'node1': {'node1', 'node1.hpc'}})
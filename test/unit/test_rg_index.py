@@ -0,0 +1,111 @@
+"""
+Test the resource graph index
+"""
+from jarvis_cd.basic.rg_index import ResourceGraphIndex
+from unittest import TestCase
+
+
+class Frame:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class FakeResourceGraph:
+    """
+    Filters rows the way ResourceGraph.find_storage does
+    """
+    def __init__(self, rows):
+        self.fs = Frame(rows)
+        self.net = None
+        # Shared with the copies made by the index
+        self.scanned = [0]
+
+    def find_storage(self, dev_types=None, shared=None, needs_root=None):
+        self.scanned[0] += len(self.fs.rows)
+        if isinstance(dev_types, str):
+            dev_types = [dev_types]
+        return Frame([row for row in self.fs.rows
+                      if (dev_types is None or row['dev_type'] in dev_types)
+                      and (shared is None or row['shared'] == shared)
+                      and (needs_root is None or
+                           row['needs_root'] == needs_root)])
+
+
+class FakeNetGraph:
+    """
+    Filters rows the way ResourceGraph.find_net_info does
+    """
+    def __init__(self, rows):
+        self.net = Frame(rows)
+        self.scanned = [0]
+
+    def find_net_info(self, hostfile=None, shared=None):
+        self.scanned[0] += len(self.net.rows)
+        return Frame([row for row in self.net.rows
+                      if hostfile is None or row['host'] is None or
+                      row['host'] in hostfile.hosts])
+
+
+class Hostfile:
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.path = None
+
+
+class TestResourceGraphIndex(TestCase):
+    """
+    Test ResourceGraphIndex
+    """
+    def setUp(self):
+        self.rows = []
+        for host in ['a', 'b', 'c']:
+            for dev_type in ['hdd', 'ssd', 'nvme']:
+                for shared in [True, False]:
+                    self.rows.append({'host': host, 'dev_type': dev_type,
+                                      'shared': shared, 'needs_root': False,
+                                      'mount': f'/{host}/{dev_type}'})
+        self.rg = FakeResourceGraph(self.rows)
+        self.index = ResourceGraphIndex(self.rg)
+
+    def test_find_storage(self):
+        for dev_types in [None, 'ssd', ['hdd', 'nvme'], ['dimm']]:
+            for shared in [None, True, False]:
+                expected = FakeResourceGraph(self.rows).find_storage(
+                    dev_types=dev_types, shared=shared, needs_root=False)
+                found = self.index.find_storage(
+                    dev_types=dev_types, shared=shared, needs_root=False)
+                self.assertEqual(found.rows, expected.rows)
+
+    def test_narrow_and_cache(self):
+        found = self.index.find_storage(dev_types=['ssd'], shared=False)
+        self.assertEqual(len(found), 3)
+        self.assertEqual(self.rg.scanned[0], 3)
+        self.assertIs(self.index.find_storage(dev_types=['ssd'],
+                                              shared=False), found)
+        self.assertEqual(self.rg.scanned[0], 3)
+        self.assertEqual(len(self.index.find_storage(dev_types=['dimm'])), 0)
+        self.assertEqual(self.rg.scanned[0], 3)
+
+    def test_hosts(self):
+        found = self.index.find_storage(dev_types='nvme', hosts=['b', 'c'])
+        self.assertEqual([row['host'] for row in found.rows],
+                         ['b', 'b', 'c', 'c'])
+
+    def test_net_hosts(self):
+        rows = [{'host': host, 'provider': 'tcp', 'domain': 'eth0'}
+                for host in ['a', 'b', 'c', 'd']]
+        rows.append({'host': None, 'provider': 'verbs', 'domain': 'ib0'})
+        rg = FakeNetGraph(rows)
+        index = ResourceGraphIndex(rg)
+        # Only the rows of the hosts are scanned
+        found = index.find_net_info(Hostfile(['b', 'c']))
+        self.assertEqual(found.rows, FakeNetGraph(rows).find_net_info(
+            Hostfile(['b', 'c'])).rows)
+        self.assertEqual(rg.scanned[0], 3)
+        # A host named differently in the graph is not filtered
+        index.find_net_info(Hostfile(['b', '10.0.0.1']))
+        self.assertEqual(rg.scanned[0], 3 + len(rows))
+        self.assertEqual(len(index.find_net_info().rows), len(rows))
@@ -0,0 +1,93 @@
+"""
+Test the search strategies of the pipeline iterator
+"""
+from jarvis_cd.basic.search import make_search, derive_seed, \
+    SearchStrategy
+from unittest import TestCase
+
+
+def score(pos, budget=0):
+    return -(pos[0] - 7) ** 2 - (pos[1] - 3) ** 2 + budget
+
+
+class TestSearch(TestCase):
+    """
+    Test the search strategies
+    """
+    def run_search(self, search, budget_var=None):
+        trials = []
+        trial = search.ask()
+        while trial is not None:
+            trials.append(trial)
+            pos, extra = trial
+            search.tell(trial, score(pos, extra.get(budget_var, 0)))
+            trial = search.ask()
+        return trials
+
+    def test_grid(self):
+        self.assertIsNone(make_search([3, 3], {}))
+
+    def test_sampling(self):
+        # The space is far too large to materialize
+        dims = [1000] * 6
+        for strategy in ['random', 'lhs']:
+            search = make_search(dims, {'strategy': strategy,
+                                        'samples': 20, 'seed': 0})
+            trials = self.run_search(search)
+            self.assertEqual(len(trials), 20)
+            self.assertEqual(len({pos for pos, _ in trials}), 20)
+        # Latin hypercube samples each stratum of each dimension once
+        search = make_search([20, 20], {'strategy': 'lhs', 'samples': 20,
+                                        'seed': 0})
+        trials = self.run_search(search)
+        self.assertEqual(sorted(pos[0] for pos, _ in trials), list(range(20)))
+
+    def test_hyperband(self):
+        search = make_search([10, 10], {'strategy': 'hyperband',
+                                        'metric': 'score',
+                                        'budget': 'app.steps',
+                                        'min_budget': 1, 'max_budget': 9,
+                                        'seed': 0})
+        trials = self.run_search(search, 'app.steps')
+        self.assertEqual(len(trials), search.max_trials())
+        budgets = [extra['app.steps'] for _, extra in trials]
+        self.assertEqual(budgets.count(9), 1 + 1 + 3)
+        search = make_search([10, 10], {'strategy': 'halving',
+                                        'metric': 'score',
+                                        'budget': 'app.steps',
+                                        'min_budget': 1, 'max_budget': 9})
+        self.assertEqual(len(self.run_search(search, 'app.steps')), 13)
+
+    def test_bayes(self):
+        search = make_search([10, 10], {'strategy': 'bayes',
+                                        'metric': 'score', 'samples': 15,
+                                        'init_samples': 5, 'seed': 0})
+        trials = self.run_search(search)
+        self.assertEqual(len(trials), 15)
+        self.assertGreaterEqual(search.best()[1], -2)
+        with self.assertRaises(Exception):
+            make_search([10], {'strategy': 'bayes'})
+
+    def test_resume(self):
+        # A resumed sweep derives the same seed, so it draws the same points
+        configs = [
+            {'strategy': 'random', 'samples': 10},
+            {'strategy': 'lhs', 'samples': 10},
+            {'strategy': 'hyperband', 'metric': 'score',
+             'budget': 'app.steps', 'min_budget': 1, 'max_budget': 9},
+        ]
+        for config in configs:
+            iter_config = {'loop': [['app.x'], ['app.y']], 'search': config}
+            seed = derive_seed(iter_config)
+            self.assertEqual(seed, derive_seed(dict(iter_config)))
+            runs = [self.run_search(make_search([100, 100],
+                                                {**config, 'seed': seed}),
+                                    'app.steps')
+                    for _ in range(2)]
+            self.assertEqual(runs[0], runs[1], config['strategy'])
+        self.assertNotEqual(derive_seed({'search': configs[0]}),
+                            derive_seed({'search': configs[1]}))
+
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            SearchStrategy([10])
@@ -0,0 +1,61 @@
+"""
+Test the ssh connection pool
+"""
+from jarvis_cd.basic.ssh_pool import SshPool, pool_root, strip_pool_path
+from jarvis_cd.basic.runtime_dir import secure_dir
+from unittest import TestCase, mock
+import tempfile
+import shutil
+import stat
+import os
+
+
+class TestSshPool(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.root = os.path.join(self.tmp, 'jarvis-ssh')
+
+    def test_pool_root(self):
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': '/run/user/1'}):
+            self.assertEqual(pool_root('/private'), '/run/user/1/jarvis-ssh')
+        with mock.patch.dict(os.environ, {'XDG_RUNTIME_DIR': ''}):
+            self.assertEqual(pool_root('/private'), '/private/jarvis-ssh')
+
+    def test_secure_dir(self):
+        secure_dir(self.root)
+        self.assertEqual(stat.S_IMODE(os.stat(self.root).st_mode), 0o700)
+        # A directory others can write to is rejected
+        os.chmod(self.root, 0o777)
+        with self.assertRaises(Exception):
+            secure_dir(self.root)
+        # So is a symlink to another directory
+        os.rmdir(self.root)
+        other = os.path.join(self.tmp, 'other')
+        os.mkdir(other, 0o700)
+        os.symlink(other, self.root)
+        with self.assertRaises(Exception):
+            secure_dir(self.root)
+
+    def test_activate(self):
+        if shutil.which('ssh') is None:
+            self.skipTest('ssh is not installed')
+        # The private dir containing the root does not exist yet
+        self.root = os.path.join(self.tmp, 'private', 'jarvis-ssh')
+        pool = SshPool('/config/ppl', 60, self.root)
+        path = os.environ.get('PATH')
+        env = {'PATH': '/usr/bin:/bin'}
+        self.assertTrue(pool.activate([env, None]))
+        # Only the given environments are routed through the pool
+        self.assertEqual(env['PATH'], f'{pool.bin_dir}:/usr/bin:/bin')
+        self.assertEqual(os.environ.get('PATH'), path)
+        self.assertEqual(strip_pool_path(env['PATH']), '/usr/bin:/bin')
+        for dir_path in [self.root, pool.pool_dir, pool.bin_dir,
+                         pool.sock_dir]:
+            mode = stat.S_IMODE(os.stat(dir_path).st_mode)
+            self.assertEqual(mode, 0o700, dir_path)
+        with open(os.path.join(pool.bin_dir, 'ssh'), 'r',
+                  encoding='utf-8') as fp:
+            self.assertIn(f'ControlPath={pool.sock_dir}/%C', fp.read())
+        pool.deactivate([env, None])
+        self.assertEqual(env['PATH'], '/usr/bin:/bin')
@@ -0,0 +1,145 @@
+"""
+Test the partitioning of a parallel sweep into slots
+"""
+from jarvis_cd.basic.sweep import SweepScheduler, SweepSlot, split
+from jarvis_cd.basic.pkg import Service, Application
+from unittest import TestCase, mock
+import tempfile
+import os
+
+
+class Server(Service):
+    _init = _configure_menu = _configure = None
+    start = stop = clean = status = None
+
+
+class Bench(Application):
+    _init = _configure_menu = _configure = None
+    start = stop = clean = status = None
+
+
+def make_pkg(cls, pkg_id):
+    pkg = cls.__new__(cls)
+    pkg.pkg_id = pkg_id
+    return pkg
+
+
+def make_sched(hosts, sub_pkgs):
+    sched = SweepScheduler.__new__(SweepScheduler)
+    sched.jarvis = mock.Mock()
+    sched.jarvis.hostfile.hosts = hosts
+    sched.ppl = mock.Mock()
+    sched.ppl.sub_pkgs = sub_pkgs
+    return sched
+
+
+class FakeIterator:
+    """
+    Iterates over the points x=0..npoints-1, each with one repetition
+    """
+    def __init__(self, npoints):
+        self.npoints = npoints
+        self.stats = []
+
+    def begin(self):
+        self.iter_count = 0
+        self.linear_conf_dict = {'app.x': 0}
+        return self.linear_conf_dict
+
+    def next(self):
+        self.iter_count += 1
+        if self.iter_count == self.npoints:
+            return None
+        self.linear_conf_dict = {'app.x': self.iter_count}
+        return self.linear_conf_dict
+
+    def pending_reps(self):
+        return [0]
+
+    def log_run(self, iter_count, rep, linear_conf_dict, stat_dict):
+        pass
+
+
+def fake_run_point(point):
+    iter_count, linear_conf_dict, reps = point
+    if linear_conf_dict['app.x'] == 3:
+        os._exit(3)
+    return [(iter_count, 0, linear_conf_dict,
+             {'x': linear_conf_dict['app.x'], 'pid': os.getpid()})], 0, []
+
+
+def fail_init_slot(slot, sched):
+    if slot.slot_id == 1:
+        raise Exception('cannot reach the hosts of the slot')
+
+
+def make_run_sched(npoints, nslots, slot_dir):
+    sched = SweepScheduler.__new__(SweepScheduler)
+    sched.ppl = mock.Mock(exit_code=0)
+    sched.iterator = FakeIterator(npoints)
+    sched.nslots = nslots
+    sched.slot_dir = slot_dir
+    sched.slots = [SweepSlot(i, None, None) for i in range(nslots)]
+    return sched
+
+
+class TestSweep(TestCase):
+    def test_split(self):
+        self.assertEqual(split(list(range(7)), 3),
+                         [[0, 1, 2], [3, 4], [5, 6]])
+        self.assertEqual(split(list(range(4)), 4), [[0], [1], [2], [3]])
+
+    def test_partition_hosts(self):
+        hosts = [f'node{i}' for i in range(10)]
+        slots = make_sched(hosts, []).partition(4)
+        # The remainder is distributed instead of dropped
+        self.assertEqual([len(slot.hosts) for slot in slots], [3, 3, 2, 2])
+        self.assertEqual(sum([slot.hosts for slot in slots], []), hosts)
+        with self.assertRaises(Exception):
+            make_sched(hosts, []).partition(11)
+
+    def test_partition_cpus(self):
+        sched = make_sched(['localhost'], [make_pkg(Bench, 'bench')])
+        with mock.patch('os.sched_getaffinity', return_value={0, 1, 2, 3, 4}):
+            slots = sched.partition(2)
+        self.assertEqual([slot.cpus for slot in slots], [[0, 1, 2], [3, 4]])
+
+    def test_partition_cpus_services(self):
+        # Services in CPU slots would share ports on the node
+        sched = make_sched(['localhost'], [make_pkg(Server, 'server'),
+                                           make_pkg(Bench, 'bench')])
+        self.assertEqual(sched.services(), ['server'])
+        with self.assertRaises(Exception):
+            sched.partition(2)
+        # Host slots do not share ports
+        sched.jarvis.hostfile.hosts = ['node0', 'node1']
+        self.assertEqual(len(sched.partition(2)), 2)
+
+    @mock.patch('jarvis_cd.basic.sweep._init_slot')
+    @mock.patch('jarvis_cd.basic.sweep._run_point', fake_run_point)
+    def test_run(self, init_slot):
+        with tempfile.TemporaryDirectory() as tmp:
+            sched = make_run_sched(3, 2, os.path.join(tmp, 'slots'))
+            sched.run()
+            self.assertEqual([stat['x'] for stat in sched.iterator.stats],
+                             [0, 1, 2])
+            self.assertNotIn(os.getpid(),
+                             [stat['pid'] for stat in sched.iterator.stats])
+
+    @mock.patch('jarvis_cd.basic.sweep._init_slot', fail_init_slot)
+    @mock.patch('jarvis_cd.basic.sweep._run_point', fake_run_point)
+    def test_setup_fails(self):
+        # A slot which fails to set up fails the sweep instead of hanging it
+        with tempfile.TemporaryDirectory() as tmp:
+            sched = make_run_sched(3, 2, os.path.join(tmp, 'slots'))
+            with self.assertRaisesRegex(Exception, 'cannot reach the hosts'):
+                sched.run()
+
+    @mock.patch('jarvis_cd.basic.sweep._init_slot')
+    @mock.patch('jarvis_cd.basic.sweep._run_point', fake_run_point)
+    def test_slot_dies(self, init_slot):
+        # So does a slot which dies in the middle of a point
+        with tempfile.TemporaryDirectory() as tmp:
+            sched = make_run_sched(5, 2, os.path.join(tmp, 'slots'))
+            with self.assertRaisesRegex(Exception, 'exited with code 3'):
+                sched.run()
@@ -0,0 +1,32 @@
+"""
+Test the pipeline tracer
+"""
+from jarvis_cd.basic.trace import Tracer
+from unittest import TestCase
+import tempfile
+import json
+import os
+
+
+class TestTrace(TestCase):
+    """
+    Test Tracer
+    """
+    def test_chrome_trace(self):
+        tracer = Tracer('ppl')
+        with tracer.span('iteration 0-0', 'iteration'):
+            with tracer.span('ior.start', 'start', pkg_type='ior'):
+                pass
+        self.assertEqual([event['name'] for event in tracer.events],
+                         ['ior.start', 'iteration 0-0'])
+        inner, outer = tracer.events
+        self.assertGreaterEqual(inner['ts'], outer['ts'])
+        self.assertLessEqual(inner['ts'] + inner['dur'],
+                             outer['ts'] + outer['dur'])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            tracer.save(path)
+            with open(path, 'r', encoding='utf-8') as fp:
+                trace = json.load(fp)
+        phases = [event['ph'] for event in trace['traceEvents']]
+        self.assertEqual(phases, ['M', 'X', 'X'])
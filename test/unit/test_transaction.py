@@ -0,0 +1,106 @@
+"""
+Test building a pipeline in a transaction
+"""
+from jarvis_cd.basic.transaction import PipelineTransaction
+from contextlib import nullcontext
+from unittest import TestCase, mock
+import tempfile
+import os
+
+
+class FakeManager:
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+        self.hostfile = None
+        self.batch = None
+
+    def construct_pkg(self, pkg_type):
+        return mock.Mock(configure_menu=lambda: [{'name': 'fail'}])
+
+
+class FakePipeline:
+    """
+    Records how the transaction builds it. Each pkg gets its own copy of
+    the environment, as in a concurrent stage.
+    """
+    jarvis = None
+
+    def create(self, global_id):
+        self.config_dir = os.path.join(self.jarvis.config_dir, global_id)
+        os.makedirs(self.config_dir)
+        with open(os.path.join(self.config_dir, 'new'), 'w',
+                  encoding='utf-8'):
+            pass
+        self.env = {}
+        self.config = {}
+        self.sub_pkgs = []
+        self.stage_envs = {}
+        self.fs_plan = mock.Mock()
+        self.ssh_session = nullcontext
+        return self
+
+    def track_env(self, env_track):
+        self.env.update(env_track)
+
+    def append(self, pkg_type, pkg_id, do_configure=True):
+        self.sub_pkgs.append(mock.Mock(pkg_id=pkg_id))
+
+    def get_stages(self):
+        pass
+
+    def run_graph(self, func):
+        for pkg in self.sub_pkgs:
+            self.stage_envs[pkg.pkg_id] = dict(self.env)
+            func(pkg)
+
+    def pkg_env(self, pkg):
+        return self.stage_envs[pkg.pkg_id]
+
+    def configure_pkg(self, pkg, **kwargs):
+        if kwargs.get('fail'):
+            raise Exception(f'{pkg.pkg_id} failed to configure')
+
+    def save(self):
+        pass
+
+
+class TestTransaction(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.jarvis = FakeManager(tmp.name)
+        FakePipeline.jarvis = self.jarvis
+        patcher = mock.patch(
+            'jarvis_cd.basic.transaction.JarvisManager.get_instance',
+            return_value=self.jarvis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config_dir = os.path.join(tmp.name, 'ppl')
+        os.makedirs(self.config_dir)
+        with open(os.path.join(self.config_dir, 'old'), 'w',
+                  encoding='utf-8'):
+            pass
+
+    def test_replace(self):
+        with PipelineTransaction(FakePipeline, 'ppl') as ppl:
+            ppl.append('a')
+            ppl.append('b')
+            ppl.track_env({'FOO': 'bar'})
+        self.assertEqual(os.listdir(self.config_dir), ['new'])
+        self.assertEqual(os.listdir(self.jarvis.config_dir), ['ppl'])
+        # Each pkg is configured with its own copy of the environment
+        pipeline = ppl.pipeline
+        for pkg in pipeline.sub_pkgs:
+            env = pipeline.stage_envs[pkg.pkg_id]
+            self.assertEqual(env, {'FOO': 'bar'})
+            pkg.update_env.assert_called_once()
+            self.assertIs(pkg.update_env.call_args[0][0], env)
+
+    def test_restore(self):
+        # The existing pipeline is kept if configuring the new one fails
+        with self.assertRaises(Exception):
+            with PipelineTransaction(FakePipeline, 'ppl') as ppl:
+                ppl.append('a')
+                ppl.append('b', fail=True)
+        self.assertEqual(os.listdir(self.config_dir), ['old'])
+        self.assertEqual(os.listdir(self.jarvis.config_dir), ['ppl'])